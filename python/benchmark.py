@@ -0,0 +1,419 @@
+'''
+Install Dependencies:
+    - pip install mysql-connector-python
+    - Dependencies of compareTablesData.py, compareDBs.py
+
+Generates synthetic table pairs and schemas in a local MySQL server, runs compareTablesData.py, compareDBs.py on them
+and appends the wall time, peak RSS and rows/sec of every run to a results CSV, to be compared across commits
+'''
+
+import mysql.connector, logging, traceback, argparse, configparser, os, csv, json, random, string, subprocess, sys, tempfile, datetime
+from typing import Final
+
+DB_CONFIG_FILE_PATH = 'db.config'
+RESULTS_FILE_PATH = 'Benchmark Results.csv'
+SCRIPTS_DIR: Final = os.path.dirname(os.path.abspath(__file__))
+# Databases the generated data is kept in, reused by later runs with the same arguments
+ROWS_DB1: Final = 'bench_rows_a'
+ROWS_DB2: Final = 'bench_rows_b'
+SCHEMA_DB1: Final = 'bench_schema_a'
+SCHEMA_DB2: Final = 'bench_schema_b'
+META_DB: Final = 'bench_meta'
+# Rows per INSERT
+INSERT_BATCH_SIZE: Final = 5000
+# Arguments of compareTablesData.py per benchmark case
+TABLE_CASES: Final = {
+    'hash': [ '-mode', 'hash', '-format', 'csv' ],
+    'hash-workers': [ '-mode', 'hash', '-format', 'csv', '-workers', '4' ],
+    'hash-numpy': [ '-mode', 'hash', '-format', 'csv', '-engine', 'numpy' ],
+    'merge': [ '-mode', 'merge' ],
+    'checksum': [ '-mode', 'checksum' ],
+    'grace': [ '-mode', 'grace' ],
+    'estimate': [ '-mode', 'estimate' ],
+}
+SCHEMA_COLUMN_TYPES: Final = [ 'INT', 'BIGINT', 'VARCHAR(32)', 'VARCHAR(255)', 'TEXT', 'DECIMAL(12,2)', 'DATETIME', 'DATE', 'TINYINT' ]
+SCHEMA_DRIFTS: Final = [ 'dropColumn', 'addColumn', 'changeType', 'nullable', 'default', 'comment', 'dropTable', 'addTable' ]
+RESULT_COLUMNS: Final = [ 'Commit', 'Date', 'Script', 'Case', 'Rows', 'Divergence %', 'Tables', 'Drift %', 'Seconds', 'Peak RSS MB', 'Rows/s', 'Result', 'Phases' ]
+
+LOGGER = None
+DB_CONFIG = None
+seed = 1
+
+# initLogger
+def initLogger():
+    global LOGGER
+
+    logging.basicConfig(format = '[%(asctime)s] (%(levelname)s): %(message)s', datefmt = '%d-%m-%Y %H:%M:%S')
+    LOGGER = logging.getLogger(__file__)
+    LOGGER.setLevel(logging.DEBUG)
+# initLogger
+
+# getCmdArgs
+def getCmdArgs():
+    argumentParser = argparse.ArgumentParser()
+
+    argumentParser.add_argument('-rows', default = '10000,100000', help = 'Rows per generated table - Comma separated values, one table pair per value (eg: 10000,100000,1000000,10000000)')
+    argumentParser.add_argument('-divergence', type = float, default = 1, help = 'Percent of the rows that differ between a table pair: a third deleted, a third changed and a third inserted')
+    argumentParser.add_argument('-cases', default = ','.join(TABLE_CASES.keys()), help = 'compareTablesData.py cases to run - Comma separated values. List of Values: ' + ', '.join(TABLE_CASES.keys()))
+
+    argumentParser.add_argument('-schemaTables', type = int, default = 300, help = 'Tables per generated schema for compareDBs.py, 0 to skip it')
+    argumentParser.add_argument('-drift', type = float, default = 5, help = 'Percent of the schema tables that differ: a column dropped, added or changed, or the table missing from one side')
+
+    argumentParser.add_argument('-seed', type = int, default = 1, help = 'Seed of the generated data, the same seed generates the same data')
+    argumentParser.add_argument('-repeat', type = int, default = 1, help = 'Runs per case, the fastest one is recorded')
+    argumentParser.add_argument('-timeout', type = int, default = 3600, help = 'Seconds a run may take')
+    argumentParser.add_argument('-regenerate', action = 'store_true', help = 'Generate the data again, even if it was already generated with the same arguments')
+
+    argumentParser.add_argument('-results', help = f'Path to the results CSV, runs are appended to it. Default: {RESULTS_FILE_PATH}')
+    argumentParser.add_argument('-config', help = 'Path to Config file: The [DB1] section of the compareTablesData.py format, its server is used for all the databases')
+
+    return argumentParser.parse_args()
+# getCmdArgs
+
+# readDBConfig
+def readDBConfig():
+    global DB_CONFIG_FILE_PATH
+
+    config = configparser.ConfigParser(allow_no_value = True)
+
+    if os.path.isfile(DB_CONFIG_FILE_PATH):
+        config.read(DB_CONFIG_FILE_PATH)
+
+    if not config.has_section('DB1'):
+        return { 'host': '127.0.0.1', 'port': 3306, 'user': 'root', 'password': '' }
+
+    return {
+        'host': config.get('DB1', 'DB_HOST', fallback = '127.0.0.1'),
+        'port': config.get('DB1', 'DB_PORT', fallback = 3306),
+        'user': config.get('DB1', 'DB_USERNAME', fallback = 'root'),
+        'password': config.get('DB1', 'DB_PASSWORD', fallback = ''),
+    }
+# readDBConfig
+
+# connectDB
+def connectDB(database = None):
+    global DB_CONFIG
+
+    return mysql.connector.connect(
+        host = DB_CONFIG.get('host'),
+        port = DB_CONFIG.get('port'),
+        database = database,
+        user = DB_CONFIG.get('user'),
+        password = DB_CONFIG.get('password'),
+    )
+# connectDB
+
+# isGenerated
+# Whether `name` was generated with the same params by an earlier run
+def isGenerated(dbConn, name, params):
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(f'CREATE DATABASE IF NOT EXISTS `{META_DB}`')
+    dbCursor.execute(f'CREATE TABLE IF NOT EXISTS `{META_DB}`.generated (name VARCHAR(255) PRIMARY KEY, params TEXT NOT NULL)')
+    dbCursor.execute(f'SELECT params FROM `{META_DB}`.generated WHERE name = %s', (name,))
+    generated = dbCursor.fetchone()
+    dbCursor.close()
+
+    return generated is not None and generated[0] == json.dumps(params, sort_keys = True)
+# isGenerated
+
+# markGenerated
+def markGenerated(dbConn, name, params):
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(f'REPLACE INTO `{META_DB}`.generated (name, params) VALUES (%s, %s)', (name, json.dumps(params, sort_keys = True)))
+    dbConn.commit()
+    dbCursor.close()
+# markGenerated
+
+# generateRow
+def generateRow(rng, rowId):
+    return (
+        rowId,
+        ''.join(rng.choices(string.ascii_letters, k = rng.randint(8, 32))),
+        '{:.2f}'.format(rng.randint(0, 10 ** 9) / 100),
+        datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds = rng.randint(0, 10 ** 8)),
+        rng.randint(0, 1),
+        ' '.join(rng.choices(string.ascii_lowercase, k = rng.randint(0, 64))) if rng.random() < 0.5 else None,
+    )
+# generateRow
+
+# generateTablePair
+# Same rows in both tables, except for `divergence` % of them: deleted from, changed in or inserted into the second table
+def generateTablePair(dbConn, rowCount, divergence):
+    global LOGGER, seed
+
+    tableName = f'rows_{rowCount}'
+    params = { 'rows': rowCount, 'divergence': divergence, 'seed': seed }
+
+    if isGenerated(dbConn, tableName, params):
+        LOGGER.info(f'{tableName}: Already generated, reusing it...')
+
+        return tableName
+
+    LOGGER.info(f'{tableName}: Generating {rowCount} rows with {divergence}% divergence...')
+
+    rng = random.Random(f'{seed}:{rowCount}')
+    dbCursor = dbConn.cursor()
+
+    for database in [ ROWS_DB1, ROWS_DB2 ]:
+        dbCursor.execute(f'CREATE DATABASE IF NOT EXISTS `{database}`')
+        dbCursor.execute(f'DROP TABLE IF EXISTS `{database}`.`{tableName}`')
+        dbCursor.execute(f'CREATE TABLE `{database}`.`{tableName}` (id BIGINT NOT NULL PRIMARY KEY, name VARCHAR(64) NOT NULL, amount DECIMAL(12,2) NOT NULL, created_at DATETIME NOT NULL, flag TINYINT NOT NULL, note TEXT NULL)')
+
+    insertQuery = 'INSERT INTO `{}`.`' + tableName + '` (id, name, amount, created_at, flag, note) VALUES (%s, %s, %s, %s, %s, %s)'
+    table1Rows = []
+    table2Rows = []
+
+    # A table with its rows changed by `divergence` %, split evenly between the three kinds of change
+    for rowId in range(1, rowCount + 1):
+        row = generateRow(rng, rowId)
+        changeChance = rng.random() * 100
+        table1Rows.append(row)
+
+        if changeChance < divergence / 3:
+            pass
+        elif changeChance < divergence * 2 / 3:
+            table2Rows.append(row[:2] + ('{:.2f}'.format(rng.randint(0, 10 ** 9) / 100),) + row[3:])
+        else:
+            table2Rows.append(row)
+
+        if len(table1Rows) >= INSERT_BATCH_SIZE:
+            dbCursor.executemany(insertQuery.format(ROWS_DB1), table1Rows)
+            dbCursor.executemany(insertQuery.format(ROWS_DB2), table2Rows)
+            dbConn.commit()
+
+            table1Rows = []
+            table2Rows = []
+
+    for rowId in range(rowCount + 1, rowCount + 1 + int(rowCount * divergence / 300)):
+        table2Rows.append(generateRow(rng, rowId))
+
+        if len(table2Rows) >= INSERT_BATCH_SIZE:
+            dbCursor.executemany(insertQuery.format(ROWS_DB2), table2Rows)
+            table2Rows = []
+
+    if len(table1Rows) > 0:
+        dbCursor.executemany(insertQuery.format(ROWS_DB1), table1Rows)
+
+    if len(table2Rows) > 0:
+        dbCursor.executemany(insertQuery.format(ROWS_DB2), table2Rows)
+
+    dbConn.commit()
+    dbCursor.close()
+
+    markGenerated(dbConn, tableName, params)
+
+    return tableName
+# generateTablePair
+
+# generateColumnDef
+def generateColumnDef(rng, columnName):
+    return f'`{columnName}` ' + rng.choice(SCHEMA_COLUMN_TYPES) + (' NULL' if rng.random() < 0.5 else ' NOT NULL')
+# generateColumnDef
+
+# generateSchemaPair
+# Same tables in both schemas, except for `drift` % of them: changed or missing in the second schema
+def generateSchemaPair(dbConn, tableCount, drift):
+    global LOGGER, seed
+
+    params = { 'tables': tableCount, 'drift': drift, 'seed': seed }
+
+    if isGenerated(dbConn, 'schema', params):
+        LOGGER.info('Schema: Already generated, reusing it...')
+
+        return
+
+    LOGGER.info(f'Schema: Generating {tableCount} tables with {drift}% drift...')
+
+    rng = random.Random(f'{seed}:schema')
+    dbCursor = dbConn.cursor()
+
+    for database in [ SCHEMA_DB1, SCHEMA_DB2 ]:
+        dbCursor.execute(f'DROP DATABASE IF EXISTS `{database}`')
+        dbCursor.execute(f'CREATE DATABASE `{database}`')
+
+    for tableNo in range(1, tableCount + 1):
+        tableName = 't_{:05d}'.format(tableNo)
+        columnDefs = [ '`id` BIGINT NOT NULL PRIMARY KEY' ] + [ generateColumnDef(rng, f'col_{colNo}') for colNo in range(1, rng.randint(5, 20)) ]
+        table2ColumnDefs = list(columnDefs)
+        tableDrift = rng.choice(SCHEMA_DRIFTS) if rng.random() * 100 < drift else None
+
+        if tableDrift == 'dropColumn':
+            table2ColumnDefs.pop()
+        elif tableDrift == 'addColumn':
+            table2ColumnDefs.append(generateColumnDef(rng, 'col_added'))
+        elif tableDrift in [ 'changeType', 'nullable', 'default', 'comment' ]:
+            colIndex = rng.randint(1, len(columnDefs) - 1)
+            columnName = columnDefs[colIndex].split(' ')[0]
+
+            if tableDrift == 'changeType':
+                table2ColumnDefs[colIndex] = columnName + ' VARCHAR(100) NULL'
+            elif tableDrift == 'nullable':
+                table2ColumnDefs[colIndex] = columnDefs[colIndex].replace(' NOT NULL', ' NULL') if columnDefs[colIndex].endswith(' NOT NULL') else columnDefs[colIndex][:-len(' NULL')] + ' NOT NULL'
+            elif tableDrift == 'default':
+                table2ColumnDefs[colIndex] = columnName + ' INT NULL DEFAULT 1'
+            else:
+                table2ColumnDefs[colIndex] = columnDefs[colIndex] + ' COMMENT \'drifted\''
+
+        if tableDrift != 'addTable':
+            dbCursor.execute(f'CREATE TABLE `{SCHEMA_DB1}`.`{tableName}` (' + ', '.join(columnDefs) + ')')
+
+        if tableDrift != 'dropTable':
+            dbCursor.execute(f'CREATE TABLE `{SCHEMA_DB2}`.`{tableName}` (' + ', '.join(table2ColumnDefs) + ')')
+
+    dbCursor.close()
+
+    markGenerated(dbConn, 'schema', params)
+# generateSchemaPair
+
+# getCommit
+# Commit the scripts are benchmarked at, marked +dirty when they have uncommitted changes
+def getCommit():
+    try:
+        commit = subprocess.run([ 'git', 'rev-parse', '--short', 'HEAD' ], cwd = SCRIPTS_DIR, capture_output = True, text = True, check = True).stdout.strip()
+        changes = subprocess.run([ 'git', 'status', '--porcelain', '--', '.' ], cwd = SCRIPTS_DIR, capture_output = True, text = True, check = True).stdout.strip()
+
+        return commit + ('+dirty' if changes else '')
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+# getCommit
+
+# runScript
+# Runs a script with -stats json in a temp directory, so its result files don't pile up
+# @returns Stats of the run, None if it failed
+def runScript(scriptName, scriptArgs, configText, timeout):
+    global LOGGER
+
+    with tempfile.TemporaryDirectory(prefix = 'benchmark.') as runDir:
+        configPath = os.path.join(runDir, 'db.config')
+
+        with open(configPath, 'w') as fpConfig:
+            fpConfig.write(configText)
+
+        try:
+            completed = subprocess.run([ sys.executable, os.path.join(SCRIPTS_DIR, scriptName) ] + scriptArgs + [ '-config', configPath, '-stats', 'json' ], cwd = runDir, capture_output = True, text = True, timeout = timeout)
+        except subprocess.TimeoutExpired:
+            LOGGER.error(f'{scriptName} ' + ' '.join(scriptArgs) + f': Timed out after {timeout}s')
+
+            return None
+
+    # The stats are the last line printed, compareDBs.py prints its tables before them
+    outputLines = [ outputLine for outputLine in completed.stdout.splitlines() if outputLine.startswith('{') ]
+
+    stats = json.loads(outputLines[-1]) if completed.returncode == 0 and len(outputLines) > 0 else None
+
+    # compareTablesData.py reports a comparison that did not complete without a result
+    if stats is None or ('result' in stats and stats.get('result') is None):
+        LOGGER.error(f'{scriptName} ' + ' '.join(scriptArgs) + ': Failed\n' + completed.stderr[-2000:])
+
+        return None
+
+    return stats
+# runScript
+
+# benchmarkScript
+# Runs the script -repeat times and appends the fastest run to the results
+# @params rowCount -> Rows the script compares, None when it does not compare rows
+def benchmarkScript(resultsWriter, repeat, timeout, scriptName, scriptArgs, configText, resultRow, rowCount):
+    global LOGGER
+
+    bestStats = None
+
+    for i in range(repeat):
+        stats = runScript(scriptName, scriptArgs, configText, timeout)
+
+        if stats and (bestStats is None or stats.get('seconds') < bestStats.get('seconds')):
+            bestStats = stats
+
+    resultRow['Script'] = scriptName
+
+    if bestStats:
+        resultRow['Seconds'] = bestStats.get('seconds')
+        resultRow['Peak RSS MB'] = round(bestStats.get('peakRssBytes') / 1024 / 1024, 1) if bestStats.get('peakRssBytes') else ''
+        resultRow['Rows/s'] = round(rowCount / bestStats.get('seconds')) if rowCount and bestStats.get('seconds') > 0 else ''
+        resultRow['Result'] = 'OK'
+        resultRow['Phases'] = json.dumps({ phase: tempStats.get('seconds') for phase, tempStats in bestStats.get('phases').items() })
+
+        LOGGER.info(scriptName + ' ' + resultRow.get('Case') + ': ' + str(resultRow.get('Seconds')) + 's' + (', ' + str(resultRow.get('Rows/s')) + ' rows/s' if rowCount else '') + ', ' + str(resultRow.get('Peak RSS MB')) + ' MB')
+    else:
+        resultRow['Result'] = 'Failed'
+
+    resultsWriter.writerow(resultRow)
+# benchmarkScript
+
+# main
+def main():
+    try:
+        global LOGGER, DB_CONFIG_FILE_PATH, RESULTS_FILE_PATH, DB_CONFIG, seed
+
+        initLogger()
+
+        args = getCmdArgs()
+
+        seed = args.seed
+        rowCounts = [ int(tempRows.strip()) for tempRows in args.rows.split(',') if tempRows.strip() ]
+        cases = [ tempCase.strip() for tempCase in args.cases.split(',') if tempCase.strip() ]
+        invalidCases = [ tempCase for tempCase in cases if not(tempCase in TABLE_CASES) ]
+
+        if len(invalidCases) > 0:
+            LOGGER.error('Invalid cases: ' + (', '.join(invalidCases)))
+            quit()
+
+        if args.config:
+            DB_CONFIG_FILE_PATH = args.config
+
+        if args.results:
+            RESULTS_FILE_PATH = args.results
+
+        DB_CONFIG = readDBConfig()
+        dbConn = connectDB()
+
+        if args.regenerate:
+            dbCursor = dbConn.cursor()
+            dbCursor.execute(f'DROP DATABASE IF EXISTS `{META_DB}`')
+            dbCursor.close()
+
+        tableNames = { rowCount: generateTablePair(dbConn, rowCount, args.divergence) for rowCount in rowCounts }
+
+        if args.schemaTables > 0:
+            generateSchemaPair(dbConn, args.schemaTables, args.drift)
+
+        dbConn.close()
+
+        serverText = '\n'.join([ f'DB_HOST = ' + DB_CONFIG.get('host'), f'DB_PORT = ' + str(DB_CONFIG.get('port')), f'DB_USERNAME = ' + DB_CONFIG.get('user'), f'DB_PASSWORD = ' + DB_CONFIG.get('password') ])
+        tablesConfigText = '[DB1]\n' + serverText + '\n[DB2]\n' + serverText + '\n'
+        # compareDBs.py reads DB1_, DB2_ prefixed options without a section
+        schemaConfigText = '\n'.join([ tempLine.replace('DB_', f'DB{dbNo}_') for dbNo in [ 1, 2 ] for tempLine in serverText.splitlines() ]) + '\n'
+
+        isNewFile = not os.path.isfile(RESULTS_FILE_PATH)
+        baseRow = { 'Commit': getCommit(), 'Date': datetime.datetime.now().isoformat(timespec = 'seconds') }
+
+        with open(RESULTS_FILE_PATH, 'a', newline = '') as fpResults:
+            resultsWriter = csv.DictWriter(fpResults, fieldnames = RESULT_COLUMNS)
+
+            if isNewFile:
+                resultsWriter.writeheader()
+
+            for rowCount, tableName in tableNames.items():
+                for tempCase in cases:
+                    resultRow = dict(baseRow, **{ 'Case': tempCase, 'Rows': rowCount, 'Divergence %': args.divergence })
+                    scriptArgs = [ '-table1', f'{ROWS_DB1}.{tableName}', '-table2', f'{ROWS_DB2}.{tableName}' ] + TABLE_CASES.get(tempCase)
+
+                    # Rows of both tables
+                    benchmarkScript(resultsWriter, args.repeat, args.timeout, 'compareTablesData.py', scriptArgs, tablesConfigText, resultRow, rowCount * 2)
+
+                    fpResults.flush()
+
+            if args.schemaTables > 0:
+                resultRow = dict(baseRow, **{ 'Case': 'schema', 'Tables': args.schemaTables, 'Drift %': args.drift })
+
+                benchmarkScript(resultsWriter, args.repeat, args.timeout, 'compareDBs.py', [ '-db1', SCHEMA_DB1, '-db2', SCHEMA_DB2 ], schemaConfigText, resultRow, None)
+
+        LOGGER.info(f'Results are appended to the {RESULTS_FILE_PATH}')
+    except Exception as e:
+        print('Error occurred:')
+        traceback.print_exc()
+        quit()
+# main
+
+if __name__ == '__main__':
+    main()
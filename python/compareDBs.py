@@ -1,18 +1,52 @@
 '''
 Install Dependencies:
     - pip install mysql-connector-python rich
+    - pip install pyyaml (Optional: Only for YAML -fleet inventories)
 '''
 
-import mysql.connector, logging, traceback, argparse, configparser, os
+import mysql.connector, logging, traceback, argparse, configparser, os, contextlib, time, sys, json, cProfile, tracemalloc, hashlib, gzip, datetime, csv, threading, concurrent.futures
 from typing import Final
 from rich.console import Console as richConsole
 from rich.table import Table as richTable
 
 DB_CONFIG_FILE_PATH = 'db.config'
+PROFILE_FILE_PATH = 'compareDBs.profile'
+# Lines of the tracemalloc profile, largest allocations first
+PROFILE_TOP_ALLOCATIONS: Final = 50
+SNAPSHOT_VERSION: Final = 1
+# -db1, -db2 values with these extensions are read as snapshot files. .gz files are gzipped
+SNAPSHOT_EXTENSIONS: Final = ('.json', '.json.gz')
+# Hosts of a -fleet inventory introspected at the same time
+FLEET_WORKERS: Final = 8
+OUTPUT_FORMATS: Final = ['table', 'jsonl', 'json', 'csv']
+# Fields of the -output records, the columns of csv
+OUTPUT_FIELDS: Final = ['type', 'table', 'column', 'db1', 'db2', 'drift', 'targets', 'error']
+EXIT_IDENTICAL: Final = 0
+EXIT_DIFFERENT: Final = 1
+EXIT_ERROR: Final = 2
 
 LOGGER = None
+# Shared by the rich tables, instead of a console per table
+RICH_CONSOLE = None
 DB1_CONN = None
 DB2_CONN = None
+DB1_CONFIG = None
+DB2_CONFIG = None
+compressProtocol = False
+# Directory of the cached live schemas
+schemaCacheDir = None
+refreshCache = False
+# table: rich tables. jsonl, json, csv: A record per difference on stdout, written as soon as it is found
+outputFormat = 'table'
+# Only the summary and the exit code
+quietMode = False
+# Records written to the -output stream
+outputRecordCount = 0
+outputCsvWriter = None
+# Phase -> { seconds, rows }
+phaseStats = {}
+# The -fleet threads add to the phase stats at the same time
+phaseStatsLock = threading.Lock()
 
 # initLogger
 def initLogger():
@@ -27,19 +61,151 @@ def initLogger():
 def getCmdArgs():
     argumentParser = argparse.ArgumentParser()
 
-    argumentParser.add_argument('-db1', help = 'Database - 1')
-    argumentParser.add_argument('-db2', help = 'Database - 2')
+    argumentParser.add_argument('-db1', help = 'Database - 1, or the path of a snapshot file (' + ', '.join(SNAPSHOT_EXTENSIONS) + ') to compare instead')
+    argumentParser.add_argument('-db2', help = 'Database - 2, or the path of a snapshot file')
+
+    argumentParser.add_argument('-export', help = 'Write the schema of -db1 to this snapshot file instead of comparing, .gz paths are gzipped')
+    argumentParser.add_argument('-cacheDir', help = 'Keep a snapshot of every live database in this directory, reused while the CREATE_TIME, UPDATE_TIME and the columns, constraints checksums of its tables are unchanged')
+    argumentParser.add_argument('-refresh', action = 'store_true', help = 'Read the live schemas even if their -cacheDir snapshots are still valid, and update the snapshots')
+
+    argumentParser.add_argument('-fleet', help = 'Compare -db1 with every target of this inventory (JSON, YAML: A list of { host, port, db, user, password }, or an object with the list in "targets". CSV: A target per row) in one report, targets with the same drift are grouped. user, password, port default to the db2 credentials of the config. A db may be a snapshot file')
+    argumentParser.add_argument('-workers', type = int, help = f'-fleet: Hosts introspected at the same time, over a connection each. Default: {FLEET_WORKERS}')
+
+    argumentParser.add_argument('-output', choices = OUTPUT_FORMATS, help = 'table: Default. jsonl, json, csv: Write a record per difference to stdout as soon as it is found, { type: table | column | error | summary, table, column, db1, db2, drift, targets, error }, the log stays on stderr. db1, db2 are null where the table or column does not exist')
+    argumentParser.add_argument('-quiet', action = 'store_true', help = f'Write only the summary. With -quiet or -output, the exit code is {EXIT_IDENTICAL} Identical, {EXIT_DIFFERENT} Different, {EXIT_ERROR} Error. Otherwise it is 0')
 
     argumentParser.add_argument('-ignore', help = 'Ignore Changes - Comma separated values.\nList of Values: comment, charset, dataLength, dataType, defaultValue, nullable')
 
+    argumentParser.add_argument('-compress', action = 'store_true', help = 'Compress the MySQL protocol, for servers behind a slow link')
+
+    argumentParser.add_argument('-stats', choices = ['log', 'json'], help = 'Report the time and rows of every phase (connect, introspect, compare, print) with the peak RSS when done. log: In the log. json: A JSON object on stdout, on stderr with -output')
+    argumentParser.add_argument('-profile', choices = ['cprofile', 'tracemalloc'], help = 'cprofile: Dump the CPU profile, to be read by python -m pstats. tracemalloc: Dump the largest allocations by source line')
+    argumentParser.add_argument('-profileFile', help = f'Path to the -profile dump. Default: {PROFILE_FILE_PATH}')
+
     argumentParser.add_argument('-config', help = 'Path to Database config file')
 
     return argumentParser.parse_args()
 # getCmdArgs
 
+# addPhaseStats
+def addPhaseStats(phase, seconds = 0, rows = 0):
+    global phaseStats, phaseStatsLock
+
+    with phaseStatsLock:
+        tempStats = phaseStats.setdefault(phase, { 'seconds': 0, 'rows': 0 })
+        tempStats['seconds'] += seconds
+        tempStats['rows'] += rows
+# addPhaseStats
+
+# timePhase
+# Adds the time spent in the with block to the phase
+@contextlib.contextmanager
+def timePhase(phase):
+    startTime = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        addPhaseStats(phase, seconds = time.perf_counter() - startTime)
+# timePhase
+
+# getPeakRss
+# Bytes, None where the resource module is not available (Windows)
+def getPeakRss():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS, in KB elsewhere
+    return peakRss if sys.platform == 'darwin' else peakRss * 1024
+# getPeakRss
+
+# reportStats
+def reportStats(statsFormat, totalSeconds):
+    global LOGGER, phaseStats, outputFormat
+
+    peakRss = getPeakRss()
+    stats = { 'seconds': round(totalSeconds, 3), 'peakRssBytes': peakRss, 'phases': {} }
+
+    for phase, tempStats in phaseStats.items():
+        phaseSeconds = tempStats.get('seconds')
+
+        stats['phases'][phase] = {
+            'seconds': round(phaseSeconds, 3),
+            'rows': tempStats.get('rows'),
+            'rowsPerSecond': round(tempStats.get('rows') / phaseSeconds) if phaseSeconds > 0 else None,
+        }
+
+    if statsFormat == 'json':
+        # stdout holds the -output stream
+        print(json.dumps(stats), file = sys.stdout if outputFormat == 'table' else sys.stderr)
+
+        return
+
+    for phase, tempStats in stats.get('phases').items():
+        phaseText = f'{phase}: ' + '{:.2f}'.format(tempStats.get('seconds')) + 's'
+
+        if tempStats.get('rows') > 0:
+            phaseText += ', ' + str(tempStats.get('rows')) + ' rows' + (', ' + str(tempStats.get('rowsPerSecond')) + ' rows/s' if tempStats.get('rowsPerSecond') is not None else '')
+
+        LOGGER.info(phaseText)
+
+    LOGGER.info('Took ' + '{:.2f}'.format(totalSeconds) + 's' + (', Peak RSS: ' + '{:.1f}'.format(peakRss / 1024 / 1024) + ' MB' if peakRss else ''))
+# reportStats
+
+# startProfiler
+# @returns The cProfile.Profile of cprofile, None otherwise
+def startProfiler(profileKind):
+    if profileKind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        return profiler
+    elif profileKind == 'tracemalloc':
+        tracemalloc.start()
+
+    return None
+# startProfiler
+
+# stopProfiler
+def stopProfiler(profileKind, profiler):
+    global LOGGER, PROFILE_FILE_PATH
+
+    if profileKind == 'cprofile':
+        profiler.disable()
+        profiler.dump_stats(PROFILE_FILE_PATH)
+
+        LOGGER.info(f'CPU profile can be found in the {PROFILE_FILE_PATH}, view it with: python -m pstats {PROFILE_FILE_PATH}')
+    elif profileKind == 'tracemalloc':
+        snapshot = tracemalloc.take_snapshot()
+        (currentBytes, peakBytes) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with open(PROFILE_FILE_PATH, 'w') as fpProfile:
+            fpProfile.write(f'Peak traced memory: {peakBytes} bytes, Still allocated: {currentBytes} bytes\n\n')
+
+            for allocation in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+                fpProfile.write(str(allocation) + '\n')
+
+        LOGGER.info(f'Memory profile can be found in the {PROFILE_FILE_PATH}')
+# stopProfiler
+
+# exitRun
+# The exit codes tell identical from different only with -quiet or -output, a default run exits with 0 as it always did
+def exitRun(exitCode):
+    global outputFormat, quietMode
+
+    quit(exitCode if quietMode or outputFormat != 'table' else None)
+# exitRun
+
 # initDBConn
+# use_pure = False picks the C extension when it is installed
+# @params db1, db2 -> None for a snapshot file, it is not connected to
 def initDBConn(db1, db2):
-    global DB1_CONN, DB2_CONN, DB_CONFIG_FILE_PATH, LOGGER
+    global DB1_CONN, DB2_CONN, DB1_CONFIG, DB2_CONFIG, DB_CONFIG_FILE_PATH, LOGGER, compressProtocol
 
     defaultDBConfig: Final = {
         'host': '127.0.0.1',
@@ -70,6 +236,8 @@ def initDBConn(db1, db2):
                 }
 
                 # Assign DB1 config to DB2
+                DB2_CONFIG = {}
+
                 for k, v in DB1_CONFIG.items():
                     if k == 'database':
                         DB2_CONFIG['database'] = db2
@@ -113,38 +281,51 @@ def initDBConn(db1, db2):
         LOGGER.warning('No config file found! Using default credentials...')
     # Get DB credentials from config file
 
-    if DB1_CONFIG:
-        DB1_CONN = mysql.connector.connect(
-            host = DB1_CONFIG.get('host'),
-            port = DB1_CONFIG.get('port'),
-            database = DB1_CONFIG.get('database'),
-            user = DB1_CONFIG.get('user'),
-            password = DB1_CONFIG.get('password'),
-        )
+    if not db1:
+        pass
+    elif DB1_CONFIG:
+        with timePhase('connect'):
+            DB1_CONN = mysql.connector.connect(
+                host = DB1_CONFIG.get('host'),
+                port = DB1_CONFIG.get('port'),
+                database = DB1_CONFIG.get('database'),
+                user = DB1_CONFIG.get('user'),
+                password = DB1_CONFIG.get('password'),
+                compress = compressProtocol,
+                use_pure = False,
+            )
     else:
         LOGGER.error('db1 Credentials not available!')
-        quit()
-
-    if DB2_CONFIG:
-        DB2_CONN = mysql.connector.connect(
-            host = DB2_CONFIG.get('host'),
-            port = DB2_CONFIG.get('port'),
-            database = DB2_CONFIG.get('database'),
-            user = DB2_CONFIG.get('user'),
-            password = DB2_CONFIG.get('password'),
-        )
+        exitRun(EXIT_ERROR)
+
+    if not db2:
+        pass
+    elif DB2_CONFIG:
+        with timePhase('connect'):
+            DB2_CONN = mysql.connector.connect(
+                host = DB2_CONFIG.get('host'),
+                port = DB2_CONFIG.get('port'),
+                database = DB2_CONFIG.get('database'),
+                user = DB2_CONFIG.get('user'),
+                password = DB2_CONFIG.get('password'),
+                compress = compressProtocol,
+                use_pure = False,
+            )
     else:
         LOGGER.error('db2 Credentials not available!')
-        quit()
+        exitRun(EXIT_ERROR)
 # initDBConn
 
 # runQuery
 def runQuery(dbConn, query, params = {}, toList = False):
-    dbCursor = dbConn.cursor(dictionary = True)
-    dbCursor.execute(query, params)
+    with timePhase('introspect'):
+        dbCursor = dbConn.cursor(dictionary = True)
+        dbCursor.execute(query, params)
+
+        result = dbCursor.fetchall()
+        dbCursor.close()
 
-    result = dbCursor.fetchall()
-    dbCursor.close()
+    addPhaseStats('introspect', rows = len(result))
 
     if toList:
         tempResult = result
@@ -160,6 +341,11 @@ def runQuery(dbConn, query, params = {}, toList = False):
 # @params headers -> List
 # @params rows -> List[Tuple]
 def printInTableFormat(headers, rows, title = None):
+    global RICH_CONSOLE, quietMode
+
+    if quietMode:
+        return
+
     rt = richTable(title = title, show_lines = True, title_justify = True)
 
     for header in headers:
@@ -168,33 +354,121 @@ def printInTableFormat(headers, rows, title = None):
     for row in rows:
         rt.add_row(* row)
 
-    rc = richConsole()
-    rc.print(rt)
+    with timePhase('print'):
+        if RICH_CONSOLE is None:
+            RICH_CONSOLE = richConsole()
+
+        RICH_CONSOLE.print(rt)
 
     # Empty print for log readability
     print('')
 # printInTableFormat
 
+# printBlankLine
+# Empty print for log readability, left out of the -output streams
+def printBlankLine():
+    global outputFormat, quietMode
+
+    if outputFormat == 'table' and not quietMode:
+        print('')
+# printBlankLine
+
+# writeOutputRecord
+# Writes a difference to the -output stream, a json stream is a list closed by finishOutput
+# @params record -> { type, table, column, db1, db2, drift, targets, error }
+def writeOutputRecord(record):
+    global outputFormat, quietMode, outputRecordCount, outputCsvWriter
+
+    if quietMode and record.get('type') != 'summary':
+        return
+
+    with timePhase('print'):
+        if outputFormat == 'jsonl':
+            sys.stdout.write(json.dumps(record) + '\n')
+        elif outputFormat == 'json':
+            sys.stdout.write(('[\n' if outputRecordCount == 0 else ',\n') + json.dumps(record))
+        elif outputFormat == 'csv':
+            if outputCsvWriter is None:
+                outputCsvWriter = csv.DictWriter(sys.stdout, fieldnames = OUTPUT_FIELDS, extrasaction = 'ignore')
+                outputCsvWriter.writeheader()
+
+            outputCsvWriter.writerow(dict(record, targets = ' '.join(record.get('targets') or [])))
+
+    outputRecordCount += 1
+# writeOutputRecord
+
+# writeColumnRecords
+# @params printData -> List of (Column, In DB1, In DB2), of diffTableDetails
+def writeColumnRecords(tableName, printData, drift = None, targets = None):
+    for (colName, db1ColDispFormat, db2ColDispFormat) in printData:
+        record = {
+            'type': 'column',
+            'table': tableName,
+            'column': colName,
+            'db1': None if db1ColDispFormat == 'NOT EXISTS' else db1ColDispFormat,
+            'db2': None if db2ColDispFormat == 'NOT EXISTS' else db2ColDispFormat,
+        }
+
+        # -fleet
+        if targets:
+            record['drift'] = drift
+            record['targets'] = targets
+
+        writeOutputRecord(record)
+# writeColumnRecords
+
+# writeSummary
+# json, jsonl: The last record. csv: In the log. -quiet: The only output
+def writeSummary(summary):
+    global LOGGER, outputFormat, quietMode
+
+    summaryText = ', '.join([ f'{k}: {v}' for k, v in summary.items() ])
+
+    if outputFormat in ['jsonl', 'json']:
+        writeOutputRecord(dict({ 'type': 'summary' }, **summary))
+    elif quietMode:
+        print(summaryText)
+    elif outputFormat == 'csv':
+        LOGGER.info(f'Summary: {summaryText}')
+# writeSummary
+
+# finishOutput
+def finishOutput():
+    global outputFormat, outputRecordCount
+
+    if outputFormat == 'json':
+        sys.stdout.write('\n]\n' if outputRecordCount > 0 else '[]\n')
+
+    sys.stdout.flush()
+# finishOutput
+
+# toText
+# information_schema values come back as bytes from some server and connector versions
+def toText(value):
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
+# toText
+
 # formatColumnToDisplay
+# @params col -> Column of fetchSchemaDetails, its values are text
 def formatColumnToDisplay(col, constraints, ignoreDetails = []):
     charLength = col.get('CHARACTER_MAXIMUM_LENGTH')
     colDefault = col.get('COLUMN_DEFAULT')
     dispFormat = ''
 
     if not('dataType' in ignoreDetails):
-        dispFormat = col.get('DATA_TYPE').decode() + '' + (f'({charLength})' if charLength and charLength > 0 else '')
+        dispFormat = col.get('DATA_TYPE') + '' + (f'({charLength})' if charLength and charLength > 0 else '')
 
     if not('charset' in ignoreDetails):
         dispFormat += (' CHARACTER SET ' + col.get('CHARACTER_SET_NAME') + (' COLLATE ' + col.get('COLLATION_NAME') if col.get('COLLATION_NAME') else '') if col.get('CHARACTER_SET_NAME') else '')
 
     if not('defaultValue' in ignoreDetails) and colDefault:
-        dispFormat += f' DEFAULT \'{colDefault.decode()}\''
+        dispFormat += f' DEFAULT \'{colDefault}\''
 
     if not('nullable' in ignoreDetails):
         dispFormat += (' NOT NULL' if col.get('IS_NULLABLE') == 'NO' else ('' if colDefault else ' DEFAULT') + ' NULL')
 
     if not('comment' in ignoreDetails) and col.get('COLUMN_COMMENT'):
-        comment = col.get('COLUMN_COMMENT').decode()
+        comment = col.get('COLUMN_COMMENT')
 
         if comment and len(comment) > 0:
             dispFormat += f' COMMENT \'{comment}\''
@@ -206,116 +480,220 @@ def formatColumnToDisplay(col, constraints, ignoreDetails = []):
     return dispFormat
 # formatColumnToDisplay
 
-# fetchTableDetails
-def fetchTableDetails(dbConn, dbName, tableName):
-    columnsQuery = 'SELECT COLUMN_NAME, COLUMN_DEFAULT, IS_NULLABLE, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, CHARACTER_SET_NAME, COLLATION_NAME, COLUMN_COMMENT FROM information_schema.columns WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s ORDER BY COLUMN_NAME'
+# fetchSchemaDetails
+# Columns and constraints of every table of the database, in one query each instead of two per table
+# @returns Dict: tableName -> { columns, constraints }
+def fetchSchemaDetails(dbConn, dbName):
+    columnsQuery = 'SELECT TABLE_NAME, COLUMN_NAME, COLUMN_DEFAULT, IS_NULLABLE, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, CHARACTER_SET_NAME, COLLATION_NAME, COLUMN_COMMENT FROM information_schema.columns WHERE TABLE_SCHEMA = %(database)s ORDER BY TABLE_NAME, COLUMN_NAME'
 
-    columns = runQuery(dbConn, columnsQuery, { 'database': dbName, 'table': tableName })
+    rawColumns = runQuery(dbConn, columnsQuery, { 'database': dbName })
 
-    constraintsQuery = 'SELECT kcu.COLUMN_NAME, tc.CONSTRAINT_TYPE, kcu.REFERENCED_TABLE_NAME, kcu.REFERENCED_COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE kcu INNER JOIN information_schema.TABLE_CONSTRAINTS tc ON tc.CONSTRAINT_SCHEMA = kcu.CONSTRAINT_SCHEMA AND tc.TABLE_NAME = kcu.TABLE_NAME AND tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME WHERE kcu.TABLE_SCHEMA = %(database)s AND kcu.TABLE_NAME = %(table)s'
+    constraintsQuery = 'SELECT kcu.TABLE_NAME, kcu.COLUMN_NAME, tc.CONSTRAINT_TYPE, kcu.REFERENCED_TABLE_NAME, kcu.REFERENCED_COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE kcu INNER JOIN information_schema.TABLE_CONSTRAINTS tc ON tc.CONSTRAINT_SCHEMA = kcu.CONSTRAINT_SCHEMA AND tc.TABLE_NAME = kcu.TABLE_NAME AND tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME WHERE kcu.TABLE_SCHEMA = %(database)s'
 
-    rawConstraints = runQuery(dbConn, constraintsQuery, { 'database': dbName, 'table': tableName })
-    constraints = {}
+    rawConstraints = runQuery(dbConn, constraintsQuery, { 'database': dbName })
+    schemaDetails = {}
 
-    if rawConstraints and len(rawConstraints) > 0:
-        for tempConstraint in rawConstraints:
-            constraintName = tempConstraint.get('CONSTRAINT_TYPE')
+    for tempCol in rawColumns:
+        tempCol = { k: toText(v) for k, v in tempCol.items() }
 
-            if tempConstraint.get('REFERENCED_TABLE_NAME'):
-                constraintName += '(' + tempConstraint.get('REFERENCED_TABLE_NAME') + '.' + tempConstraint.get('REFERENCED_COLUMN_NAME') + ')'
+        schemaDetails.setdefault(tempCol.pop('TABLE_NAME'), { 'columns': [], 'constraints': {} })['columns'].append(tempCol)
 
-            if tempConstraint.get('COLUMN_NAME') in constraints:
-                constraints[ tempConstraint.get('COLUMN_NAME') ].append( constraintName )
-            else:
-                constraints[ tempConstraint.get('COLUMN_NAME') ] = [ constraintName ]
+    for tempConstraint in rawConstraints:
+        tempConstraint = { k: toText(v) for k, v in tempConstraint.items() }
+        constraintName = tempConstraint.get('CONSTRAINT_TYPE')
 
-    return {
-        'columns': columns,
-        'constraints': constraints,
-    }
-# fetchTableDetails
+        if tempConstraint.get('REFERENCED_TABLE_NAME'):
+            constraintName += '(' + tempConstraint.get('REFERENCED_TABLE_NAME') + '.' + tempConstraint.get('REFERENCED_COLUMN_NAME') + ')'
 
-# compareTableDetails
-def compareTableDetails(db1, db2, ignoreDetails, tableName):
-    global LOGGER, DB1_CONN, DB2_CONN
-    areTablesIdentical = True
+        constraints = schemaDetails.setdefault(tempConstraint.get('TABLE_NAME'), { 'columns': [], 'constraints': {} })['constraints']
+
+        if tempConstraint.get('COLUMN_NAME') in constraints:
+            constraints[ tempConstraint.get('COLUMN_NAME') ].append( constraintName )
+        else:
+            constraints[ tempConstraint.get('COLUMN_NAME') ] = [ constraintName ]
+
+    # The constraints come in no particular order
+    for tableDetails in schemaDetails.values():
+        for constraints in tableDetails.get('constraints').values():
+            constraints.sort()
+
+    return schemaDetails
+# fetchSchemaDetails
+
+# fingerprintTable
+# Digest of the columns and constraints of a table, equal for tables with the same definition
+def fingerprintTable(tableDetails):
+    return hashlib.sha256(json.dumps([ tableDetails.get('columns'), tableDetails.get('constraints') ], sort_keys = True, default = str).encode()).hexdigest()
+# fingerprintTable
+
+# isSnapshotPath
+def isSnapshotPath(dbArg):
+    return dbArg.lower().endswith(SNAPSHOT_EXTENSIONS) and os.path.isfile(dbArg)
+# isSnapshotPath
+
+# readSnapshot
+def readSnapshot(snapshotPath):
+    with (gzip.open if snapshotPath.lower().endswith('.gz') else open)(snapshotPath, 'rt', encoding = 'utf-8') as fpSnapshot:
+        schema = json.load(fpSnapshot)
+
+    if schema.get('version') != SNAPSHOT_VERSION:
+        raise Exception(f'{snapshotPath} is a version ' + str(schema.get('version')) + f' snapshot, only version {SNAPSHOT_VERSION} can be read')
+
+    return schema
+# readSnapshot
+
+# writeSnapshot
+def writeSnapshot(snapshotPath, schema):
+    with (gzip.open if snapshotPath.lower().endswith('.gz') else open)(snapshotPath, 'wt', encoding = 'utf-8') as fpSnapshot:
+        json.dump(schema, fpSnapshot, separators = (',', ':'), default = str)
+# writeSnapshot
+
+# buildDefinitionCheckExpr
+# XOR of the 64 bit MD5 of every row: Needs no ORDER BY, and is not cut short by group_concat_max_len like a GROUP_CONCAT
+def buildDefinitionCheckExpr(columns):
+    return 'COALESCE(BIT_XOR(CAST(CONV(SUBSTRING(MD5(CONCAT_WS(\'|\', ' + ', '.join([ f'QUOTE({tempCol})' for tempCol in columns ]) + ')), 1, 16), 16, 10) AS UNSIGNED)), 0)'
+# buildDefinitionCheckExpr
+
+# fetchSchema
+# Schema of a live database as a snapshot: { version, database, takenAt, tables: tableName -> { createTime, updateTime, definitionCheck, fingerprint, columns, constraints } }
+# @params cachePath -> Snapshot to reuse while the CREATE_TIME, UPDATE_TIME and the definition check of the tables match it, and to update otherwise
+def fetchSchema(dbConn, dbName, cachePath = None):
+    global LOGGER, refreshCache
+
+    # INSTANT and metadata only INPLACE ALTERs (ADD, DROP, RENAME COLUMN, SET DEFAULT) keep the CREATE_TIME of MySQL 8,
+    # so the columns and constraints the fingerprint is made of are checked by the server as well, in the same query
+    columnsCheckQuery = 'SELECT TABLE_NAME, COUNT(*) AS columnCount, ' + buildDefinitionCheckExpr([ 'COLUMN_NAME', 'COLUMN_DEFAULT', 'IS_NULLABLE', 'DATA_TYPE', 'CHARACTER_MAXIMUM_LENGTH', 'CHARACTER_SET_NAME', 'COLLATION_NAME', 'COLUMN_COMMENT' ]) + ' AS columnsCheck FROM information_schema.columns WHERE TABLE_SCHEMA = %(database)s GROUP BY TABLE_NAME'
+    constraintsCheckQuery = 'SELECT TABLE_NAME, COUNT(*) AS constraintCount, ' + buildDefinitionCheckExpr([ 'CONSTRAINT_NAME', 'COLUMN_NAME', 'REFERENCED_TABLE_NAME', 'REFERENCED_COLUMN_NAME' ]) + ' AS constraintsCheck FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = %(database)s GROUP BY TABLE_NAME'
+    tablesQuery = f'SELECT t.TABLE_NAME, t.CREATE_TIME, t.UPDATE_TIME, c.columnCount, c.columnsCheck, k.constraintCount, k.constraintsCheck FROM information_schema.tables t LEFT JOIN ({columnsCheckQuery}) c ON c.TABLE_NAME = t.TABLE_NAME LEFT JOIN ({constraintsCheckQuery}) k ON k.TABLE_NAME = t.TABLE_NAME WHERE t.TABLE_SCHEMA = %(database)s ORDER BY t.TABLE_NAME'
+
+    # tableName -> [ CREATE_TIME, UPDATE_TIME, Definition check ]
+    tableChecks = {}
+
+    for tempTable in runQuery(dbConn, tablesQuery, { 'database': dbName }):
+        tableChecks[ toText(tempTable.get('TABLE_NAME')) ] = [ None if tempTable.get(timeCol) is None else str(tempTable.get(timeCol)) for timeCol in [ 'CREATE_TIME', 'UPDATE_TIME' ] ] + [ ':'.join([ str(tempTable.get(checkCol) or 0) for checkCol in [ 'columnCount', 'columnsCheck', 'constraintCount', 'constraintsCheck' ] ]) ]
+
+    if cachePath and not refreshCache and os.path.isfile(cachePath):
+        cachedSchema = readSnapshot(cachePath)
+        cachedChecks = { tableName: [ tableDetails.get('createTime'), tableDetails.get('updateTime'), tableDetails.get('definitionCheck') ] for tableName, tableDetails in cachedSchema.get('tables').items() }
 
-    LOGGER.info(f'Collecting {tableName} details from DB1...')
+        # A table without CREATE_TIME, such as a view, can't tell whether it changed
+        if cachedChecks == tableChecks and all([ createTime for (createTime, updateTime, definitionCheck) in tableChecks.values() ]):
+            LOGGER.info(f'{dbName} is unchanged since ' + cachedSchema.get('takenAt') + f', using its snapshot {cachePath}...')
 
-    db1TableDetails = fetchTableDetails(DB1_CONN, db1, tableName) 
-    db1Columns = db1TableDetails.get('columns')
-    db1TblConstraints = db1TableDetails.get('constraints')
+            return cachedSchema
 
-    LOGGER.info(f'Collecting {tableName} details from DB2...\n')
+    schemaDetails = fetchSchemaDetails(dbConn, dbName)
+    schema = { 'version': SNAPSHOT_VERSION, 'database': dbName, 'takenAt': datetime.datetime.now().isoformat(sep = ' ', timespec = 'seconds'), 'tables': {} }
 
-    db2TableDetails = fetchTableDetails(DB2_CONN, db2, tableName)
-    db2Columns = db2TableDetails.get('columns')
-    db2TblConstraints = db2TableDetails.get('constraints')
+    for tableName, (createTime, updateTime, definitionCheck) in tableChecks.items():
+        tableDetails = schemaDetails.get(tableName, { 'columns': [], 'constraints': {} })
 
-    printHeader = ['Column', 'In DB1', 'In DB2']
+        schema['tables'][tableName] = {
+            'createTime': createTime,
+            'updateTime': updateTime,
+            'definitionCheck': definitionCheck,
+            'fingerprint': fingerprintTable(tableDetails),
+            'columns': tableDetails.get('columns'),
+            'constraints': tableDetails.get('constraints'),
+        }
+
+    if cachePath:
+        writeSnapshot(cachePath, schema)
+
+    return schema
+# fetchSchema
+
+# loadSchema
+# @params dbArg -> Database name, or the path of a snapshot file
+def loadSchema(dbSection, dbArg, dbConn, dbConfig):
+    global LOGGER, schemaCacheDir
+
+    if isSnapshotPath(dbArg):
+        LOGGER.info(f'Reading {dbSection} schema from the snapshot {dbArg}...')
+
+        return readSnapshot(dbArg)
+
+    LOGGER.info(f'Collecting {dbArg} details from {dbSection}...')
+
+    cachePath = None
+
+    if schemaCacheDir:
+        os.makedirs(schemaCacheDir, exist_ok = True)
+        cachePath = os.path.join(schemaCacheDir, str(dbConfig.get('host')) + '_' + str(dbConfig.get('port')) + f'_{dbArg}.json.gz')
+
+    return fetchSchema(dbConn, dbArg, cachePath)
+# loadSchema
+
+# buildTableDefinition
+# Normalized definition of a table: Column name -> Display format, with the -ignore details left out
+# Tables with equal definitions show no difference, whatever order their columns came in
+def buildTableDefinition(tableDetails, ignoreDetails = []):
+    constraints = tableDetails.get('constraints')
+
+    return { tempCol.get('COLUMN_NAME'): formatColumnToDisplay(tempCol, constraints.get(tempCol.get('COLUMN_NAME'), []), ignoreDetails = ignoreDetails) for tempCol in tableDetails.get('columns') }
+# buildTableDefinition
+
+# diffTableDetails
+# @params db1TableDetails, db2TableDetails -> Tables of the snapshots, of loadSchema
+# @returns List of (Column, In DB1, In DB2) of the differing columns, empty for identical tables
+def diffTableDetails(db1TableDetails, db2TableDetails, ignoreDetails):
     printData = []
 
-    # Iterate DB1 Columns to Compare
-    for db1Col in db1Columns:
-        db1ColName = db1Col.get('COLUMN_NAME')
-        db1ColConstraints = db1TblConstraints[db1ColName] if db1ColName in db1TblConstraints else []
-        db1ColDispFormat = formatColumnToDisplay(db1Col, db1ColConstraints, ignoreDetails = ignoreDetails)
-        db2Col = None
-
-        # Check if column is present in db2.table
-        for tempDb2Col in db2Columns:
-            if tempDb2Col.get('COLUMN_NAME') == db1ColName:
-                db2Col = tempDb2Col
-                break
-        # Check if column is present in db2.table
-
-        if db2Col:
-            db2ColName = db2Col.get('COLUMN_NAME')
-            db2ColConstraints = db2TblConstraints[db2ColName] if db2ColName in db2TblConstraints else []
-            db2ColDispFormat = formatColumnToDisplay(db2Col, db2ColConstraints, ignoreDetails = ignoreDetails)
-
-            if db1ColDispFormat != db2ColDispFormat:
-                printData.append((db2ColName, db1ColDispFormat, db2ColDispFormat))
-                areTablesIdentical = False
-        else:
-            printData.append((db1ColName, db1ColDispFormat, 'NOT EXISTS'))
-            areTablesIdentical = False
-    # Iterate DB1 Columns to Compare
-
-    # Iterate DB2 Columns to Compare
-    for db2Col in db2Columns:
-        db2ColName = db2Col.get('COLUMN_NAME')
-        db2ColConstraints = db2TblConstraints[db2ColName] if db2ColName in db2TblConstraints else []
-        db2ColDispFormat = formatColumnToDisplay(db2Col, db2ColConstraints, ignoreDetails = ignoreDetails)
-        db1Col = None
-
-        # Check if column is present in db1.table
-        for tempDb1Col in db1Columns:
-            if tempDb1Col.get('COLUMN_NAME') == db2ColName:
-                db1Col = tempDb1Col
-                break
-        # Check if column is present in db1.table
-
-        if db1Col:
-            pass
-        else:
-            printData.append((db2ColName, 'NOT EXISTS', db2ColDispFormat))
-            areTablesIdentical = False
-    # Iterate DB2 Columns to Compare
+    # Same fingerprint: same columns and constraints, whatever is ignored
+    if db1TableDetails.get('fingerprint') and db1TableDetails.get('fingerprint') == db2TableDetails.get('fingerprint'):
+        addPhaseStats('compare', rows = 1)
+
+        return printData
+
+    with timePhase('compare'):
+        db1Definition = buildTableDefinition(db1TableDetails, ignoreDetails)
+        db2Definition = buildTableDefinition(db2TableDetails, ignoreDetails)
+        areTablesIdentical = db1Definition == db2Definition
+
+        if not areTablesIdentical:
+            # DB1 Columns, missing or different in DB2
+            for colName, db1ColDispFormat in db1Definition.items():
+                if not(colName in db2Definition):
+                    printData.append((colName, db1ColDispFormat, 'NOT EXISTS'))
+                elif db1ColDispFormat != db2Definition[colName]:
+                    printData.append((colName, db1ColDispFormat, db2Definition[colName]))
 
-    if not areTablesIdentical:
-        printInTableFormat(printHeader, printData, title = tableName)
+            # DB2 Columns, missing in DB1
+            for colName, db2ColDispFormat in db2Definition.items():
+                if not(colName in db1Definition):
+                    printData.append((colName, 'NOT EXISTS', db2ColDispFormat))
 
-    return areTablesIdentical
+    addPhaseStats('compare', rows = 1)
+
+    return printData
+# diffTableDetails
+
+# compareTableDetails
+# @params db1TableDetails, db2TableDetails -> Tables of the snapshots, of loadSchema
+def compareTableDetails(db1TableDetails, db2TableDetails, ignoreDetails, tableName):
+    global outputFormat
+
+    printData = diffTableDetails(db1TableDetails, db2TableDetails, ignoreDetails)
+
+    if len(printData) == 0:
+        pass
+    elif outputFormat == 'table':
+        printInTableFormat(['Column', 'In DB1', 'In DB2'], printData, title = tableName)
+    else:
+        writeColumnRecords(tableName, printData)
+
+    return len(printData) == 0
 # compareTableDetails
 
 # compareDBs
-def compareDBs(db1, db2, ignoreDetails = []):
-    global LOGGER, DB1_CONN, DB2_CONN
-    tablesListQuery = 'SELECT TABLE_NAME FROM information_schema.tables WHERE TABLE_SCHEMA = %(database)s'
+# @params db1Schema, db2Schema -> Snapshots, of loadSchema
+# @returns True if the Databases are Identical
+def compareDBs(db1Schema, db2Schema, ignoreDetails = []):
+    global LOGGER, outputFormat
 
-    db1Tables = runQuery(DB1_CONN, tablesListQuery, params = { 'database': db1 }, toList = 'TABLE_NAME')
-    db2Tables = runQuery(DB2_CONN, tablesListQuery, params = { 'database': db2 }, toList = 'TABLE_NAME')
+    # Dicts: membership is a lookup, not a scan of the list
+    db1Tables = db1Schema.get('tables')
+    db2Tables = db2Schema.get('tables')
 
     tablesNoInDb1 = []
     tablesNoInDb2 = []
@@ -335,7 +713,7 @@ def compareDBs(db1, db2, ignoreDetails = []):
 
     if noMissingTables:
         LOGGER.info('All Tables are present in both the Databases.')
-    else:
+    elif outputFormat == 'table':
         printInTableFormat([
             'Tables Not presented in DB1',
             'Tables Not presented in DB2'
@@ -343,6 +721,12 @@ def compareDBs(db1, db2, ignoreDetails = []):
             ', '.join(tablesNoInDb1),
             ', '.join(tablesNoInDb2)
         )])
+    else:
+        for tableName in tablesNoInDb1:
+            writeOutputRecord({ 'type': 'table', 'table': tableName, 'db1': None, 'db2': 'EXISTS' })
+
+        for tableName in tablesNoInDb2:
+            writeOutputRecord({ 'type': 'table', 'table': tableName, 'db1': 'EXISTS', 'db2': None })
 
     commonTablesCount = len(commonTables)
     identicalTablesCount = 0
@@ -355,11 +739,11 @@ def compareDBs(db1, db2, ignoreDetails = []):
                 LOGGER.info('There is a Table present in both the Databases. Comparing the Table...')
 
         # Empty print for log readability
-        print('')
+        printBlankLine()
 
         # Iterate Tables to Compare
         for tableName in commonTables:
-            areTablesIdentical = compareTableDetails(db1, db2, ignoreDetails, tableName)
+            areTablesIdentical = compareTableDetails(db1Tables[tableName], db2Tables[tableName], ignoreDetails, tableName)
 
             if areTablesIdentical:
                 LOGGER.info(f'{tableName} Tables Details in both the Database are same.')
@@ -369,17 +753,234 @@ def compareDBs(db1, db2, ignoreDetails = []):
         if noMissingTables:
             if commonTablesCount == identicalTablesCount:
                 LOGGER.info('Hooray! Both the Databases are Identical.')
-
-                return True
     else:
         LOGGER.info('There are no Identical Tables between both the Databases!')
-        quit()
+
+    areDBsIdentical = noMissingTables and commonTablesCount == identicalTablesCount
+
+    writeSummary({
+        'identical': areDBsIdentical,
+        'commonTables': commonTablesCount,
+        'identicalTables': identicalTablesCount,
+        'tablesNotInDb1': len(tablesNoInDb1),
+        'tablesNotInDb2': len(tablesNoInDb2),
+    })
+
+    return areDBsIdentical
 # compareDBs
 
+# loadInventory
+# JSON, YAML: A list of targets, or an object with the list in "targets". CSV: A target per row
+# @params defaultConfig -> user, password, port of the targets that leave them out
+# @returns List of { label, host, port, db, user, password }
+def loadInventory(inventoryPath, defaultConfig):
+    if inventoryPath.lower().endswith('.csv'):
+        with open(inventoryPath, 'r', newline = '') as fpInventory:
+            rawTargets = list(csv.DictReader(fpInventory))
+    elif inventoryPath.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise Exception('YAML inventories require PyYAML: pip install pyyaml')
+
+        with open(inventoryPath, 'r') as fpInventory:
+            rawTargets = yaml.safe_load(fpInventory)
+    else:
+        with open(inventoryPath, 'r') as fpInventory:
+            rawTargets = json.load(fpInventory)
+
+    if isinstance(rawTargets, dict):
+        rawTargets = rawTargets.get('targets', [])
+
+    targets = []
+
+    for rawTarget in rawTargets:
+        if not rawTarget.get('db'):
+            raise Exception(f'Target {len(targets) + 1} of {inventoryPath} has no db')
+
+        target = { tempKey: rawTarget.get(tempKey) or defaultConfig.get(tempKey) for tempKey in [ 'host', 'port', 'user', 'password' ] }
+        target['db'] = rawTarget.get('db')
+        target['label'] = target.get('db') if isSnapshotPath(target.get('db')) else str(target.get('host')) + ':' + str(target.get('port')) + '/' + target.get('db')
+
+        targets.append(target)
+
+    return targets
+# loadInventory
+
+# introspectHost
+# Runs in a -fleet thread: Loads the schemas of the targets of a host one after the other, over one connection
+# @returns List of (target, schema, error)
+def introspectHost(hostTargets):
+    global compressProtocol
+
+    results = []
+    dbConn = None
+    hostError = None
+
+    for target in hostTargets:
+        if hostError:
+            results.append((target, None, hostError))
+
+            continue
+
+        try:
+            if dbConn is None and not isSnapshotPath(target.get('db')):
+                try:
+                    with timePhase('connect'):
+                        # No database: The connection serves every database of the host
+                        dbConn = mysql.connector.connect(
+                            host = target.get('host'),
+                            port = target.get('port'),
+                            user = target.get('user'),
+                            password = target.get('password'),
+                            compress = compressProtocol,
+                            use_pure = False,
+                        )
+                except Exception as e:
+                    # The rest of the targets of the host can't connect either
+                    hostError = str(e)
+                    raise
+
+            results.append((target, loadSchema(target.get('label'), target.get('db'), dbConn, target), None))
+        except Exception as e:
+            results.append((target, None, str(e)))
+
+    if dbConn:
+        dbConn.close()
+
+    return results
+# introspectHost
+
+# diffSchemas
+# Drift of a target from the reference. Hashable: Targets with the same drift are grouped by it
+# @returns (Tables missing in the target, Tables only in the target, ((tableName, (Column, In Reference, In Target), ...), ...))
+def diffSchemas(referenceSchema, targetSchema, ignoreDetails = []):
+    referenceTables = referenceSchema.get('tables')
+    targetTables = targetSchema.get('tables')
+    tableDrifts = []
+
+    for tableName in referenceTables:
+        if tableName in targetTables:
+            printData = diffTableDetails(referenceTables[tableName], targetTables[tableName], ignoreDetails)
+
+            if len(printData) > 0:
+                tableDrifts.append((tableName, tuple(printData)))
+
+    return (
+        tuple([ tableName for tableName in referenceTables if not(tableName in targetTables) ]),
+        tuple([ tableName for tableName in targetTables if not(tableName in referenceTables) ]),
+        tuple(tableDrifts),
+    )
+# diffSchemas
+
+# fleetCompareDBs
+# Compares the reference with every target of the inventory in one report, a section per distinct drift instead of one per target
+# @returns True if every target is identical to the reference
+def fleetCompareDBs(referenceSchema, inventoryPath, defaultConfig, ignoreDetails = [], fleetWorkers = FLEET_WORKERS):
+    global LOGGER, outputFormat
+
+    targets = loadInventory(inventoryPath, defaultConfig)
+
+    # Host -> Targets, the targets of a host share its connection. A snapshot file is a host of its own
+    hostTargets = {}
+
+    for target in targets:
+        hostKey = (target.get('db'),) if isSnapshotPath(target.get('db')) else (target.get('host'), str(target.get('port')), target.get('user'), target.get('password'))
+        hostTargets.setdefault(hostKey, []).append(target)
+
+    LOGGER.info(f'Comparing {len(targets)} targets on {len(hostTargets)} hosts with ' + referenceSchema.get('database') + f', {fleetWorkers} hosts at a time...')
+
+    # Drift -> Target labels, in the inventory order
+    driftTargets = {}
+    failedTargets = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = fleetWorkers) as executor:
+        for hostResults in executor.map(introspectHost, hostTargets.values()):
+            for (target, targetSchema, error) in hostResults:
+                if error:
+                    failedTargets.append((target.get('label'), error))
+                else:
+                    driftTargets.setdefault(diffSchemas(referenceSchema, targetSchema, ignoreDetails), []).append(target.get('label'))
+
+    # Empty print for log readability
+    printBlankLine()
+
+    noDrift = ((), (), ())
+    identicalTargets = driftTargets.pop(noDrift, [])
+    # Most common drift first
+    drifts = sorted(driftTargets.items(), key = lambda driftItem: -len(driftItem[1]))
+
+    summaryData = [ ('None', str(len(identicalTargets)), ', '.join(identicalTargets)) ] if len(identicalTargets) > 0 else []
+
+    for driftIndex, (drift, driftLabels) in enumerate(drifts, start = 1):
+        summaryData.append((f'Drift {driftIndex}', str(len(driftLabels)), ', '.join(driftLabels)))
+
+    if len(failedTargets) > 0:
+        summaryData.append(('Failed', str(len(failedTargets)), ', '.join([ label for (label, error) in failedTargets ])))
+
+    if outputFormat == 'table':
+        printInTableFormat(['Drift', 'Targets', 'Target List'], summaryData, title = 'Compared with ' + referenceSchema.get('database'))
+
+    for driftIndex, ((tablesNotInTarget, tablesOnlyInTarget, tableDrifts), driftLabels) in enumerate(drifts, start = 1):
+        LOGGER.info(f'Drift {driftIndex}, in {len(driftLabels)} targets: ' + ', '.join(driftLabels))
+
+        # Empty print for log readability
+        printBlankLine()
+
+        if outputFormat != 'table':
+            for tableName in tablesNotInTarget:
+                writeOutputRecord({ 'type': 'table', 'table': tableName, 'db1': 'EXISTS', 'db2': None, 'drift': driftIndex, 'targets': driftLabels })
+
+            for tableName in tablesOnlyInTarget:
+                writeOutputRecord({ 'type': 'table', 'table': tableName, 'db1': None, 'db2': 'EXISTS', 'drift': driftIndex, 'targets': driftLabels })
+
+            for (tableName, printData) in tableDrifts:
+                writeColumnRecords(tableName, printData, drift = driftIndex, targets = driftLabels)
+        elif len(tablesNotInTarget) > 0 or len(tablesOnlyInTarget) > 0:
+            printInTableFormat([
+                'Tables Not presented in Targets',
+                'Tables Only presented in Targets'
+            ], [(
+                ', '.join(tablesNotInTarget),
+                ', '.join(tablesOnlyInTarget)
+            )], title = f'Drift {driftIndex}')
+
+        if outputFormat == 'table':
+            for (tableName, printData) in tableDrifts:
+                printInTableFormat(['Column', 'In Reference', 'In Targets'], printData, title = f'Drift {driftIndex}: {tableName}')
+
+    if len(failedTargets) == 0:
+        pass
+    elif outputFormat == 'table':
+        printInTableFormat(['Target', 'Error'], failedTargets, title = 'Failed')
+    else:
+        for (label, error) in failedTargets:
+            writeOutputRecord({ 'type': 'error', 'targets': [ label ], 'error': error })
+
+    areTargetsIdentical = len(drifts) == 0 and len(failedTargets) == 0
+
+    if areTargetsIdentical:
+        LOGGER.info(f'Hooray! All the {len(targets)} targets are Identical to the reference.')
+    else:
+        LOGGER.info(str(len(targets) - len(identicalTargets) - len(failedTargets)) + f' of {len(targets)} targets drift from the reference, in {len(drifts)} distinct ways' + (f', {len(failedTargets)} failed' if len(failedTargets) > 0 else ''))
+
+    writeSummary({
+        'identical': areTargetsIdentical,
+        'targets': len(targets),
+        'identicalTargets': len(identicalTargets),
+        'drifts': len(drifts),
+        'failedTargets': len(failedTargets),
+    })
+
+    return areTargetsIdentical
+# fleetCompareDBs
+
 # main
 def main():
     try:
-        global LOGGER, DB_CONFIG_FILE_PATH
+        global LOGGER, DB_CONFIG_FILE_PATH, PROFILE_FILE_PATH, DB1_CONN, DB2_CONN, DB1_CONFIG, DB2_CONFIG, compressProtocol, schemaCacheDir, refreshCache, outputFormat, quietMode
+
+        startTime = time.perf_counter()
 
         initLogger()
 
@@ -390,28 +991,71 @@ def main():
         ignore = args.ignore
         config = args.config
 
-        if db1 and db2:
+        if db1 and (db2 or args.export or args.fleet):
             if config:
                 DB_CONFIG_FILE_PATH = config
 
-            initDBConn(db1, db2)
+            if args.profileFile:
+                PROFILE_FILE_PATH = args.profileFile
 
-            if ignore:
-                ignore = [ tempIgnoreVal.strip() for tempIgnoreVal in ignore.split(',') ]
-            else:
-                ignore = []
+            compressProtocol = args.compress
+            schemaCacheDir = args.cacheDir
+            refreshCache = args.refresh
+            outputFormat = args.output or 'table'
+            quietMode = args.quiet
+
+            # Warnings and errors only, the summary is written by writeSummary
+            if quietMode:
+                LOGGER.setLevel(logging.WARNING)
+
+            profiler = startProfiler(args.profile)
+            # Export has nothing to differ
+            areIdentical = True
+
+            try:
+                # Snapshot files are not connected to
+                liveDb1 = None if isSnapshotPath(db1) else db1
+                liveDb2 = None if args.export or args.fleet or isSnapshotPath(db2) else db2
+
+                # -fleet: The config holds the default credentials of the targets
+                if liveDb1 or liveDb2 or args.fleet:
+                    initDBConn(liveDb1, liveDb2)
+
+                if ignore:
+                    ignore = [ tempIgnoreVal.strip() for tempIgnoreVal in ignore.split(',') ]
+                else:
+                    ignore = []
+
+                # Empty print for log readability
+                printBlankLine()
+
+                db1Schema = loadSchema('DB1', db1, DB1_CONN, DB1_CONFIG)
+
+                if args.export:
+                    writeSnapshot(args.export, db1Schema)
+
+                    LOGGER.info(str(len(db1Schema.get('tables'))) + ' tables of ' + db1Schema.get('database') + ' are exported to ' + args.export)
+                elif args.fleet:
+                    areIdentical = fleetCompareDBs(db1Schema, args.fleet, DB2_CONFIG or DB1_CONFIG or {}, ignoreDetails = ignore, fleetWorkers = args.workers or FLEET_WORKERS)
+                else:
+                    db2Schema = loadSchema('DB2', db2, DB2_CONN, DB2_CONFIG)
+
+                    areIdentical = compareDBs(db1Schema, db2Schema, ignoreDetails = ignore)
+            finally:
+                finishOutput()
+                stopProfiler(args.profile, profiler)
 
-            # Empty print for log readability
-            print('')
+                if args.stats:
+                    reportStats(args.stats, time.perf_counter() - startTime)
 
-            compareDBs(db1, db2, ignoreDetails = ignore)
+            exitRun(EXIT_IDENTICAL if areIdentical else EXIT_DIFFERENT)
         else:
-            LOGGER.error('Invalid Arguments! Arguments: db1, db2 are required')
-            quit()
+            LOGGER.error('Invalid Arguments! Arguments: db1, db2 (or export, fleet) are required')
+            exitRun(EXIT_ERROR)
     except Exception as e:
-        print('Error occurred:')
+        print('Error occurred:', file = sys.stderr)
         traceback.print_exc()
-        quit()
+        exitRun(EXIT_ERROR)
 # main
 
 if __name__ == '__main__':
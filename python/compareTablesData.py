@@ -1,19 +1,112 @@
 '''
 Install Dependencies:
-    - pip install mysql-connector-python pandas XlsxWriter
+    - pip install mysql-connector-python XlsxWriter
+    - pip install pyarrow (Optional: Only for -format parquet)
+    - pip install pyyaml (Optional: Only for YAML -manifest files)
+    - pip install pandas (Optional: Only for -engine numpy)
 '''
 
-import mysql.connector, logging, traceback, argparse, configparser, os
+import mysql.connector, logging, traceback, argparse, configparser, os, collections, csv, multiprocessing, queue, threading, hashlib, operator, pickle, time, sqlite3, json, datetime, decimal, tempfile, math, contextlib, sys, cProfile, tracemalloc, re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Final
-import pandas
 
 DB_CONFIG_FILE_PATH = 'db.config'
-resultExcelFileName: Final = 'Missing Data.xlsx'
+CHECKPOINT_FILE_PATH = 'compareTablesData.checkpoint'
+BATCH_SUMMARY_FILE_PATH = 'Batch Summary.csv'
+PROFILE_FILE_PATH = 'compareTablesData.profile'
+COMPARE_MODES: Final = ['hash', 'merge', 'checksum', 'grace', 'estimate']
+# Rows per fetchmany, when the table size is not known
+FETCH_BATCH_SIZE: Final = 10000
+MIN_FETCH_BATCH_SIZE: Final = 500
+MAX_FETCH_BATCH_SIZE: Final = 200000
+# fetchmany sets read ahead of the row formatting, per table
+FETCH_QUEUE_SIZE: Final = 4
+# Memory a fetched row takes as Python values, relative to its AVG_ROW_LENGTH
+ROW_MEMORY_FACTOR: Final = 5
+# Bytes per row fingerprint
+ROW_DIGEST_SIZE: Final = 16
+ROW_DIGEST_HASHER: Final = hashlib.blake2b(digest_size = ROW_DIGEST_SIZE)
+DIFF_ENGINES: Final = ['python', 'numpy']
+# -engine numpy: 64 bit lanes of a row fingerprint, as (hash_array key of text values, salt of integer values)
+VECTOR_HASH_LANES: Final = [ ('a3f1c09e5b7d2864', 0x0), ('6e2b8d4f1a9c7053', 0x9e3779b97f4a7c15) ]
+VECTOR_NULL_HASH: Final = 0xffffffffffffffff
+VECTOR_HASH_PRIME: Final = 0x100000001b3
+# Keys per WHERE key IN (...) query, when fetching the full missing rows
+MATERIALIZE_BATCH_SIZE: Final = 1000
+# Minimum seconds between two checkpoint saves
+CHECKPOINT_INTERVAL: Final = 30
+# Rows buffered per Parquet row group
+PARQUET_ROW_GROUP_SIZE: Final = 50000
+# Rows per Excel sheet, including its header
+XLSX_MAX_ROWS: Final = 1048576
+# Digest bytes each grace mode partitioning level picks the bucket by, every level uses the next bytes
+SPILL_LEVEL_DIGEST_BYTES: Final = 4
+# Most bucket files per partitioning
+SPILL_MAX_BUCKETS: Final = 256
+# Memory a bucket takes while it is diffed, relative to its size on disk
+SPILL_MEMORY_FACTOR: Final = 12
+# Values a 64 bit row hash can take
+ROW_HASH_SPACE: Final = 2 ** 64
+# z of a 95% confidence interval
+CONFIDENCE_Z: Final = 1.96
+# -sample: Blocks the key range is split into, the sampled ones are spread over the range
+SAMPLE_KEY_BLOCKS: Final = 1000
+# Keys per chunk whose signatures and result are kept in the digest store
+DIGEST_STORE_CHUNK_KEYS: Final = 100000
+# Chunks of the digest store per run, wider chunks are used for a Key range that needs more
+DIGEST_STORE_MAX_CHUNKS: Final = 10000
+# Column types whose ORDER BY must be forced to byte order, so MySQL sorts them exactly like Python compares them
+STRING_DATA_TYPES: Final = ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext', 'enum', 'set')
+INTEGER_DATA_TYPES: Final = ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint')
+# -timeColumn types, integer columns hold Unix timestamps
+TIME_DATA_TYPES: Final = ('date', 'datetime', 'timestamp')
+# -since, -until relative to now: Unit -> timedelta argument
+RELATIVE_TIME_UNITS: Final = { 's': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks' }
+# EXPLAIN access types that read the whole table or index
+FULL_SCAN_ACCESS_TYPES: Final = ('ALL', 'index')
+# Leading columns of a Missing Data row, and of a -keyed changes row
+MISSING_LABEL_COLUMNS: Final = [ 'Missing In', 'Present In' ]
+CHANGE_LABEL_COLUMNS: Final = [ 'Change' ]
+# Columns a -keyed changes row has before the table columns, set on Updated rows
+CHANGE_COLUMNS: Final = [ 'Changed Columns', 'Before' ]
+CHANGES: Final = [ 'Inserted', 'Deleted', 'Updated' ]
+# Lines of the tracemalloc profile, largest allocations first
+PROFILE_TOP_ALLOCATIONS: Final = 50
 
 LOGGER = None
 DB_CONN = None
+# Connections of a -workers process, one per table, or the error opening them
+WORKER_DB_CONN = None
 tables = None
 columnsToCompare = None
+keyColumns = None
+chunkSize = 1000
+workers = 1
+# Arguments a checkpoint must have been saved with, to be resumed
+runSignature = None
+resumeRun = False
+lastCheckpointTime = 0
+digestStorePath = None
+watermarkColumn = None
+resultFormat = 'csv'
+# Missing Data file path, without its extension
+resultFilePrefix = 'Missing Data'
+# Outcome of the last comparison: { identical, missingRows, resultFile }
+runSummary = None
+# MB
+memoryBudget = 1024
+spillDir = None
+sketchSize = 16384
+# %
+samplePercent = 100
+compressProtocol = False
+keyedDiff = False
+diffEngine = 'python'
+# MB, per table
+fetchMemory = 64
+# Phase -> { seconds, rows, bytes }, summed over the fetch threads and the worker processes
+phaseStats = {}
+phaseStatsLock = threading.Lock()
 
 # initLogger
 def initLogger():
@@ -30,19 +123,231 @@ def getCmdArgs():
 
     argumentParser.add_argument('-table1', help = 'Table - 1: Should be db.table format')
     argumentParser.add_argument('-table2', help = 'Table - 2: Should be db.table format')
+    argumentParser.add_argument('-tables', nargs = '+', help = 'Any number of Tables to compare in hash, grace, estimate modes, instead of -table1, -table2: Should be db.table format. Table N connects with the DBN section of the config file')
 
     argumentParser.add_argument('-cols', help = 'Columns to compare - Comma separated values')
+    argumentParser.add_argument('-where', help = 'SQL condition every table is filtered by, in every query. Checked by EXPLAIN, a condition no index can serve is warned about')
+    argumentParser.add_argument('-timeColumn', help = 'DATE, DATETIME, TIMESTAMP or Unix timestamp integer column that -since, -until filter by')
+    argumentParser.add_argument('-since', help = 'Compare the rows whose -timeColumn is at or after this time: YYYY-MM-DD[ HH:MM:SS], or relative to now: <number>s|m|h|d|w (eg: 1d)')
+    argumentParser.add_argument('-until', help = 'Compare the rows whose -timeColumn is before this time, same format as -since')
+
+    argumentParser.add_argument('-mode', choices = COMPARE_MODES, default = 'hash', help = 'hash: Load both tables and diff them in memory (default). merge: Stream both tables ordered by key and merge-join them in a single pass. checksum: Checksum key ranges in MySQL and fetch only the ranges that differ. grace: Partition the rows into bucket files on disk and diff them a bucket at a time, for tables larger than memory that have no key. estimate: Estimate the similarity and the missing rows from a sketch of each table, without fetching the rows')
+    argumentParser.add_argument('-key', help = 'Key columns to order and join rows by in merge, checksum modes - Comma separated values. Defaults to the Primary Key of table1')
+    argumentParser.add_argument('-keyed', action = 'store_true', help = 'hash, merge, checksum modes, 2 tables: Report the rows joined by Key as Inserted (only in table2), Deleted (only in table1) or Updated with their changed columns, instead of missing from each side')
+    argumentParser.add_argument('-chunkSize', type = int, default = 1000, help = 'checksum mode: Key ranges are split until they hold at most this many rows, before the rows are fetched')
+    argumentParser.add_argument('-engine', choices = DIFF_ENGINES, default = 'python', help = 'hash mode: python: Fingerprint every row on its own (default). numpy: Fingerprint every fetched set column by column and diff sorted arrays, with pandas. Integer columns are hashed as numbers and the others by their text, so tables whose column types differ are compared by the values\' text')
+    argumentParser.add_argument('-workers', type = int, default = 1, help = 'hash mode: Split the key range into this many parts and fetch, diff them in parallel worker processes. -manifest: Entries compared at the same time')
+
+    argumentParser.add_argument('-manifest', help = 'Compare every entry of a JSON, YAML or CSV manifest in one run, instead of -table1, -table2. Entry keys: tables (or table1, table2), cols, key, mode, where, timeColumn, since, until, format. -where, -timeColumn, -since, -until apply to the entries without their own')
+    argumentParser.add_argument('-summary', help = f'-manifest: Path to the summary CSV. Default: {BATCH_SUMMARY_FILE_PATH}')
+
+    argumentParser.add_argument('-memoryBudget', type = int, default = 1024, help = 'grace mode: MB of memory a bucket may take while it is diffed, buckets above it are partitioned again')
+    argumentParser.add_argument('-spillDir', help = 'grace mode: Directory to write the bucket files in. Default: The system temp directory')
+
+    argumentParser.add_argument('-sketchSize', type = int, default = 16384, help = 'estimate mode: Row hashes kept per table, the error shrinks with its square root')
+    argumentParser.add_argument('-sample', type = int, default = 100, help = 'estimate mode: Percent of the rows to sketch. With a single integer Key, blocks of the key range spread over it are sketched, only their rows are read. Otherwise rows are picked by their content, which still reads every row')
+
+    argumentParser.add_argument('-digestStore', help = 'checksum mode: Path to a SQLite file keeping per chunk signatures and results, chunks unchanged since the last run are not compared again')
+    argumentParser.add_argument('-watermark', help = 'checksum mode with -digestStore: Column updated on every change (eg: updated_at), chunks are then checked by row count and its highest value instead of a checksum')
+
+    argumentParser.add_argument('-compress', action = 'store_true', help = 'Compress the MySQL protocol, for servers behind a slow link. Costs CPU on both ends')
+    argumentParser.add_argument('-fetchMemory', type = int, default = 64, help = 'MB of fetched rows to hold per table while reading ahead of the comparison, fetchmany sets are sized to it by the average row length of the table')
+
+    argumentParser.add_argument('-format', choices = ['csv', 'jsonl', 'parquet', 'xlsx'], help = 'Format of the Missing Data file, rows are written to it as they are found. Default: xlsx in hash mode, csv in merge, checksum modes. merge, checksum modes can only resume csv, jsonl files')
+
+    argumentParser.add_argument('-resume', action = 'store_true', help = 'Continue merge, checksum modes and -workers runs from their last checkpoint')
+    argumentParser.add_argument('-checkpoint', help = f'Path to the checkpoint file. Default: {CHECKPOINT_FILE_PATH}')
+
+    argumentParser.add_argument('-stats', choices = ['log', 'json'], help = 'Report the time, rows and bytes of every phase (connect, query, fetch, digest, diff, spill, write) with the peak RSS when done. log: In the log. json: A JSON object on stdout')
+    argumentParser.add_argument('-profile', choices = ['cprofile', 'tracemalloc'], help = 'cprofile: Dump the CPU profile, to be read by python -m pstats. tracemalloc: Dump the largest allocations by source line. Worker processes are not profiled')
+    argumentParser.add_argument('-profileFile', help = f'Path to the -profile dump. Default: {PROFILE_FILE_PATH}')
 
     argumentParser.add_argument('-config', help = 'Path to Config file: Should follows format: https://docs.python.org/3/library/configparser.html#quick-start')
 
     return argumentParser.parse_args()
 # getCmdArgs
 
-# initDBConn
-def initDBConn():
-    global tables, DB_CONN, DB_CONFIG_FILE_PATH, LOGGER
+# addPhaseStats
+def addPhaseStats(phase, seconds = 0, rows = 0, size = 0):
+    global phaseStats, phaseStatsLock
+
+    with phaseStatsLock:
+        tempStats = phaseStats.setdefault(phase, { 'seconds': 0, 'rows': 0, 'bytes': 0 })
+        tempStats['seconds'] += seconds
+        tempStats['rows'] += rows
+        tempStats['bytes'] += size
+# addPhaseStats
+
+# timePhase
+# Adds the time spent in the with block to the phase
+@contextlib.contextmanager
+def timePhase(phase):
+    startTime = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        addPhaseStats(phase, seconds = time.perf_counter() - startTime)
+# timePhase
+
+# takePhaseStats
+# Hands the phase stats of a worker process over to the parent, and starts counting again for the next task
+def takePhaseStats():
+    global phaseStats, phaseStatsLock
+
+    with phaseStatsLock:
+        tempStats = phaseStats
+        phaseStats = {}
+
+    return tempStats
+# takePhaseStats
+
+# mergePhaseStats
+def mergePhaseStats(workerStats):
+    for phase, tempStats in workerStats.items():
+        addPhaseStats(phase, seconds = tempStats.get('seconds'), rows = tempStats.get('rows'), size = tempStats.get('bytes'))
+# mergePhaseStats
+
+# getPeakRss
+# Bytes, of this process or of its largest worker process. None where the resource module is not available (Windows)
+def getPeakRss():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peakRss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # ru_maxrss is in bytes on macOS, in KB elsewhere
+    return peakRss if sys.platform == 'darwin' else peakRss * 1024
+# getPeakRss
+
+# reportStats
+def reportStats(statsFormat, totalSeconds):
+    global LOGGER, phaseStats, runSummary
+
+    peakRss = getPeakRss()
+    stats = { 'seconds': round(totalSeconds, 3), 'peakRssBytes': peakRss, 'phases': {}, 'result': runSummary }
+
+    for phase, tempStats in phaseStats.items():
+        phaseSeconds = tempStats.get('seconds')
+
+        stats['phases'][phase] = {
+            'seconds': round(phaseSeconds, 3),
+            'rows': tempStats.get('rows'),
+            'bytes': tempStats.get('bytes'),
+            'rowsPerSecond': round(tempStats.get('rows') / phaseSeconds) if phaseSeconds > 0 else None,
+            'bytesPerSecond': round(tempStats.get('bytes') / phaseSeconds) if phaseSeconds > 0 else None,
+        }
+
+    if statsFormat == 'json':
+        print(json.dumps(stats, default = toJsonValue))
+
+        return
+
+    for phase, tempStats in stats.get('phases').items():
+        phaseText = f'{phase}: ' + '{:.2f}'.format(tempStats.get('seconds')) + 's'
+
+        if tempStats.get('rows') > 0:
+            phaseText += ', ' + str(tempStats.get('rows')) + ' rows' + (', ' + str(tempStats.get('rowsPerSecond')) + ' rows/s' if tempStats.get('rowsPerSecond') is not None else '')
+
+        if tempStats.get('bytes') > 0:
+            phaseText += ', ' + '{:.1f}'.format(tempStats.get('bytes') / 1024 / 1024) + ' MB' + (', ' + '{:.1f}'.format(tempStats.get('bytesPerSecond') / 1024 / 1024) + ' MB/s' if tempStats.get('bytesPerSecond') is not None else '')
+
+        LOGGER.info(phaseText)
+
+    LOGGER.info('Took ' + '{:.2f}'.format(totalSeconds) + 's' + (', Peak RSS: ' + '{:.1f}'.format(peakRss / 1024 / 1024) + ' MB' if peakRss else '') + '. Phase times are summed over the threads and worker processes, they may add up to more than that')
+# reportStats
+
+# startProfiler
+# @returns The cProfile.Profile of cprofile, None otherwise
+def startProfiler(profileKind):
+    if profileKind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        return profiler
+    elif profileKind == 'tracemalloc':
+        tracemalloc.start()
+
+    return None
+# startProfiler
+
+# stopProfiler
+def stopProfiler(profileKind, profiler):
+    global LOGGER, PROFILE_FILE_PATH
+
+    if profileKind == 'cprofile':
+        profiler.disable()
+        profiler.dump_stats(PROFILE_FILE_PATH)
+
+        LOGGER.info(f'CPU profile can be found in the {PROFILE_FILE_PATH}, view it with: python -m pstats {PROFILE_FILE_PATH}')
+    elif profileKind == 'tracemalloc':
+        # Taken before the tables are released, so the rows they still hold are part of it
+        snapshot = tracemalloc.take_snapshot()
+        (currentBytes, peakBytes) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with open(PROFILE_FILE_PATH, 'w') as fpProfile:
+            fpProfile.write(f'Peak traced memory: {peakBytes} bytes, Still allocated: {currentBytes} bytes\n\n')
+
+            for allocation in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+                fpProfile.write(str(allocation) + '\n')
+
+        LOGGER.info(f'Memory profile can be found in the {PROFILE_FILE_PATH}')
+# stopProfiler
+
+# connectDB
+# use_pure = False picks the C extension when it is installed, it converts the rows in C
+def connectDB(dbConfig):
+    global compressProtocol
+
+    with timePhase('connect'):
+        return mysql.connector.connect(
+            host = dbConfig.get('host'),
+            port = dbConfig.get('port'),
+            database = dbConfig.get('database'),
+            user = dbConfig.get('user'),
+            password = dbConfig.get('password'),
+            compress = compressProtocol,
+            use_pure = False,
+        )
+# connectDB
+
+# runQuery
+def runQuery(dbConn, query, params = {}):
+    with timePhase('query'):
+        dbCursor = dbConn.cursor(dictionary = True)
+        dbCursor.execute(query, params)
+
+        result = dbCursor.fetchall()
+        dbCursor.close()
+
+    addPhaseStats('query', rows = len(result))
+
+    return result
+# runQuery
+
+# runTupleQuery
+# Same as runQuery, with the rows as tuples of the selected columns
+def runTupleQuery(dbConn, query, params = {}):
+    with timePhase('query'):
+        dbCursor = dbConn.cursor()
+        dbCursor.execute(query, params)
+
+        result = dbCursor.fetchall()
+        dbCursor.close()
+
+    addPhaseStats('query', rows = len(result))
+
+    return result
+# runTupleQuery
+
+# readDBConfig
+# @returns None when the section has no credentials
+def readDBConfig(dbSection, dbName):
+    global DB_CONFIG_FILE_PATH
 
-    dbConfigSuccess = True
     defaultDBConfig: Final = {
         'host': '127.0.0.1',
         'port': 3306,
@@ -64,42 +369,56 @@ def initDBConn():
     if dbConfigFileText:
         config.read_string(dbConfigFileText)
 
+    if config.has_section(dbSection) and config.has_option(dbSection, 'DB_USERNAME') and config.has_option(dbSection, 'DB_PASSWORD'):
+        return {
+            'host': config.get(dbSection, 'DB_HOST') if config.has_option(dbSection, 'DB_HOST') else defaultDBConfig.get('host'),
+            'port': config.get(dbSection, 'DB_PORT') if config.has_option(dbSection, 'DB_PORT') else defaultDBConfig.get('port'),
+            'database': dbName,
+            'user': config.get(dbSection, 'DB_USERNAME'),
+            'password': config.get(dbSection, 'DB_PASSWORD'),
+        }
+
+    return None
+# readDBConfig
+
+# initDBConn
+def initDBConn():
+    global tables, DB_CONN, LOGGER
+
+    dbConfigSuccess = True
     i = 1
 
     for table in tables:
-        dbName = table.get('db')
-        DB_CONFIG = None
+        dbSection = f'DB{i}'
+        DB_CONFIG = readDBConfig(dbSection, table.get('db'))
 
         if not DB_CONN:
             DB_CONN = {}
 
-        if not(dbName in DB_CONN):
-            if config.has_section(f'DB{i}') and config.has_option(f'DB{i}', 'DB_USERNAME') and config.has_option(f'DB{i}', 'DB_PASSWORD'):
-                DB_CONFIG = {
-                    'host': config.get(f'DB{i}', 'DB_HOST') if config.has_option(f'DB{i}', 'DB_HOST') else defaultDBConfig.get('host'),
-                    'port': config.get(f'DB{i}', 'DB_PORT') if config.has_option(f'DB{i}', 'DB_PORT') else defaultDBConfig.get('port'),
-                    'database': dbName,
-                    'user': config.get(f'DB{i}', 'DB_USERNAME'),
-                    'password': config.get(f'DB{i}', 'DB_PASSWORD'),
-                }
-
-            if DB_CONFIG:
-                DB_CONN[dbName] = mysql.connector.connect(
-                    host = DB_CONFIG.get('host'),
-                    port = DB_CONFIG.get('port'),
-                    database = dbName,
-                    user = DB_CONFIG.get('user'),
-                    password = DB_CONFIG.get('password'),
-                )
-
-        if not DB_CONFIG:
+        if DB_CONFIG:
+            # Each table gets its own connection, so both tables can be read at the same time
+            # A connection left by an earlier comparison of this process is reused
+            if dbSection in DB_CONN:
+                DB_CONN[dbSection].ping(reconnect = True)
+            else:
+                DB_CONN[dbSection] = connectDB(DB_CONFIG)
+
+            table['dbSection'] = dbSection
+            table['dbConfig'] = DB_CONFIG
+        else:
             LOGGER.error(f'DB{i} credentials not available! Please create a config file and pass the path to file in -config argument, Make sure the config file follows format: https://docs.python.org/3/library/configparser.html#quick-start')
             dbConfigSuccess = False
-        
+
         i += 1
 
     if not dbConfigSuccess:
         quit()
+
+    # Tables of the same name are told apart by their config section
+    tableNames = [ table.get('db') + '.' + table.get('table') for table in tables ]
+
+    for table, tableName in zip(tables, tableNames):
+        table['label'] = tableName if tableNames.count(tableName) == 1 else tableName + ' (' + table.get('dbSection') + ')'
 # initDBConn
 
 # fetchTableColumns
@@ -111,17 +430,31 @@ def fetchTableColumns(table):
 
     columnsQuery = 'SELECT COLUMN_NAME, COLUMN_DEFAULT, IS_NULLABLE, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, CHARACTER_SET_NAME, COLLATION_NAME, COLUMN_COMMENT FROM information_schema.columns WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s ORDER BY ORDINAL_POSITION'
 
-    dbCursor = DB_CONN[database].cursor(dictionary = True)
-    dbCursor.execute(columnsQuery, { 'database': database, 'table': tableName })
-    rawColumns = dbCursor.fetchall()
+    rawColumns = runQuery(DB_CONN[table.get('dbSection')], columnsQuery, { 'database': database, 'table': tableName })
     columns = []
+    columnTypes = {}
 
     if rawColumns and len(rawColumns) > 0:
         columns = [ tempCol.get('COLUMN_NAME') for tempCol in rawColumns ]
 
-    return columns
+        for tempCol in rawColumns:
+            dataType = tempCol.get('DATA_TYPE')
+            columnTypes[ tempCol.get('COLUMN_NAME') ] = dataType.decode() if isinstance(dataType, (bytes, bytearray)) else dataType
+
+    return (columns, columnTypes)
 # fetchTableColumns
 
+# fetchTableKeyColumns
+def fetchTableKeyColumns(table):
+    global DB_CONN
+
+    keyQuery = 'SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s AND CONSTRAINT_NAME = \'PRIMARY\' ORDER BY ORDINAL_POSITION'
+
+    rawKeyColumns = runQuery(DB_CONN[table.get('dbSection')], keyQuery, { 'database': table.get('db'), 'table': table.get('table') })
+
+    return [ tempCol.get('COLUMN_NAME') for tempCol in rawKeyColumns ]
+# fetchTableKeyColumns
+
 # compareTableDefs
 def compareTableDefs():
     global tables, LOGGER, columnsToCompare
@@ -129,7 +462,7 @@ def compareTableDefs():
     LOGGER.info('Fetching Columns...')
 
     for table in tables:
-        table['columns'] = fetchTableColumns(table)
+        (table['columns'], table['columnTypes']) = fetchTableColumns(table)
 
     LOGGER.info('Comparing Columns...')
 
@@ -138,7 +471,7 @@ def compareTableDefs():
     # Iterate tables
     for table1 in tables:
         j = 0
-        table1Name = table1.get('table')
+        table1Name = table1.get('label')
 
         for table2 in tables:
             # Skip same table
@@ -163,7 +496,7 @@ def compareTableDefs():
     i = 0
 
     for table in tables:
-        tableName = table.get('table')
+        tableName = table.get('label')
 
         if 'missingColumns' in table:
             allColumnsMatched = False
@@ -193,196 +526,2333 @@ def compareTableDefs():
     return allColumnsMatched
 # compareTableDefs
 
+# quoteName
+def quoteName(name):
+    return '`' + name.replace('`', '``') + '`'
+# quoteName
+
+# buildSelectQuery
+# @params where -> SQL condition, values should be passed as query params
+# @params orderBy -> List of column names
+# @params selectExpr -> Defaults to the projected columns of the table, if any, otherwise *
+def buildSelectQuery(table, where = None, orderBy = None, selectExpr = None):
+    if not selectExpr:
+        selectExpr = ', '.join([ quoteName(tempCol) for tempCol in table.get('rowColumns') ]) if table.get('rowColumns') else '*'
+
+    query = f'SELECT {selectExpr} FROM ' + quoteName(table.get('db')) + '.' + quoteName(table.get('table'))
+
+    # Filter of the comparison, every query of the table is limited to it
+    if table.get('filter'):
+        where = '(' + table.get('filter') + ')' + (f' AND ({where})' if where else '')
+
+    if where:
+        query += f' WHERE {where}'
+
+    if orderBy:
+        columnTypes = table.get('columnTypes') or {}
+        orderByCols = []
+
+        for tempCol in orderBy:
+            # BINARY makes MySQL sort strings by bytes, which is the order Python compares them in
+            orderByCols.append(('BINARY ' if columnTypes.get(tempCol) in STRING_DATA_TYPES else '') + quoteName(tempCol))
+
+        query += ' ORDER BY ' + ', '.join(orderByCols)
+
+    return query
+# buildSelectQuery
+
+# buildKeyAfterWhere
+# Rows after the given Key, in the same order buildSelectQuery sorts them
+def buildKeyAfterWhere(table, keyCols):
+    columnTypes = table.get('columnTypes') or {}
+    keyExprs = [ ('BINARY ' if columnTypes.get(tempCol) in STRING_DATA_TYPES else '') + quoteName(tempCol) for tempCol in keyCols ]
+
+    if len(keyExprs) == 1:
+        return keyExprs[0] + ' > %s'
+
+    return '(' + ', '.join(keyExprs) + ') > (' + ', '.join([ '%s' ] * len(keyExprs)) + ')'
+# buildKeyAfterWhere
+
+# parseTimeBound
+# @params value -> YYYY-MM-DD[ HH:MM:SS], or <number><unit of RELATIVE_TIME_UNITS> before now
+def parseTimeBound(value, now):
+    relativeMatch = re.fullmatch(r'(\d+)([a-z])', value.strip())
+
+    if relativeMatch and relativeMatch.group(2) in RELATIVE_TIME_UNITS:
+        return now - datetime.timedelta(**{ RELATIVE_TIME_UNITS[relativeMatch.group(2)]: int(relativeMatch.group(1)) })
+
+    boundTime = datetime.datetime.fromisoformat(value.strip())
+
+    # Columns hold local times
+    return boundTime.astimezone().replace(tzinfo = None) if boundTime.tzinfo else boundTime
+# parseTimeBound
+
+# applyTimeWindow
+# Adds -since, -until to the filter of every table as a range on the bare column, so an index starting with it can serve the range
+# Bounds are resolved once and written as constants, both tables get the same window even when NOW() differs between their servers
+def applyTimeWindow(timeColumn, since, until):
+    global tables, LOGGER, DB_CONN
+
+    if not timeColumn:
+        LOGGER.error('-since, -until require -timeColumn!')
+
+        return False
+
+    # Otherwise the whole table would be compared, while a window was asked for
+    if not since and not until:
+        LOGGER.error('-timeColumn requires -since or -until!')
+
+        return False
+
+    now = datetime.datetime.now().replace(microsecond = 0)
+
+    try:
+        timeBounds = [ (parseTimeBound(timeBound, now), boundOperator) for (timeBound, boundOperator) in [ (since, '>='), (until, '<') ] if timeBound ]
+    except ValueError as e:
+        LOGGER.error(f'Invalid -since, -until: {e}')
+
+        return False
+
+    for table in tables:
+        columnType = (table.get('columnTypes') or {}).get(timeColumn)
+
+        if not(columnType in TIME_DATA_TYPES + INTEGER_DATA_TYPES):
+            LOGGER.error(table.get('label') + f': -timeColumn {timeColumn} ' + ('is not a column!' if columnType is None else f'is {columnType}, it should be a date, time or Unix timestamp column!'))
+
+            return False
+
+        timeIndexes = runQuery(DB_CONN[table.get('dbSection')], 'SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s AND COLUMN_NAME = %(column)s AND SEQ_IN_INDEX = 1', { 'database': table.get('db'), 'table': table.get('table'), 'column': timeColumn })
+
+        if len(timeIndexes) == 0:
+            LOGGER.warning(table.get('label') + f': No index starts with {timeColumn}, the time window is found by reading the whole table. An index on ({timeColumn}) would read the window only')
+
+        timeConditions = []
+
+        for (boundTime, boundOperator) in timeBounds:
+            boundValue = str(int(boundTime.timestamp())) if columnType in INTEGER_DATA_TYPES else "'" + boundTime.isoformat(sep = ' ') + "'"
+            timeConditions.append(f'{quoteName(timeColumn)} {boundOperator} {boundValue}')
+
+        table['filter'] = ' AND '.join(([ '(' + table.get('filter') + ')' ] if table.get('filter') else []) + timeConditions)
+
+    LOGGER.info(f'Comparing the rows of {timeColumn} ' + ' and '.join([ boundOperator + ' ' + boundTime.isoformat(sep = ' ') for (boundTime, boundOperator) in timeBounds ]) + '...')
+
+    return True
+# applyTimeWindow
+
+# checkTableFilters
+# EXPLAINs the filtered query of every table, which also rejects an invalid -where before any data is read
+def checkTableFilters():
+    global tables, LOGGER, DB_CONN
+
+    for table in tables:
+        if not table.get('filter'):
+            continue
+
+        try:
+            queryPlans = runQuery(DB_CONN[table.get('dbSection')], 'EXPLAIN ' + buildSelectQuery(table, selectExpr = '*'))
+        except mysql.connector.Error as e:
+            LOGGER.error(table.get('label') + f': Invalid filter ' + table.get('filter') + f': {e}')
+
+            return False
+
+        for queryPlan in queryPlans:
+            if queryPlan.get('type') in FULL_SCAN_ACCESS_TYPES:
+                LOGGER.warning(table.get('label') + ': No index can serve the filter ' + table.get('filter') + ', about ' + str(queryPlan.get('rows')) + ' rows are read by every scan. Compare the bare columns to constants, so an index on them can be used')
+            elif queryPlan.get('key'):
+                LOGGER.info(table.get('label') + ': Filter is served by index ' + str(queryPlan.get('key')) + ', about ' + str(queryPlan.get('rows')) + ' rows')
+
+    return True
+# checkTableFilters
+
+# buildRowConcatExpr
+# NULLs are flagged separately from empty values
+def buildRowConcatExpr(columns):
+    quotedCols = [ quoteName(tempCol) for tempCol in columns ]
+    nullFlags = 'CONCAT(' + ', '.join([ f'ISNULL({tempCol})' for tempCol in quotedCols ]) + ')'
+
+    return 'CONCAT_WS(\'#\', ' + ', '.join(quotedCols) + f', {nullFlags})'
+# buildRowConcatExpr
+
+# buildRowHashExpr
+# First 64 bits of the row's MD5, as an unsigned integer
+def buildRowHashExpr(columns):
+    return 'CAST(CONV(SUBSTRING(MD5(' + buildRowConcatExpr(columns) + '), 1, 16), 16, 10) AS UNSIGNED)'
+# buildRowHashExpr
+
+# buildChecksumQuery
+# Same checksum as pt-table-checksum: XOR of the row hashes
+def buildChecksumQuery(table, columns, where = None):
+    return buildSelectQuery(table, where = where, selectExpr = 'COUNT(*) AS rowCount, COALESCE(BIT_XOR(' + buildRowHashExpr(columns) + '), 0) AS rowsChecksum')
+# buildChecksumQuery
+
+# digestRows
+# Fingerprints every row as a 16 byte BLAKE2b digest of the repr of its compared values, packed back to back
+# repr keeps the types apart (None vs 'None', 1 vs '1') and quotes strings, so values containing separators can't collide
+# Every row is hashed by a copy of ROW_DIGEST_HASHER: copying is cheaper than a new hasher with its parameters parsed again
+def digestRows(rows, columns):
+    getValues = operator.itemgetter(*columns)
+    copyHasher = ROW_DIGEST_HASHER.copy
+    rowDigests = []
+    encodedSize = 0
+
+    with timePhase('digest'):
+        for encodedRow in map(str.encode, map(repr, map(getValues, rows))):
+            rowHasher = copyHasher()
+            rowHasher.update(encodedRow)
+            rowDigests.append(rowHasher.digest())
+            encodedSize += len(encodedRow)
+
+        rowDigests = b''.join(rowDigests)
+
+    addPhaseStats('digest', rows = len(rowDigests) // ROW_DIGEST_SIZE, size = encodedSize)
+
+    return rowDigests
+# digestRows
+
+# importVectorEngine
+def importVectorEngine():
+    try:
+        import numpy, pandas
+    except ImportError:
+        raise Exception('-engine numpy requires pandas: pip install pandas')
+
+    return (numpy, pandas)
+# importVectorEngine
+
+# hashColumnValues
+# 64 bit hash of every value of a column, for each of the VECTOR_HASH_LANES
+# The hash only depends on the value and the column type, never on the other rows of the set
+def hashColumnValues(values, dataType):
+    (numpy, pandas) = importVectorEngine()
+
+    columnValues = numpy.array(values, dtype = object)
+    nullMask = pandas.isna(columnValues)
+
+    if dataType in INTEGER_DATA_TYPES:
+        intValues = numpy.where(nullMask, 0, columnValues)
+
+        try:
+            intValues = intValues.astype(numpy.int64).view(numpy.uint64)
+        except OverflowError:
+            # BIGINT UNSIGNED above the int64 range
+            intValues = intValues.astype(numpy.uint64)
+
+        laneHashes = [ pandas.util.hash_array(intValues ^ numpy.uint64(salt)) for (hashKey, salt) in VECTOR_HASH_LANES ]
+    else:
+        if not(dataType in STRING_DATA_TYPES):
+            columnValues = numpy.array([ str(tempValue) for tempValue in values ], dtype = object)
+
+        laneHashes = [ pandas.util.hash_array(columnValues, hash_key = hashKey, categorize = False) for (hashKey, salt) in VECTOR_HASH_LANES ]
+
+    for laneHash in laneHashes:
+        laneHash[nullMask] = VECTOR_NULL_HASH
+
+    return laneHashes
+# hashColumnValues
+
+# digestRowsVectorized
+# -engine numpy digestRows: a set is hashed a column at a time, and its column hashes are combined per row into the same packed digests
+# @params dataTypes -> DATA_TYPE of each of the columns
+def digestRowsVectorized(rows, columns, dataTypes):
+    (numpy, pandas) = importVectorEngine()
+
+    if len(rows) == 0:
+        return b''
+
+    with timePhase('digest'):
+        rowHashes = [ numpy.zeros(len(rows), dtype = numpy.uint64) for tempLane in VECTOR_HASH_LANES ]
+
+        for tempCol, dataType in zip(columns, dataTypes):
+            for lane, laneHash in enumerate(hashColumnValues(list(map(operator.itemgetter(tempCol), rows)), dataType)):
+                # Wraps around, as a uint64 multiplication does
+                rowHashes[lane] = (rowHashes[lane] * numpy.uint64(VECTOR_HASH_PRIME)) ^ laneHash
+
+        rowDigests = numpy.column_stack(rowHashes).astype('<u8').tobytes()
+
+    addPhaseStats('digest', rows = len(rows))
+
+    return rowDigests
+# digestRowsVectorized
+
+# getCompareIndexes
+# Positions of the compared columns in the tuple rows of the table
+def getCompareIndexes(table, colsToCompare):
+    rowColumns = table.get('rowColumns')
+
+    return [ rowColumns.index(tempCol) for tempCol in (colsToCompare if colsToCompare else rowColumns) ]
+# getCompareIndexes
+
+# getCompareTypes
+def getCompareTypes(table, compareIndexes):
+    columnTypes = table.get('columnTypes') or {}
+
+    return [ columnTypes.get(table.get('rowColumns')[tempIndex]) for tempIndex in compareIndexes ]
+# getCompareTypes
+
+# toRowDicts
+# Tuple rows are turned into dicts only once they are found missing, for the Missing Data writers
+def toRowDicts(rowColumns, rows):
+    return [ dict(zip(rowColumns, row)) for row in rows ]
+# toRowDicts
+
+# iterRowDigests
+def iterRowDigests(rowDigests):
+    rowDigestsView = memoryview(rowDigests)
+
+    for offset in range(0, len(rowDigests), ROW_DIGEST_SIZE):
+        yield rowDigestsView[offset:offset + ROW_DIGEST_SIZE].tobytes()
+# iterRowDigests
+
+# fetchSetsIntoQueue
+# Producer of iterFetchedSets: keeps reading sets until the cursor is drained or the consumer stops
+def fetchSetsIntoQueue(dbCursor, batchSize, fetchedSets, stopFetching):
+    try:
+        while not stopFetching.is_set():
+            with timePhase('fetch'):
+                qResult = dbCursor.fetchmany(batchSize)
+
+            addPhaseStats('fetch', rows = len(qResult))
+            queuedSet = qResult if qResult else None
+
+            putFetchedSet(fetchedSets, stopFetching, queuedSet)
+
+            if queuedSet is None:
+                break
+    except Exception as e:
+        putFetchedSet(fetchedSets, stopFetching, e)
+# fetchSetsIntoQueue
+
+# putFetchedSet
+# Bounded queue: wait for the consumer, but give up once it has stopped
+def putFetchedSet(fetchedSets, stopFetching, queuedSet):
+    while not stopFetching.is_set():
+        try:
+            fetchedSets.put(queuedSet, timeout = 1)
+            break
+        except queue.Full:
+            pass
+# putFetchedSet
+
+# iterFetchedSets
+# Yields fetchmany sets while a background thread is already fetching the next ones
+def iterFetchedSets(dbCursor, batchSize):
+    fetchedSets = queue.Queue(maxsize = FETCH_QUEUE_SIZE)
+    stopFetching = threading.Event()
+    fetchThread = threading.Thread(target = fetchSetsIntoQueue, args = (dbCursor, batchSize, fetchedSets, stopFetching), daemon = True)
+    fetchThread.start()
+
+    try:
+        while True:
+            qResult = fetchedSets.get()
+
+            if qResult is None:
+                break
+
+            if isinstance(qResult, Exception):
+                raise qResult
+
+            yield qResult
+    finally:
+        stopFetching.set()
+        fetchThread.join()
+# iterFetchedSets
+
+# fetchBatchSize
+# Rows per fetchmany, so the sets read ahead of the comparison fit in -fetchMemory
+def fetchBatchSize(table):
+    global DB_CONN, fetchMemory
+
+    tableSizes = runQuery(DB_CONN[table.get('dbSection')], 'SELECT AVG_ROW_LENGTH FROM information_schema.tables WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s', { 'database': table.get('db'), 'table': table.get('table') })
+    avgRowBytes = int(tableSizes[0].get('AVG_ROW_LENGTH') or 0) if len(tableSizes) > 0 else 0
+
+    if avgRowBytes == 0:
+        return FETCH_BATCH_SIZE
+
+    # Sets in the queue, with the one being fetched and the one being formatted
+    return max(MIN_FETCH_BATCH_SIZE, min(MAX_FETCH_BATCH_SIZE, fetchMemory * 1024 * 1024 // (avgRowBytes * ROW_MEMORY_FACTOR * (FETCH_QUEUE_SIZE + 2))))
+# fetchBatchSize
+
 # fetchTableData
+# Rows are kept as tuples of the rowColumns of the table
 def fetchTableData(table):
-    global DB_CONN, LOGGER, columnsToCompare
+    global DB_CONN, LOGGER, columnsToCompare, diffEngine
 
     database = table.get('db')
     tableName = table.get('table')
-    tableColumns = table.get('columns')
-    tempColToCompare = columnsToCompare if columnsToCompare else tableColumns
+    compareIndexes = getCompareIndexes(table, columnsToCompare)
+    compareTypes = getCompareTypes(table, compareIndexes)
+    batchSize = fetchBatchSize(table)
+
+    query = buildSelectQuery(table)
 
-    query = f'SELECT * FROM {database}.{tableName}'
+    dbCursor = DB_CONN[table.get('dbSection')].cursor()
+
+    with timePhase('query'):
+        dbCursor.execute(query)
 
-    dbCursor = DB_CONN[database].cursor(dictionary = True)
-    dbCursor.execute(query)
     rawData = []
-    dataToCompare = []
+    dataToCompare = bytearray()
     i = 0
 
-    while True:
-        qResult = dbCursor.fetchmany(10000)
+    LOGGER.info(f'{database}.{tableName}: Fetching {batchSize} rows per set...')
 
-        if qResult:
-            i += 1
+    for qResult in iterFetchedSets(dbCursor, batchSize):
+        i += 1
 
-            LOGGER.info(f'Set {i} fetched. Formatting Set {i}...')
+        LOGGER.info(f'{database}.{tableName}: Set {i} fetched. Formatting Set {i}...')
 
-            for tempRow in qResult:
-                rowStr = ''
+        if diffEngine == 'numpy':
+            dataToCompare += digestRowsVectorized(qResult, compareIndexes, compareTypes)
+        else:
+            dataToCompare += digestRows(qResult, compareIndexes)
 
-                for tempCol in tempColToCompare:
-                    rowStr += '_____' + str(tempRow.get(tempCol))
+        rawData.extend(qResult)
 
-                dataToCompare.append(rowStr)
+    dbCursor.close()
 
-            rawData.extend(qResult)
-        else:
-            LOGGER.info(f'All records are fetched.')
-            break
+    LOGGER.info(f'{database}.{tableName}: All records are fetched.')
 
     return (rawData, dataToCompare)
 # fetchTableData
 
-# compareTableData
-def compareTableData():
-    global tables, LOGGER, columnsToCompare
+# loadCheckpoint
+# Progress saved by an earlier run with the same arguments, None to start from scratch
+def loadCheckpoint():
+    global LOGGER, CHECKPOINT_FILE_PATH, runSignature, resumeRun
+
+    if not resumeRun:
+        return None
+
+    if not os.path.isfile(CHECKPOINT_FILE_PATH):
+        LOGGER.warning(f'No checkpoint found at {CHECKPOINT_FILE_PATH}! Starting from scratch...')
+
+        return None
+
+    with open(CHECKPOINT_FILE_PATH, 'rb') as fpCheckpoint:
+        checkpoint = pickle.load(fpCheckpoint)
+
+    if checkpoint.get('signature') != runSignature:
+        LOGGER.warning(f'{CHECKPOINT_FILE_PATH} was saved with different arguments! Starting from scratch...')
+
+        return None
+
+    LOGGER.info(f'Resuming from {CHECKPOINT_FILE_PATH}...')
+
+    return checkpoint.get('progress')
+# loadCheckpoint
+
+# isCheckpointDue
+def isCheckpointDue():
+    global lastCheckpointTime
+
+    return time.monotonic() - lastCheckpointTime >= CHECKPOINT_INTERVAL
+# isCheckpointDue
+
+# saveCheckpoint
+def saveCheckpoint(progress):
+    global CHECKPOINT_FILE_PATH, runSignature, lastCheckpointTime
+
+    # Write aside and rename, so a crash while saving keeps the previous checkpoint
+    with open(CHECKPOINT_FILE_PATH + '.tmp', 'wb') as fpCheckpoint:
+        pickle.dump({ 'signature': runSignature, 'progress': progress }, fpCheckpoint)
+
+    os.replace(CHECKPOINT_FILE_PATH + '.tmp', CHECKPOINT_FILE_PATH)
+
+    lastCheckpointTime = time.monotonic()
+# saveCheckpoint
+
+# removeCheckpoint
+def removeCheckpoint():
+    global CHECKPOINT_FILE_PATH
+
+    if os.path.exists(CHECKPOINT_FILE_PATH):
+        os.remove(CHECKPOINT_FILE_PATH)
+# removeCheckpoint
+
+# projectTableColumns
+# Compare only the Key and the compared columns, full rows are fetched later only for the rows that differ
+def projectTableColumns():
+    global tables, columnsToCompare, keyColumns
+
+    if not columnsToCompare:
+        return
+
+    tempKeyColumns = keyColumns if keyColumns else fetchTableKeyColumns(tables[0])
+
+    # Without a Key there is no way to fetch the full rows later
+    if len(tempKeyColumns) == 0:
+        return
 
     for table in tables:
-        dbName = table.get('db')
-        tableName = table.get('table')
+        if not set(tempKeyColumns).issubset(table.get('columns')):
+            return
 
-        LOGGER.info(f'Fetching {dbName}.{tableName} data...')
+    keyColumns = tempKeyColumns
 
-        (rawData, dataToCompare) = fetchTableData(table)
-        table['rawData'] = rawData
-        table['dataToCompare'] = dataToCompare
+    for table in tables:
+        table['selectColumns'] = keyColumns + [ tempCol for tempCol in columnsToCompare if not(tempCol in keyColumns) ]
+# projectTableColumns
 
-    LOGGER.info('Comparing Data...')
+# setRowColumns
+# Every table is fetched with the same columns in the same order, so the tuple rows of all of them line up
+def setRowColumns():
+    global tables
 
-    # Iterate tables
-    i = 0
+    for table in tables:
+        table['rowColumns'] = table.get('selectColumns') if table.get('selectColumns') else tables[0].get('columns')
+# setRowColumns
 
-    for table1 in tables:
-        table1DB = table1.get('db')
-        table1Name = table1.get('table')
-        table1DataIndex = 0
+# materializeRows
+# Replaces projected rows by the full rows with the same Key and compared values, fetched in WHERE key IN (...) batches
+def materializeRows(table, partialRows, dbConn = None):
+    global DB_CONN, keyColumns
 
-        # Iterate table1 data
-        for table1Data in table1.get('dataToCompare'):
-            table1RawDat = table1.get('rawData')[table1DataIndex]
+    selectColumns = table.get('selectColumns')
 
-            # Iterate other tables
-            j = 0
+    if not selectColumns or len(partialRows) == 0:
+        return partialRows
 
-            for table2 in tables:
-                # Avoid comparing same table
-                if i != j:
-                    if not(table1Data in table2.get('dataToCompare')):
-                        table2['missingRows'] = table2.get('missingRows') if 'missingRows' in table2 else {}
+    dbConn = dbConn if dbConn else DB_CONN[table.get('dbSection')]
+    getKey = operator.itemgetter(*keyColumns)
+    getSelectValues = operator.itemgetter(*selectColumns)
+    rowKeys = list(dict.fromkeys([ getKey(tempRow) for tempRow in partialRows ]))
+    fullRows = {}
 
-                        if f'{table1DB}.{table1Name}' in table2.get('missingRows'):
-                            table2.get('missingRows')[ f'{table1DB}.{table1Name}' ].append(table1RawDat)
-                        else:
-                            table2.get('missingRows')[ f'{table1DB}.{table1Name}' ] = [ table1RawDat ]
-                # Avoid comparing same table
+    if len(keyColumns) == 1:
+        keyExpr = quoteName(keyColumns[0])
+        keyPlaceholder = '%s'
+    else:
+        keyExpr = '(' + ', '.join([ quoteName(tempCol) for tempCol in keyColumns ]) + ')'
+        keyPlaceholder = '(' + ', '.join([ '%s' ] * len(keyColumns)) + ')'
 
-                j += 1
-            # Iterate other tables
+    for offset in range(0, len(rowKeys), MATERIALIZE_BATCH_SIZE):
+        batchKeys = rowKeys[offset:offset + MATERIALIZE_BATCH_SIZE]
+        batchParams = batchKeys if len(keyColumns) == 1 else [ keyValue for tempKey in batchKeys for keyValue in tempKey ]
+        where = keyExpr + ' IN (' + ', '.join([ keyPlaceholder ] * len(batchKeys)) + ')'
 
-            table1DataIndex += 1
-        # Iterate table1 data
+        for tempRow in runQuery(dbConn, buildSelectQuery(table, where = where, selectExpr = '*'), batchParams):
+            fullRows.setdefault(getKey(tempRow), []).append(tempRow)
 
-        i += 1
-    # Iterate tables
+    materializedRows = []
 
-    allRowsIdentical = True
-    sheets = 0
-    excelWriter = False
+    for partialRow in partialRows:
+        fullRow = None
 
-    for table1 in tables:
-        database1 = table1.get('db')
-        table1Name = table1.get('table')
+        # A non-unique Key can match more than one row: pick the one with the same compared values
+        for tempRow in fullRows.get(getKey(partialRow), []):
+            if getSelectValues(tempRow) == getSelectValues(partialRow):
+                fullRow = tempRow
+                break
 
-        if 'missingRows' in table1:
-            allRowsIdentical = False
+        # The row may have been changed or deleted since it was compared
+        materializedRows.append(fullRow if fullRow else partialRow)
 
-            for table2, missingRows in table1.get('missingRows').items():
-                table2Obj = None
+    return materializedRows
+# materializeRows
 
-                for tempTable in tables:
-                    if tempTable.get('db') + '.' + tempTable.get('table') == table2:
-                        table2Obj = tempTable
-                        break
+# findMissingRowIndexes
+# Multiset difference: a row repeated N times in rowsToFind needs N copies in rowCounts
+# @params rowsToFind -> Iterable
+# @params rowCounts -> collections.Counter
+def findMissingRowIndexes(rowsToFind, rowCounts):
+    remainingCounts = collections.Counter(rowCounts)
+    missingRowIndexes = []
 
-                if len(table2Obj.get('dataToCompare')) == len(missingRows):
-                    LOGGER.error(f'None of the Data is present in {table2} that matches {database1}.{table1Name}!')
-                else:
-                    if not excelWriter:
-                        excelWriter = pandas.ExcelWriter(resultExcelFileName)
+    for rowIndex, row in enumerate(rowsToFind):
+        if remainingCounts[row] > 0:
+            remainingCounts[row] -= 1
+        else:
+            missingRowIndexes.append(rowIndex)
+
+    return missingRowIndexes
+# findMissingRowIndexes
+
+# diffRowDigests
+# Diffs any number of tables in one pass: every table is counted once, instead of being compared with every other table
+# A row repeated N times in one table and M < N times in another, is missing N - M times from the other
+# @params tablesDataToCompare -> Packed row digests of each table
+# @returns Dict: (missingTableIndexes, presentTableIndexes) -> Indexes of the rows in presentTableIndexes[0]
+def diffRowDigests(tablesDataToCompare):
+    with timePhase('diff'):
+        tablesRowCounts = [ collections.Counter(iterRowDigests(dataToCompare)) for dataToCompare in tablesDataToCompare ]
+
+        # (digest, count) pairs that every table has, are rows no table is missing
+        sameRowCounts = set(tablesRowCounts[0].items()).intersection(*[ rowCounts.items() for rowCounts in tablesRowCounts[1:] ])
+
+        # Row digest -> Count in each table, for the rows that differ only
+        diffRowCounts = {}
+
+        for i, rowCounts in enumerate(tablesRowCounts):
+            for rowDigest, rowCount in rowCounts.items() - sameRowCounts:
+                diffRowCounts.setdefault(rowDigest, [0] * len(tablesRowCounts))[i] = rowCount
+
+        tablesRowCounts = None
+        sameRowCounts = None
+        groupRowIndexes = {}
+
+        for i, dataToCompare in enumerate(tablesDataToCompare):
+            seenCounts = collections.Counter()
+
+            for rowIndex, rowDigest in enumerate(iterRowDigests(dataToCompare)):
+                rowCounts = diffRowCounts.get(rowDigest)
+
+                if rowCounts:
+                    seenCounts[rowDigest] += 1
+                    presentIndexes = tuple( j for j, rowCount in enumerate(rowCounts) if rowCount >= seenCounts[rowDigest] )
+
+                    # Each missing copy is reported once, from the first table that has it
+                    if presentIndexes[0] == i and len(presentIndexes) < len(rowCounts):
+                        missingIndexes = tuple( j for j in range(len(rowCounts)) if not(j in presentIndexes) )
+                        groupRowIndexes.setdefault((missingIndexes, presentIndexes), []).append(rowIndex)
+
+    addPhaseStats('diff', rows = sum([ len(dataToCompare) for dataToCompare in tablesDataToCompare ]) // ROW_DIGEST_SIZE)
+
+    return groupRowIndexes
+# diffRowDigests
+
+# diffRowDigestsVectorized
+# -engine numpy diffRowDigests, with the same result: the digests of all the tables are sorted together instead of counted
+# The Nth copy of a row in a table is matched with the Nth copy in the others, so every (digest, copy number) is present in a set of tables
+def diffRowDigestsVectorized(tablesDataToCompare):
+    (numpy, pandas) = importVectorEngine()
+
+    laneCount = ROW_DIGEST_SIZE // 8
+    tablesDigests = [ numpy.frombuffer(dataToCompare, dtype = '<u8').reshape(-1, laneCount) for dataToCompare in tablesDataToCompare ]
+    groupRowIndexes = {}
+
+    with timePhase('diff'):
+        allDigests = numpy.concatenate(tablesDigests)
+        allTables = numpy.repeat(numpy.arange(len(tablesDigests)), [ len(tableDigests) for tableDigests in tablesDigests ])
+        allRows = numpy.concatenate([ numpy.arange(len(tableDigests)) for tableDigests in tablesDigests ])
+
+        if len(allDigests) > 0:
+            # By digest, then table, then row: the last lexsort key sorts first
+            sortOrder = numpy.lexsort((allRows, allTables) + tuple([ allDigests[:, lane] for lane in reversed(range(laneCount)) ]))
+            sortedDigests = allDigests[sortOrder]
+            sortedTables = allTables[sortOrder]
+            positions = numpy.arange(len(sortOrder))
+
+            isNewDigest = numpy.ones(len(sortOrder), dtype = bool)
+            isNewDigest[1:] = (sortedDigests[1:] != sortedDigests[:-1]).any(axis = 1)
+            isNewTableRun = isNewDigest.copy()
+            isNewTableRun[1:] |= sortedTables[1:] != sortedTables[:-1]
+
+            digestIds = numpy.cumsum(isNewDigest) - 1
+            copyNumbers = positions - numpy.maximum.accumulate(numpy.where(isNewTableRun, positions, 0))
+
+            # By (digest, copy number), then table: a group starts with the first table that has the copy
+            groupOrder = numpy.lexsort((sortedTables, copyNumbers, digestIds))
+            groupDigestIds = digestIds[groupOrder]
+            groupCopyNumbers = copyNumbers[groupOrder]
+            isNewGroup = numpy.ones(len(groupOrder), dtype = bool)
+            isNewGroup[1:] = (groupDigestIds[1:] != groupDigestIds[:-1]) | (groupCopyNumbers[1:] != groupCopyNumbers[:-1])
+            groupIds = numpy.cumsum(isNewGroup) - 1
+
+            groupPresence = numpy.zeros((groupIds[-1] + 1, len(tablesDigests)), dtype = bool)
+            groupPresence[groupIds, sortedTables[groupOrder]] = True
+
+            # Each missing copy is reported once, from the first table that has it
+            missingGroups = numpy.flatnonzero(~groupPresence.all(axis = 1))
+            missingRows = allRows[sortOrder][groupOrder][isNewGroup][missingGroups]
+            (presencePatterns, patternIndexes) = numpy.unique(groupPresence[missingGroups], axis = 0, return_inverse = True)
+
+            for patternIndex, presencePattern in enumerate(presencePatterns):
+                presentIndexes = tuple(numpy.flatnonzero(presencePattern).tolist())
+                missingIndexes = tuple(numpy.flatnonzero(~presencePattern).tolist())
+                groupRowIndexes[(missingIndexes, presentIndexes)] = numpy.sort(missingRows[patternIndexes.ravel() == patternIndex]).tolist()
+
+    addPhaseStats('diff', rows = len(allDigests))
+
+    return groupRowIndexes
+# diffRowDigestsVectorized
+
+# findUnmatchedRowIndexes
+# Rows of each table beyond the copies that every table has: only these can be missing from another table
+# Diffing the unmatched rows of all the key ranges together gives the same result as diffing the whole tables,
+# a row can be matched by a copy in another key range when the Key is not compared
+# @params tablesDataToCompare -> Packed row digests of each table
+# @returns List: Indexes of the unmatched rows of each table
+def findUnmatchedRowIndexes(tablesDataToCompare):
+    with timePhase('diff'):
+        tablesRowCounts = [ collections.Counter(iterRowDigests(dataToCompare)) for dataToCompare in tablesDataToCompare ]
+        matchedCounts = tablesRowCounts[0]
+
+        # Counter & keeps the lowest count of each row
+        for rowCounts in tablesRowCounts[1:]:
+            matchedCounts = matchedCounts & rowCounts
+
+        tablesRowCounts = None
+        tablesUnmatchedIndexes = []
+
+        for dataToCompare in tablesDataToCompare:
+            seenCounts = collections.Counter()
+            unmatchedIndexes = []
+
+            for rowIndex, rowDigest in enumerate(iterRowDigests(dataToCompare)):
+                seenCounts[rowDigest] += 1
+
+                if seenCounts[rowDigest] > matchedCounts[rowDigest]:
+                    unmatchedIndexes.append(rowIndex)
+
+            tablesUnmatchedIndexes.append(unmatchedIndexes)
+
+    return tablesUnmatchedIndexes
+# findUnmatchedRowIndexes
+
+# markAllMissingPairs
+# A table pair where every row of the present table is missing, is reported by a single error instead of its rows
+# @params groupCounts -> (missingTableIndexes, presentTableIndexes) -> Count
+def markAllMissingPairs(rowsWriter, groupCounts):
+    global tables
+
+    pairCounts = collections.Counter()
+
+    for (missingIndexes, presentIndexes), groupCount in groupCounts.items():
+        for missingIndex in missingIndexes:
+            for presentIndex in presentIndexes:
+                pairCounts[(missingIndex, presentIndex)] += groupCount
+
+    for (missingIndex, presentIndex), pairCount in pairCounts.items():
+        if tables[presentIndex].get('rowCount') == pairCount:
+            rowsWriter.markAllRowsMissing(tables[missingIndex], tables[presentIndex])
+# markAllMissingPairs
+
+# splitKeyRange
+# Splits the inclusive key range into at most `parts` contiguous ranges
+def splitKeyRange(lowerBound, upperBound, parts):
+    rangeWidth = max(1, -(-(upperBound - lowerBound + 1) // parts))
+    keyRanges = []
+
+    while lowerBound <= upperBound:
+        keyRanges.append((lowerBound, min(lowerBound + rangeWidth - 1, upperBound)))
+        lowerBound += rangeWidth
+
+    return keyRanges
+# splitKeyRange
+
+# initKeyRangeWorker
+# Opens the connections of a -workers process once, every key range it diffs reuses them
+def initKeyRangeWorker(tableSpecs):
+    global WORKER_DB_CONN
+
+    try:
+        WORKER_DB_CONN = [ connectDB(tableSpec.get('dbConfig')) for tableSpec in tableSpecs ]
+    except Exception as e:
+        # Raised by the key ranges of the process: An initializer that raises only gets the process restarted by the pool
+        WORKER_DB_CONN = e
+# initKeyRangeWorker
 
-                    sheets += 1
+# diffKeyRange
+# Runs in a worker process: fetches one key range of every table over the connections of the process and matches its rows
+# Only the row counts and the unmatched rows of each table are sent back, with their digests: (rowCounts, [ (unmatchedDigests, unmatchedRows) ])
+# @params lowerBound, upperBound -> None for the rows with a NULL Key
+def diffKeyRange(tableSpecs, keyCol, colsToCompare, lowerBound, upperBound, engine):
+    global WORKER_DB_CONN
 
-                    LOGGER.error(f'{database1}.{table1Name} is missing ' + str(len(missingRows)) + ' rows from ' + table2 + f', Missing data can be found in the {resultExcelFileName} at Sheet {sheets}')
+    if isinstance(WORKER_DB_CONN, Exception):
+        raise WORKER_DB_CONN
 
-                    df = pandas.DataFrame(missingRows, columns = table1.get('columns'))
+    if lowerBound is None:
+        rangeWhere = quoteName(keyCol) + ' IS NULL'
+    else:
+        rangeWhere = quoteName(keyCol) + ' BETWEEN %(lowerBound)s AND %(upperBound)s'
 
-                    df.to_excel(excelWriter, index = False)
+    rangeParams = { 'lowerBound': lowerBound, 'upperBound': upperBound }
+    rangeRows = []
+    rangeDataToCompare = []
 
-    if excelWriter:
-        excelWriter.save()
-    elif os.path.exists(resultExcelFileName):
-        os.remove(resultExcelFileName)
+    for tableSpec, dbConn in zip(tableSpecs, WORKER_DB_CONN):
+        tempRows = runTupleQuery(dbConn, buildSelectQuery(tableSpec, where = rangeWhere), rangeParams)
 
-    if allRowsIdentical:
-        LOGGER.info('Hooray! All the Data are same in all Tables.')
+        compareIndexes = getCompareIndexes(tableSpec, colsToCompare)
 
-    return allRowsIdentical
-# compareTableData
+        rangeRows.append(tempRows)
+        rangeDataToCompare.append(digestRowsVectorized(tempRows, compareIndexes, getCompareTypes(tableSpec, compareIndexes)) if engine == 'numpy' else digestRows(tempRows, compareIndexes))
+
+    unmatchedRanges = []
+
+    for tempRows, dataToCompare, unmatchedIndexes in zip(rangeRows, rangeDataToCompare, findUnmatchedRowIndexes(rangeDataToCompare)):
+        unmatchedDigests = b''.join([ dataToCompare[rowIndex * ROW_DIGEST_SIZE:(rowIndex + 1) * ROW_DIGEST_SIZE] for rowIndex in unmatchedIndexes ])
+        unmatchedRanges.append((unmatchedDigests, [ tempRows[rowIndex] for rowIndex in unmatchedIndexes ]))
+
+    return ([ len(tempRows) for tempRows in rangeRows ], unmatchedRanges)
+# diffKeyRange
+
+# diffIndexedKeyRange
+# A failed range is returned instead of raised, so the ranges that did complete still reach the checkpoint
+# The phase stats of the range are returned along, forked workers start with a copy of the parent ones
+def diffIndexedKeyRange(rangeArgs):
+    takePhaseStats()
 
-# main
-def main():
     try:
-        global LOGGER, DB_CONFIG_FILE_PATH, tables, columnsToCompare
+        return (rangeArgs[0], diffKeyRange(*rangeArgs[1:]), None, takePhaseStats())
+    except Exception as e:
+        return (rangeArgs[0], None, e, takePhaseStats())
+# diffIndexedKeyRange
 
-        initLogger()
+# parallelDiffTableData
+def parallelDiffTableData(rowsWriter):
+    global tables, LOGGER, columnsToCompare, workers, diffEngine
 
-        args = getCmdArgs()
+    keyCol = getIntegerKeyColumn('-workers')
 
-        table1 = args.table1
-        table2 = args.table2
-        colsToCompare = args.cols
-        config = args.config
-
-        if table1 and table2:
-            table1Split = table1.split('.')
-            table2Split = table2.split('.')
-
-            if config:
-                DB_CONFIG_FILE_PATH = config
-
-            if len(table1Split) == 2:
-                if len(table2Split) == 2:
-                    tables = [
-                        {
-                            'db': table1Split[0],
-                            'table': table1Split[1],
-                        },
-                        {
-                            'db': table2Split[0],
-                            'table': table2Split[1],
-                        }
-                    ]
-
-                    if colsToCompare:
-                        # String to List
-                        colsToCompare = [ tempColToCompare.strip() for tempColToCompare in colsToCompare.split(',') ]
-                        # Remove empty Strings from List
-                        columnsToCompare = [ tempColToCompare for tempColToCompare in colsToCompare if tempColToCompare ]
-
-                    initDBConn()
-
-                    allColumnsMatched = compareTableDefs()
-
-                    if allColumnsMatched:
-                        compareTableData()
-                else:
-                    LOGGER.error('table2 must be in format: db.table_name')
+    if not keyCol:
+        return False
+
+    resumeProgress = loadCheckpoint()
+
+    if resumeProgress and 'rangeUnmatched' in resumeProgress:
+        keyRanges = resumeProgress.get('keyRanges')
+        # Range index -> Range result
+        rangeResults = resumeProgress.get('rangeUnmatched')
+    else:
+        keyRange = fetchKeyRange(keyCol)
+        # BETWEEN leaves out the NULL Keys, they are a range of their own
+        keyRanges = (splitKeyRange(keyRange[0], keyRange[1], workers) if keyRange else []) + [ (None, None) ]
+        rangeResults = {}
+
+    tableSpecs = [ { 'db': table.get('db'), 'table': table.get('table'), 'columns': table.get('columns'), 'selectColumns': table.get('selectColumns'), 'rowColumns': table.get('rowColumns'), 'columnTypes': table.get('columnTypes'), 'filter': table.get('filter'), 'dbConfig': table.get('dbConfig') } for table in tables ]
+    pendingRanges = [ (rangeIndex, tableSpecs, keyCol, columnsToCompare, lowerBound, upperBound, diffEngine) for rangeIndex, (lowerBound, upperBound) in enumerate(keyRanges) if not(rangeIndex in rangeResults) ]
+
+    LOGGER.info(f'Fetching and Comparing Data of {len(pendingRanges)} {keyCol} ranges in {workers} worker processes...')
+
+    for table in tables:
+        table['rowCount'] = 0
+
+    rangeError = None
+
+    with multiprocessing.Pool(workers, initializer = initKeyRangeWorker, initargs = (tableSpecs,)) as workerPool:
+        for (rangeIndex, rangeResult, tempRangeError, rangeStats) in workerPool.imap_unordered(diffIndexedKeyRange, pendingRanges):
+            mergePhaseStats(rangeStats)
+
+            if tempRangeError:
+                rangeError = rangeError if rangeError else tempRangeError
             else:
-                LOGGER.error('table1 must be in format: db.table_name')
+                rangeResults[rangeIndex] = rangeResult
+
+                if isCheckpointDue():
+                    saveCheckpoint({ 'keyRanges': keyRanges, 'rangeUnmatched': rangeResults })
+
+    if rangeError:
+        saveCheckpoint({ 'keyRanges': keyRanges, 'rangeUnmatched': rangeResults })
+
+        raise rangeError
+
+    tablesUnmatchedData = [ [] for table in tables ]
+    tablesUnmatchedRows = [ [] for table in tables ]
+
+    # The unmatched rows of all the ranges in key order, diffed together
+    for rangeIndex in sorted(rangeResults.keys()):
+        (rowCounts, unmatchedRanges) = rangeResults[rangeIndex]
+
+        for i, (unmatchedDigests, unmatchedRows) in enumerate(unmatchedRanges):
+            tables[i]['rowCount'] += rowCounts[i]
+            tablesUnmatchedData[i].append(unmatchedDigests)
+            tablesUnmatchedRows[i].extend(unmatchedRows)
+
+    tablesDataToCompare = [ b''.join(unmatchedData) for unmatchedData in tablesUnmatchedData ]
+    tablesUnmatchedData = None
+
+    writeMissingGroups(rowsWriter, diffRowDigestsVectorized(tablesDataToCompare) if diffEngine == 'numpy' else diffRowDigests(tablesDataToCompare), tablesUnmatchedRows)
+
+    removeCheckpoint()
+
+    return True
+# parallelDiffTableData
+
+# writeMissingGroups
+# @params groupRowIndexes -> Of diffRowDigests
+# @params tablesRows -> Tuple rows of each table, the row indexes point into
+def writeMissingGroups(rowsWriter, groupRowIndexes, tablesRows):
+    global tables, columnsToCompare, keyColumns, keyedDiff
+
+    if keyedDiff:
+        (table1, table2) = tables
+        rowColumns = table1.get('rowColumns')
+        # Only the rows left unmatched are joined by Key
+        table1Rows = [ tablesRows[0][rowIndex] for rowIndex in groupRowIndexes.get(((1,), (0,)), []) ]
+        table2Rows = [ tablesRows[1][rowIndex] for rowIndex in groupRowIndexes.get(((0,), (1,)), []) ]
+
+        writeKeyedRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, getCompareIndexes(table1, columnsToCompare), [ rowColumns.index(tempCol) for tempCol in keyColumns ], rowColumns)
+
+        return
+
+    markAllMissingPairs(rowsWriter, { groupKey: len(rowIndexes) for groupKey, rowIndexes in groupRowIndexes.items() })
+
+    for (missingIndexes, presentIndexes), rowIndexes in groupRowIndexes.items():
+        missingTables = [ tables[missingIndex] for missingIndex in missingIndexes ]
+        presentTables = [ tables[presentIndex] for presentIndex in presentIndexes ]
+        presentRows = tablesRows[presentIndexes[0]]
+
+        if not rowsWriter.isAllRowsMissing(missingTables, presentTables):
+            # Hand the rows over per batch, so only the row indexes of the whole diff are held
+            for batchStart in range(0, len(rowIndexes), FETCH_BATCH_SIZE):
+                rowsWriter.write(missingTables, presentTables, toRowDicts(presentTables[0].get('rowColumns'), [ presentRows[rowIndex] for rowIndex in rowIndexes[batchStart:batchStart + FETCH_BATCH_SIZE] ]))
+# writeMissingGroups
+
+# diffTableData
+def diffTableData(rowsWriter):
+    global tables, LOGGER, columnsToCompare, diffEngine
+
+    LOGGER.info('Fetching ' + (', '.join([ table.get('db') + '.' + table.get('table') for table in tables ])) + ' data...')
+
+    # Every table has its own connection, so all of them are fetched at the same time
+    with ThreadPoolExecutor(max_workers = len(tables)) as fetchPool:
+        fetchedData = list(fetchPool.map(fetchTableData, tables))
+
+    for table, (rawData, dataToCompare) in zip(tables, fetchedData):
+        table['rawData'] = rawData
+        table['dataToCompare'] = dataToCompare
+        table['rowCount'] = len(dataToCompare) // ROW_DIGEST_SIZE
+
+    LOGGER.info('Comparing Data...')
+
+    tablesDataToCompare = [ table.pop('dataToCompare') for table in tables ]
+    groupRowIndexes = diffRowDigestsVectorized(tablesDataToCompare) if diffEngine == 'numpy' else diffRowDigests(tablesDataToCompare)
+
+    writeMissingGroups(rowsWriter, groupRowIndexes, [ table.get('rawData') for table in tables ])
+# diffTableData
+
+# compareTableData
+def compareTableData():
+    global tables, workers, columnsToCompare, keyColumns, keyedDiff
+
+    if keyedDiff and columnsToCompare:
+        # Rows are matched within their Key only, as merge mode joins them
+        columnsToCompare = columnsToCompare + [ tempCol for tempCol in keyColumns if not(tempCol in columnsToCompare) ]
+
+    rowsWriter = createPairRowsWriter()
+
+    # A failed run still closes the Missing Data file, instead of leaving it unflushed or without its footer
+    try:
+        if workers > 1:
+            if not parallelDiffTableData(rowsWriter):
+                return False
         else:
-            LOGGER.error('Invalid Arguments! Arguments: table1, table2 are required')
-            quit()
+            diffTableData(rowsWriter)
+    finally:
+        rowsWriter.close()
+
+    return logChangeCounts(rowsWriter) if keyedDiff else logMissingCounts(rowsWriter)
+# compareTableData
+
+# resolveKeyColumns
+def resolveKeyColumns():
+    global tables, LOGGER, keyColumns
+
+    if not keyColumns:
+        keyColumns = fetchTableKeyColumns(tables[0])
+
+        if len(keyColumns) == 0:
+            LOGGER.error(tables[0].get('db') + '.' + tables[0].get('table') + ' does not have a Primary Key! Please pass the columns to join the rows by in -key argument')
+
+            return False
+
+    missingKeyCols = []
+
+    for tempCol in keyColumns:
+        for table in tables:
+            if not(tempCol in table.get('columns')) and not(tempCol in missingKeyCols):
+                missingKeyCols.append(tempCol)
+
+    if len(missingKeyCols) > 0:
+        LOGGER.error('Invalid Key Columns: ' + (', '.join(missingKeyCols)))
+
+        return False
+
+    return True
+# resolveKeyColumns
+
+# iterTableRows
+# Streams the rows through an unbuffered cursor, so only a few fetchmany sets are held in memory
+# Rows are tuples of the rowColumns of the table
+def iterTableRows(table, where = None, params = {}, orderBy = None):
+    global DB_CONN
+
+    batchSize = fetchBatchSize(table)
+    dbCursor = DB_CONN[table.get('dbSection')].cursor()
+
+    with timePhase('query'):
+        dbCursor.execute(buildSelectQuery(table, where = where, orderBy = orderBy), params)
+
+    for qResult in iterFetchedSets(dbCursor, batchSize):
+        yield from qResult
+
+    dbCursor.close()
+# iterTableRows
+
+# iterKeyGroups
+# Groups consecutive rows of a key ordered stream, a unique key yields groups of a single row
+# NULLs are sorted first, same as MySQL does
+# @params keyIndexes -> Positions of the Key columns in the tuple rows
+def iterKeyGroups(rows, keyIndexes):
+    groupKey = None
+    groupRows = []
+
+    for row in rows:
+        rowKey = tuple( (row[keyIndex] is not None, row[keyIndex]) for keyIndex in keyIndexes )
+
+        if groupRows and rowKey != groupKey:
+            yield (groupKey, groupRows)
+
+            groupRows = []
+
+        groupKey = rowKey
+        groupRows.append(row)
+
+    if groupRows:
+        yield (groupKey, groupRows)
+# iterKeyGroups
+
+# toJsonValue
+# json.dumps default: MySQL types JSON has no type for
+def toJsonValue(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    elif isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'backslashreplace')
+    elif isinstance(value, set):
+        return sorted(value)
+
+    return str(value)
+# toJsonValue
+
+# toXlsxValue
+def toXlsxValue(value):
+    if value is None or isinstance(value, (bool, int, float, decimal.Decimal, str, datetime.date, datetime.time)):
+        return value
+    elif isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'backslashreplace')
+    elif isinstance(value, set):
+        return ','.join(sorted(value))
+
+    return str(value)
+# toXlsxValue
+
+# toParquetValue
+# Every Parquet column is a string column, a SET is joined same as in xlsx
+def toParquetValue(value):
+    if isinstance(value, set):
+        return ','.join(sorted(value))
+
+    return toJsonValue(value)
+# toParquetValue
+
+# CsvRowsWriter
+class CsvRowsWriter:
+    fileExtension = 'csv'
+    # Rows are appended as text, so the file can be truncated back to a checkpoint
+    resumable = True
+
+    # @params labelColumns -> Header of the labels each row is written with
+    def __init__(self, columns, resumeOffset = None, labelColumns = MISSING_LABEL_COLUMNS):
+        self.columns = columns
+        self.fileName = resultFilePrefix + '.' + self.fileExtension
+
+        if resumeOffset is not None:
+            # Drop the rows written after the checkpoint, they will be found again
+            self.fpResult = open(self.fileName, 'r+', newline = '')
+            self.fpResult.truncate(resumeOffset)
+            self.fpResult.seek(resumeOffset)
+            self.csvWriter = csv.writer(self.fpResult)
+        else:
+            self.fpResult = open(self.fileName, 'w', newline = '')
+            self.csvWriter = csv.writer(self.fpResult)
+            self.csvWriter.writerow(labelColumns + columns)
+
+    def writeRows(self, groupKey, labels, rows):
+        self.csvWriter.writerows([ labels + [ row.get(tempCol) for tempCol in self.columns ] for row in rows ])
+
+    def tell(self):
+        self.fpResult.flush()
+
+        return self.fpResult.tell()
+
+    def getLocation(self, groupKey):
+        return self.fileName
+
+    def close(self):
+        self.fpResult.close()
+# CsvRowsWriter
+
+# JsonlRowsWriter
+# A JSON object per row, keyed same as the CSV header
+class JsonlRowsWriter(CsvRowsWriter):
+    fileExtension = 'jsonl'
+
+    def __init__(self, columns, resumeOffset = None, labelColumns = MISSING_LABEL_COLUMNS):
+        self.columns = columns
+        self.labelColumns = labelColumns
+        self.fileName = resultFilePrefix + '.' + self.fileExtension
+
+        if resumeOffset is not None:
+            self.fpResult = open(self.fileName, 'r+', encoding = 'utf-8')
+            self.fpResult.truncate(resumeOffset)
+            self.fpResult.seek(resumeOffset)
+        else:
+            self.fpResult = open(self.fileName, 'w', encoding = 'utf-8')
+
+    def writeRows(self, groupKey, labels, rows):
+        for row in rows:
+            rowObj = dict(zip(self.labelColumns, labels))
+            rowObj.update({ tempCol: row.get(tempCol) for tempCol in self.columns })
+
+            self.fpResult.write(json.dumps(rowObj, ensure_ascii = False, default = toJsonValue) + '\n')
+# JsonlRowsWriter
+
+# ParquetRowsWriter
+# Rows are buffered and written per PARQUET_ROW_GROUP_SIZE row group, values are kept as strings same as in the CSV
+class ParquetRowsWriter:
+    fileExtension = 'parquet'
+    # A Parquet file can't be appended to once its footer is written
+    resumable = False
+
+    def __init__(self, columns, resumeOffset = None, labelColumns = MISSING_LABEL_COLUMNS):
+        try:
+            import pyarrow, pyarrow.parquet
+        except ImportError:
+            raise Exception('-format parquet requires pyarrow: pip install pyarrow')
+
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.fileName = resultFilePrefix + '.' + self.fileExtension
+        self.schema = pyarrow.schema([ (tempCol, pyarrow.string()) for tempCol in labelColumns + columns ])
+        self.parquetWriter = pyarrow.parquet.ParquetWriter(self.fileName, self.schema)
+        self.pendingColumns = [ [] for tempCol in self.schema.names ]
+
+    def writeRows(self, groupKey, labels, rows):
+        for row in rows:
+            for tempValues, label in zip(self.pendingColumns, labels):
+                tempValues.append(label)
+
+            for tempValues, tempCol in zip(self.pendingColumns[len(labels):], self.columns):
+                tempValue = row.get(tempCol)
+                tempValues.append(None if tempValue is None else toParquetValue(tempValue))
+
+            if len(self.pendingColumns[0]) >= PARQUET_ROW_GROUP_SIZE:
+                self.flushRowGroup()
+
+    def flushRowGroup(self):
+        if len(self.pendingColumns[0]) > 0:
+            self.parquetWriter.write_table(self.pyarrow.Table.from_arrays([ self.pyarrow.array(tempValues, type = self.pyarrow.string()) for tempValues in self.pendingColumns ], schema = self.schema))
+
+            self.pendingColumns = [ [] for tempCol in self.schema.names ]
+
+    def getLocation(self, groupKey):
+        return self.fileName
+
+    def close(self):
+        self.flushRowGroup()
+        self.parquetWriter.close()
+# ParquetRowsWriter
+
+# XlsxRowsWriter
+# A sheet per group, continued on a new sheet once it is full. The sheet tells the labels of the group, they are not written
+# constant_memory flushes every row to a temp file as soon as the next one is started
+class XlsxRowsWriter:
+    fileExtension = 'xlsx'
+    resumable = False
+
+    def __init__(self, columns, resumeOffset = None, labelColumns = MISSING_LABEL_COLUMNS):
+        import xlsxwriter
+
+        self.columns = columns
+        self.fileName = resultFilePrefix + '.' + self.fileExtension
+        self.workbook = xlsxwriter.Workbook(self.fileName, { 'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False, 'nan_inf_to_errors': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss' })
+        # groupKey -> List of sheet numbers
+        self.groupSheets = {}
+        # groupKey -> (worksheet, Next row number)
+        self.openSheets = {}
+
+    def addSheet(self, groupKey):
+        sheetNo = len(self.workbook.worksheets()) + 1
+        worksheet = self.workbook.add_worksheet(f'Sheet {sheetNo}')
+        worksheet.write_row(0, 0, self.columns)
+
+        self.groupSheets.setdefault(groupKey, []).append(sheetNo)
+        self.openSheets[groupKey] = (worksheet, 1)
+
+    def writeRows(self, groupKey, labels, rows):
+        for row in rows:
+            if not(groupKey in self.openSheets) or self.openSheets[groupKey][1] >= XLSX_MAX_ROWS:
+                self.addSheet(groupKey)
+
+            (worksheet, rowNo) = self.openSheets[groupKey]
+            worksheet.write_row(rowNo, 0, [ toXlsxValue(row.get(tempCol)) for tempCol in self.columns ])
+
+            self.openSheets[groupKey] = (worksheet, rowNo + 1)
+
+    def getLocation(self, groupKey):
+        sheetNos = self.groupSheets.get(groupKey, [])
+
+        return self.fileName + ' at Sheet' + ('s ' if len(sheetNos) > 1 else ' ') + (', '.join([ str(sheetNo) for sheetNo in sheetNos ]))
+
+    def close(self):
+        self.workbook.close()
+# XlsxRowsWriter
+
+RESULT_WRITERS: Final = { 'csv': CsvRowsWriter, 'jsonl': JsonlRowsWriter, 'parquet': ParquetRowsWriter, 'xlsx': XlsxRowsWriter }
+
+# MissingRowsWriter
+# Streams the missing rows to the Missing Data file of -format as they are found
+# Projected rows of a table are collected per MATERIALIZE_BATCH_SIZE and written once their full rows are fetched
+class MissingRowsWriter:
+    # @params resumeState -> Returned by checkpoint() of an earlier run
+    # @params labelColumns -> MISSING_LABEL_COLUMNS for write(), CHANGE_LABEL_COLUMNS for writeChanges()
+    def __init__(self, columns, resumeState = None, labelColumns = MISSING_LABEL_COLUMNS):
+        global resultFormat
+
+        self.columns = columns
+        self.resultWriter = RESULT_WRITERS[resultFormat](columns, resumeState.get('offset') if resumeState else None, labelColumns)
+
+        # (missingTables dbSections, presentTables dbSections) or (change,) -> Count
+        self.missingCounts = collections.Counter(resumeState.get('missingCounts') if resumeState else {})
+        # Table pairs whose rows are all missing, those rows are not written
+        self.allRowsMissing = set()
+        # Rows written while capturing, as they were passed: List of (missingTables dbSections, presentTables dbSections, rows) or (change, rows)
+        self.capturedRows = resumeState.get('capturedRows') if resumeState else None
+        self.pendingRows = {}
+        # Own connections: the table connections may be busy streaming rows
+        self.dbConns = {}
+
+    # Rows present in all of presentTables and missing from all of missingTables, taken from presentTables[0]
+    def write(self, missingTables, presentTables, rows):
+        groupKey = (tuple([ table.get('dbSection') for table in missingTables ]), tuple([ table.get('dbSection') for table in presentTables ]))
+        labels = [ ', '.join([ table.get('label') for table in missingTables ]), ', '.join([ table.get('label') for table in presentTables ]) ]
+
+        self.queueRows(groupKey, labels, presentTables[0], rows)
+
+    # Rows of a -keyed comparison, taken from table
+    def writeChanges(self, change, table, rows):
+        self.queueRows((change,), [ change ], table, rows)
+
+    def queueRows(self, groupKey, labels, table, rows):
+        if len(rows) == 0:
+            return
+
+        self.missingCounts[groupKey] += len(rows)
+
+        if self.capturedRows is not None:
+            self.capturedRows.append(groupKey + (rows,))
+
+        if table.get('selectColumns'):
+            (tempLabels, tempTable, pendingRows) = self.pendingRows.setdefault(groupKey, (labels, table, []))
+            pendingRows.extend(rows)
+
+            if len(pendingRows) >= MATERIALIZE_BATCH_SIZE:
+                self.flushPendingRows(groupKey)
+        else:
+            self.writeRows(groupKey, labels, rows)
+
+    def flushPendingRows(self, groupKey):
+        (labels, table, pendingRows) = self.pendingRows.pop(groupKey)
+
+        if not(table.get('dbSection') in self.dbConns):
+            self.dbConns[ table.get('dbSection') ] = connectDB(table.get('dbConfig'))
+
+        fullRows = materializeRows(table, pendingRows, self.dbConns[ table.get('dbSection') ])
+
+        # Keeps the fields that are not table columns, such as the CHANGE_COLUMNS
+        self.writeRows(groupKey, labels, [ dict(pendingRow, **fullRow) for pendingRow, fullRow in zip(pendingRows, fullRows) ])
+
+    def writeRows(self, groupKey, labels, rows):
+        with timePhase('write'):
+            self.resultWriter.writeRows(groupKey, labels, rows)
+
+        addPhaseStats('write', rows = len(rows))
+
+    def markAllRowsMissing(self, missingTable, presentTable):
+        self.allRowsMissing.add((missingTable.get('dbSection'), presentTable.get('dbSection')))
+
+    # Whether every table pair of the group has all its rows missing
+    def isAllRowsMissing(self, missingTables, presentTables):
+        return all([ (missingTable.get('dbSection'), presentTable.get('dbSection')) in self.allRowsMissing for missingTable in missingTables for presentTable in presentTables ])
+
+    def isResumable(self):
+        return self.resultWriter.resumable
+
+    # Writes out everything found so far, the returned state can resume the writer
+    def checkpoint(self):
+        for pendingKey in list(self.pendingRows.keys()):
+            self.flushPendingRows(pendingKey)
+
+        return { 'offset': self.resultWriter.tell(), 'missingCounts': dict(self.missingCounts), 'capturedRows': self.capturedRows }
+
+    def getLocation(self, groupKey):
+        return self.resultWriter.getLocation(groupKey)
+
+    # Removes the Missing Data file when no rows were written to it
+    def close(self):
+        for pendingKey in list(self.pendingRows.keys()):
+            self.flushPendingRows(pendingKey)
+
+        for dbConn in self.dbConns.values():
+            dbConn.close()
+
+        # Parquet, xlsx writers write most of the file when closed
+        with timePhase('write'):
+            self.resultWriter.close()
+
+        if sum(self.missingCounts.values()) == 0 and os.path.exists(self.resultWriter.fileName):
+            os.remove(self.resultWriter.fileName)
+        elif os.path.exists(self.resultWriter.fileName):
+            addPhaseStats('write', size = os.path.getsize(self.resultWriter.fileName))
+# MissingRowsWriter
+
+# writeRowsDiff
+# Diffs two row lists as multisets and writes the rows missing on each side
+# @params compareKeys -> Compared column names of dict rows, or their positions in tuple rows
+# @params rowColumns -> Column names of tuple rows, None for dict rows
+def writeRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, compareKeys, rowColumns = None):
+    table1DataToCompare = list(iterRowDigests(digestRows(table1Rows, compareKeys)))
+    table2DataToCompare = list(iterRowDigests(digestRows(table2Rows, compareKeys)))
+
+    with timePhase('diff'):
+        table2MissingIndexes = findMissingRowIndexes(table1DataToCompare, collections.Counter(table2DataToCompare))
+        table1MissingIndexes = findMissingRowIndexes(table2DataToCompare, collections.Counter(table1DataToCompare))
+
+    addPhaseStats('diff', rows = len(table1DataToCompare) + len(table2DataToCompare))
+
+    table2MissingRows = [ table1Rows[rowIndex] for rowIndex in table2MissingIndexes ]
+    table1MissingRows = [ table2Rows[rowIndex] for rowIndex in table1MissingIndexes ]
+
+    rowsWriter.write([ table2 ], [ table1 ], toRowDicts(rowColumns, table2MissingRows) if rowColumns else table2MissingRows)
+    rowsWriter.write([ table1 ], [ table2 ], toRowDicts(rowColumns, table1MissingRows) if rowColumns else table1MissingRows)
+# writeRowsDiff
+
+# writeKeyedRowsDiff
+# Joins the rows of both tables by Key and writes them as -keyed changes: a Key in table1 only is Deleted, in table2 only is Inserted
+# Rows of a Key found in both are diffed as multisets, a single row left on each side is Updated, any others are Deleted, Inserted
+# @params compareKeys, keyKeys -> Compared, Key column names of dict rows, or their positions in tuple rows
+# @params rowColumns -> Column names of tuple rows, None for dict rows
+def writeKeyedRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, compareKeys, keyKeys, rowColumns = None):
+    getKey = operator.itemgetter(*keyKeys)
+    compareNames = [ rowColumns[tempKey] for tempKey in compareKeys ] if rowColumns else compareKeys
+    toDicts = (lambda rows: toRowDicts(rowColumns, rows)) if rowColumns else (lambda rows: rows)
+    deletedRows = []
+    insertedRows = []
+    updatedRows = []
+
+    with timePhase('diff'):
+        table1KeyRows = {}
+        table2KeyRows = {}
+
+        for tempRow in table1Rows:
+            table1KeyRows.setdefault(getKey(tempRow), []).append(tempRow)
+
+        for tempRow in table2Rows:
+            table2KeyRows.setdefault(getKey(tempRow), []).append(tempRow)
+
+        for rowKey, table1KeyGroup in table1KeyRows.items():
+            table2KeyGroup = table2KeyRows.pop(rowKey, [])
+            # Values are compared by repr, like the row digests
+            table1Values = [ [ repr(tempRow[tempKey]) for tempKey in compareKeys ] for tempRow in table1KeyGroup ]
+            table2Values = [ [ repr(tempRow[tempKey]) for tempKey in compareKeys ] for tempRow in table2KeyGroup ]
+            table1Left = [ table1KeyGroup[rowIndex] for rowIndex in findMissingRowIndexes([ tuple(tempValues) for tempValues in table1Values ], collections.Counter([ tuple(tempValues) for tempValues in table2Values ])) ]
+            table2Left = [ table2KeyGroup[rowIndex] for rowIndex in findMissingRowIndexes([ tuple(tempValues) for tempValues in table2Values ], collections.Counter([ tuple(tempValues) for tempValues in table1Values ])) ]
+
+            if len(table1Left) == 1 and len(table2Left) == 1:
+                updatedRows.append((table1Left[0], table2Left[0]))
+            else:
+                deletedRows.extend(table1Left)
+                insertedRows.extend(table2Left)
+
+        for table2KeyGroup in table2KeyRows.values():
+            insertedRows.extend(table2KeyGroup)
+
+    addPhaseStats('diff', rows = len(table1Rows) + len(table2Rows))
+
+    changedRows = []
+
+    for (beforeRow, afterRow), afterDict in zip(updatedRows, toDicts([ afterRow for (beforeRow, afterRow) in updatedRows ])):
+        changedColumns = [ (colName, beforeRow[tempKey]) for colName, tempKey in zip(compareNames, compareKeys) if repr(beforeRow[tempKey]) != repr(afterRow[tempKey]) ]
+
+        changedRows.append(dict(afterDict, **{
+            'Changed Columns': ', '.join([ colName for (colName, beforeValue) in changedColumns ]),
+            'Before': json.dumps(dict(changedColumns), ensure_ascii = False, default = toJsonValue),
+        }))
+
+    rowsWriter.writeChanges('Deleted', table1, toDicts(deletedRows))
+    rowsWriter.writeChanges('Inserted', table2, toDicts(insertedRows))
+    rowsWriter.writeChanges('Updated', table2, changedRows)
+# writeKeyedRowsDiff
+
+# createPairRowsWriter
+# Writer of the rows found by comparing the two tables, the -keyed changes or the missing rows
+def createPairRowsWriter(resumeState = None):
+    global tables, keyedDiff
+
+    if keyedDiff:
+        return MissingRowsWriter(CHANGE_COLUMNS + tables[0].get('columns'), resumeState, CHANGE_LABEL_COLUMNS)
+
+    return MissingRowsWriter(tables[0].get('columns'), resumeState)
+# createPairRowsWriter
+
+# logChangeCounts
+def logChangeCounts(rowsWriter):
+    global LOGGER, tables, runSummary
+
+    (table1, table2) = tables
+    changedRows = 0
+
+    for change in CHANGES:
+        changeCount = rowsWriter.missingCounts.get((change,), 0)
+        changedRows += changeCount
+
+        if changeCount > 0:
+            LOGGER.error(f'{changeCount} rows are {change.lower()} in ' + table2.get('label') + ' from ' + table1.get('label') + ', Changes can be found in the ' + rowsWriter.getLocation((change,)))
+
+    if changedRows == 0:
+        LOGGER.info('Hooray! All the Data are same in all Tables.')
+
+    runSummary = { 'identical': changedRows == 0, 'missingRows': changedRows, 'resultFile': rowsWriter.resultWriter.fileName if changedRows > 0 else '' }
+
+    return changedRows == 0
+# logChangeCounts
+
+# logMissingCounts
+def logMissingCounts(rowsWriter):
+    global LOGGER, tables, runSummary
+
+    tablesBySection = { table.get('dbSection'): table for table in tables }
+    allRowsIdentical = True
+
+    for missingTable in tables:
+        for presentTable in tables:
+            if rowsWriter.isAllRowsMissing([ missingTable ], [ presentTable ]):
+                allRowsIdentical = False
+
+                LOGGER.error('None of the Data is present in ' + presentTable.get('label') + ' that matches ' + missingTable.get('label') + '!')
+
+    for (missingSections, presentSections), missingCount in sorted(rowsWriter.missingCounts.items()):
+        if missingCount > 0:
+            allRowsIdentical = False
+            missingNames = ', '.join([ tablesBySection[tempSection].get('label') for tempSection in missingSections ])
+            presentNames = ', '.join([ tablesBySection[tempSection].get('label') for tempSection in presentSections ])
+
+            LOGGER.error(f'{missingNames} ' + ('is' if len(missingSections) == 1 else 'are') + f' missing {missingCount} rows from {presentNames}, Missing data can be found in the ' + rowsWriter.getLocation((missingSections, presentSections)))
+
+    if allRowsIdentical:
+        LOGGER.info('Hooray! All the Data are same in all Tables.')
+
+    missingRows = sum(rowsWriter.missingCounts.values())
+    runSummary = { 'identical': allRowsIdentical, 'missingRows': missingRows, 'resultFile': rowsWriter.resultWriter.fileName if missingRows > 0 else '' }
+
+    return allRowsIdentical
+# logMissingCounts
+
+# mergeCompareTableData
+def mergeCompareTableData():
+    global tables, LOGGER, columnsToCompare, keyColumns, keyedDiff
+
+    (table1, table2) = tables
+    table1Name = table1.get('db') + '.' + table1.get('table')
+    table2Name = table2.get('db') + '.' + table2.get('table')
+    # Both tables have the same rowColumns
+    rowColumns = table1.get('rowColumns')
+    compareIndexes = getCompareIndexes(table1, columnsToCompare)
+    keyIndexes = [ rowColumns.index(tempCol) for tempCol in keyColumns ]
+
+    resumeProgress = loadCheckpoint()
+    where = None
+    whereParams = []
+
+    if resumeProgress:
+        # Continue after the last Key that was compared
+        where = buildKeyAfterWhere(table1, keyColumns)
+        whereParams = list(resumeProgress.get('lastKey'))
+
+    LOGGER.info(f'Merge-joining {table1Name} and {table2Name} data ordered by ' + (', '.join(keyColumns)) + '...')
+
+    table1Groups = iterKeyGroups(iterTableRows(table1, where = where, params = whereParams, orderBy = keyColumns), keyIndexes)
+    table2Groups = iterKeyGroups(iterTableRows(table2, where = where, params = whereParams, orderBy = keyColumns), keyIndexes)
+    table1Group = next(table1Groups, None)
+    table2Group = next(table2Groups, None)
+
+    rowsWriter = createPairRowsWriter(resumeProgress.get('writer') if resumeProgress else None)
+
+    while table1Group is not None or table2Group is not None:
+        if table2Group is None or (table1Group is not None and table1Group[0] < table2Group[0]):
+            comparedKey = table1Group[0]
+
+            if keyedDiff:
+                rowsWriter.writeChanges('Deleted', table1, toRowDicts(rowColumns, table1Group[1]))
+            else:
+                rowsWriter.write([ table2 ], [ table1 ], toRowDicts(rowColumns, table1Group[1]))
+
+            table1Group = next(table1Groups, None)
+        elif table1Group is None or table2Group[0] < table1Group[0]:
+            comparedKey = table2Group[0]
+
+            if keyedDiff:
+                rowsWriter.writeChanges('Inserted', table2, toRowDicts(rowColumns, table2Group[1]))
+            else:
+                rowsWriter.write([ table1 ], [ table2 ], toRowDicts(rowColumns, table2Group[1]))
+
+            table2Group = next(table2Groups, None)
+        else:
+            # Same key in both tables: compare the rows
+            comparedKey = table1Group[0]
+
+            if keyedDiff:
+                writeKeyedRowsDiff(rowsWriter, table1, table2, table1Group[1], table2Group[1], compareIndexes, keyIndexes, rowColumns)
+            else:
+                writeRowsDiff(rowsWriter, table1, table2, table1Group[1], table2Group[1], compareIndexes, rowColumns)
+
+            table1Group = next(table1Groups, None)
+            table2Group = next(table2Groups, None)
+
+        # A NULL Key can't be resumed from with a > comparison
+        if rowsWriter.isResumable() and isCheckpointDue() and all([ notNull for (notNull, keyValue) in comparedKey ]):
+            saveCheckpoint({ 'lastKey': [ keyValue for (notNull, keyValue) in comparedKey ], 'writer': rowsWriter.checkpoint() })
+
+    rowsWriter.close()
+    removeCheckpoint()
+
+    LOGGER.info(f'All records are fetched.')
+
+    return logChangeCounts(rowsWriter) if keyedDiff else logMissingCounts(rowsWriter)
+# mergeCompareTableData
+
+# getIntegerKeyColumn
+# Key ranges are split by value, which needs a single integer Key Column
+def getIntegerKeyColumn(requiredBy):
+    global tables, LOGGER, keyColumns
+
+    if len(keyColumns) != 1 or not(tables[0].get('columnTypes').get(keyColumns[0]) in INTEGER_DATA_TYPES):
+        LOGGER.error(f'{requiredBy} requires a single integer Key Column! Please pass one in -key argument')
+
+        return None
+
+    return keyColumns[0]
+# getIntegerKeyColumn
+
+# fetchKeyRange
+# Lowest and highest key of both tables, None if both tables are empty
+def fetchKeyRange(keyCol):
+    global tables, DB_CONN
+
+    lowerBound = None
+    upperBound = None
+
+    for table in tables:
+        keyRange = runQuery(DB_CONN[table.get('dbSection')], buildSelectQuery(table, selectExpr = f'MIN({quoteName(keyCol)}) AS lowerBound, MAX({quoteName(keyCol)}) AS upperBound'))[0]
+
+        if keyRange.get('lowerBound') is not None:
+            lowerBound = keyRange.get('lowerBound') if lowerBound is None else min(lowerBound, keyRange.get('lowerBound'))
+            upperBound = keyRange.get('upperBound') if upperBound is None else max(upperBound, keyRange.get('upperBound'))
+
+    return None if lowerBound is None else (int(lowerBound), int(upperBound))
+# fetchKeyRange
+
+# openDigestStore
+def openDigestStore(digestStorePath):
+    digestStore = sqlite3.connect(digestStorePath)
+    digestStore.execute('CREATE TABLE IF NOT EXISTS chunk_digests (table_pair TEXT NOT NULL, lower_bound INTEGER NOT NULL, upper_bound INTEGER NOT NULL, signatures TEXT NOT NULL, missing_rows BLOB NOT NULL, PRIMARY KEY (table_pair, lower_bound, upper_bound))')
+
+    return digestStore
+# openDigestStore
+
+# getStoreChunks
+# Chunks are aligned to multiples of their width, so they keep their bounds between runs when the Key range grows
+# The width doubles from DIGEST_STORE_CHUNK_KEYS until the Key range fits in DIGEST_STORE_MAX_CHUNKS, so sparse Keys (snowflake, time based ids) don't make billions of chunks
+def getStoreChunks(lowerBound, upperBound):
+    chunkKeys = DIGEST_STORE_CHUNK_KEYS
+
+    while upperBound // chunkKeys - lowerBound // chunkKeys + 1 > DIGEST_STORE_MAX_CHUNKS:
+        chunkKeys *= 2
+
+    return [ (chunkLowerBound, chunkLowerBound + chunkKeys - 1) for chunkLowerBound in range(lowerBound - (lowerBound % chunkKeys), upperBound + 1, chunkKeys) ]
+# getStoreChunks
+
+# fetchChunkSignatures
+# Cheap per table summary of a chunk: row count with the checksum, or with the highest watermark when one is given
+def fetchChunkSignatures(checksumCols, where, params):
+    global tables, DB_CONN, watermarkColumn
+
+    signatures = []
+
+    for table in tables:
+        if watermarkColumn:
+            query = buildSelectQuery(table, where = where, selectExpr = f'COUNT(*) AS rowCount, MAX({quoteName(watermarkColumn)}) AS watermark')
+        else:
+            query = buildChecksumQuery(table, checksumCols, where = where)
+
+        signatures.append(runQuery(DB_CONN[table.get('dbSection')], query, params)[0])
+
+    return signatures
+# fetchChunkSignatures
+
+# saveStoredChunk
+# @params storeChunk -> (lowerBound, upperBound, signatures)
+# @params capturedRows -> List of (missingTables dbSections, presentTables dbSections, rows) or -keyed (change, rows) written for the chunk
+def saveStoredChunk(digestStore, tablePair, storeChunk, capturedRows):
+    (lowerBound, upperBound, signatures) = storeChunk
+
+    digestStore.execute('REPLACE INTO chunk_digests (table_pair, lower_bound, upper_bound, signatures, missing_rows) VALUES (?, ?, ?, ?, ?)', (tablePair, lowerBound, upperBound, signatures, pickle.dumps(capturedRows)))
+    digestStore.commit()
+# saveStoredChunk
+
+# checksumCompareTableData
+# Checksums key ranges on the servers and bisects the ranges that differ, only the rows of small differing ranges are fetched
+# With a digest store, chunks whose signatures did not change since the last run reuse its result without any checksum or fetch
+def checksumCompareTableData():
+    global tables, LOGGER, DB_CONN, columnsToCompare, keyColumns, chunkSize, digestStorePath, keyedDiff
+
+    (table1, table2) = tables
+    table1Name = table1.get('db') + '.' + table1.get('table')
+    table2Name = table2.get('db') + '.' + table2.get('table')
+    tempColToCompare = columnsToCompare if columnsToCompare else table1.get('columns')
+    tablesBySection = { table.get('dbSection'): table for table in tables }
+
+    keyCol = getIntegerKeyColumn('checksum mode')
+
+    if not keyCol:
+        return False
+
+    # Key is always part of the checksum, so rows that only differ in their key can't cancel each other out
+    checksumCols = [ keyCol ] + [ tempCol for tempCol in tempColToCompare if tempCol != keyCol ]
+    rangeWhere = quoteName(keyCol) + ' BETWEEN %(lowerBound)s AND %(upperBound)s'
+
+    digestStore = openDigestStore(digestStorePath) if digestStorePath else None
+    tablePair = repr(tuple([ (table.get('dbConfig').get('host'), str(table.get('dbConfig').get('port')), table.get('db'), table.get('table'), table.get('filter')) for table in tables ] + [ tuple(checksumCols), watermarkColumn, keyedDiff ]))
+    # Store chunk being compared: (lowerBound, upperBound, signatures)
+    storeChunk = None
+
+    resumeProgress = loadCheckpoint()
+
+    if resumeProgress:
+        checksumQueries = resumeProgress.get('checksumQueries')
+        fetchedRows = resumeProgress.get('fetchedRows')
+        reusedChunks = resumeProgress.get('reusedChunks')
+        rangesToCheck = resumeProgress.get('rangesToCheck')
+        storeChunk = resumeProgress.get('storeChunk')
+        rowsWriter = createPairRowsWriter(resumeProgress.get('writer'))
+    else:
+        checksumQueries = 0
+        fetchedRows = 0
+        reusedChunks = 0
+        keyRange = fetchKeyRange(keyCol)
+        rangesToCheck = []
+
+        # Ranges are pushed upper half first, so they are popped in key order
+        if keyRange and digestStore:
+            rangesToCheck = [ (chunkLowerBound, chunkUpperBound, True) for (chunkLowerBound, chunkUpperBound) in reversed(getStoreChunks(keyRange[0], keyRange[1])) ]
+        elif keyRange:
+            rangesToCheck = [ (keyRange[0], keyRange[1], False) ]
+
+        rowsWriter = createPairRowsWriter()
+
+    LOGGER.info(f'Comparing {table1Name} and {table2Name} checksums by {keyCol} ranges...')
+
+    while len(rangesToCheck) > 0:
+        (lowerBound, upperBound, isStoreChunk) = rangesToCheck.pop()
+        rangeParams = { 'lowerBound': lowerBound, 'upperBound': upperBound }
+        checksums = None
+        isChunkReused = False
+
+        if isStoreChunk:
+            # All the ranges of the previous chunk are done: remember its result for the next run
+            if storeChunk:
+                saveStoredChunk(digestStore, tablePair, storeChunk, rowsWriter.capturedRows)
+
+            storeChunk = None
+            signatures = fetchChunkSignatures(checksumCols, rangeWhere, rangeParams)
+            signaturesText = repr([ tuple(tempSignature.values()) for tempSignature in signatures ])
+            checksumQueries += 2
+            storedChunk = digestStore.execute('SELECT signatures, missing_rows FROM chunk_digests WHERE table_pair = ? AND lower_bound = ? AND upper_bound = ?', (tablePair, lowerBound, upperBound)).fetchone()
+
+            if storedChunk and storedChunk[0] == signaturesText:
+                rowsWriter.capturedRows = None
+
+                for capturedGroup in pickle.loads(storedChunk[1]):
+                    if keyedDiff:
+                        (change, rows) = capturedGroup
+                        rowsWriter.writeChanges(change, table1 if change == 'Deleted' else table2, rows)
+                    else:
+                        (missingSections, presentSections, rows) = capturedGroup
+                        rowsWriter.write([ tablesBySection[tempSection] for tempSection in missingSections ], [ tablesBySection[tempSection] for tempSection in presentSections ], rows)
+
+                reusedChunks += 1
+                isChunkReused = True
+            else:
+                storeChunk = (lowerBound, upperBound, signaturesText)
+                rowsWriter.capturedRows = []
+
+                if not watermarkColumn:
+                    checksums = signatures
+
+        if not isChunkReused:
+            if not checksums:
+                checksums = [ runQuery(DB_CONN[table.get('dbSection')], buildChecksumQuery(table, checksumCols, where = rangeWhere), rangeParams)[0] for table in tables ]
+                checksumQueries += 2
+
+            rowCounts = [ int(tempChecksum.get('rowCount')) for tempChecksum in checksums ]
+
+            if rowCounts[0] == rowCounts[1] and int(checksums[0].get('rowsChecksum')) == int(checksums[1].get('rowsChecksum')):
+                pass
+            elif max(rowCounts) <= chunkSize or lowerBound == upperBound:
+                table1Rows = runQuery(DB_CONN[table1.get('dbSection')], buildSelectQuery(table1, where = rangeWhere), rangeParams)
+                table2Rows = runQuery(DB_CONN[table2.get('dbSection')], buildSelectQuery(table2, where = rangeWhere), rangeParams)
+                fetchedRows += len(table1Rows) + len(table2Rows)
+
+                if keyedDiff:
+                    writeKeyedRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, tempColToCompare, [ keyCol ])
+                else:
+                    writeRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, tempColToCompare)
+            else:
+                midBound = (lowerBound + upperBound) // 2
+
+                rangesToCheck.append((midBound + 1, upperBound, False))
+                rangesToCheck.append((lowerBound, midBound, False))
+
+        if rowsWriter.isResumable() and isCheckpointDue():
+            saveCheckpoint({ 'rangesToCheck': rangesToCheck, 'checksumQueries': checksumQueries, 'fetchedRows': fetchedRows, 'reusedChunks': reusedChunks, 'storeChunk': storeChunk, 'writer': rowsWriter.checkpoint() })
+
+    if storeChunk:
+        saveStoredChunk(digestStore, tablePair, storeChunk, rowsWriter.capturedRows)
+
+    rowsWriter.close()
+    removeCheckpoint()
+
+    if digestStore:
+        digestStore.close()
+
+        LOGGER.info(f'Reused the results of {reusedChunks} unchanged chunks from {digestStorePath}.')
+
+    LOGGER.info(f'Ran {checksumQueries} checksum queries and fetched {fetchedRows} rows.')
+
+    return logChangeCounts(rowsWriter) if keyedDiff else logMissingCounts(rowsWriter)
+# checksumCompareTableData
+
+# estimateTableBytes
+def estimateTableBytes(table):
+    global DB_CONN
+
+    tableSizes = runQuery(DB_CONN[table.get('dbSection')], 'SELECT DATA_LENGTH FROM information_schema.tables WHERE TABLE_SCHEMA = %(database)s AND TABLE_NAME = %(table)s', { 'database': table.get('db'), 'table': table.get('table') })
+
+    return int(tableSizes[0].get('DATA_LENGTH') or 0) if len(tableSizes) > 0 else 0
+# estimateTableBytes
+
+# openBucketFiles
+def openBucketFiles(spillPath, bucketName, bucketCount):
+    return [ open(os.path.join(spillPath, f'{bucketName}.{bucketIndex}'), 'wb') for bucketIndex in range(bucketCount) ]
+# openBucketFiles
+
+# writeBucketRecords
+# Appends a record of (tableIndex, packed row digests, row values) to every bucket that gets rows
+# The bucket of a row is picked by the digest bytes of the partitioning level, so same rows of all tables land in the same bucket
+def writeBucketRecords(fpBuckets, level, tableIndex, rowDigests, rowValues):
+    digestOffset = level * SPILL_LEVEL_DIGEST_BYTES
+    bucketDigests = [ bytearray() for fpBucket in fpBuckets ]
+    bucketRows = [ [] for fpBucket in fpBuckets ]
+    spilledBytes = 0
+
+    with timePhase('spill'):
+        for rowDigest, tempRowValues in zip(iterRowDigests(rowDigests), rowValues):
+            bucketIndex = int.from_bytes(rowDigest[digestOffset:digestOffset + SPILL_LEVEL_DIGEST_BYTES], 'big') % len(fpBuckets)
+            bucketDigests[bucketIndex] += rowDigest
+            bucketRows[bucketIndex].append(tempRowValues)
+
+        for fpBucket, tempDigests, tempRows in zip(fpBuckets, bucketDigests, bucketRows):
+            if len(tempRows) > 0:
+                recordBytes = pickle.dumps((tableIndex, bytes(tempDigests), tempRows), pickle.HIGHEST_PROTOCOL)
+                fpBucket.write(recordBytes)
+                spilledBytes += len(recordBytes)
+
+    addPhaseStats('spill', rows = len(rowValues), size = spilledBytes)
+# writeBucketRecords
+
+# iterBucketRecords
+def iterBucketRecords(bucketPath):
+    with open(bucketPath, 'rb') as fpBucket:
+        while True:
+            try:
+                yield pickle.load(fpBucket)
+            except EOFError:
+                break
+# iterBucketRecords
+
+# diffBucket
+# Loads the rows of all tables in the bucket and diffs them same as hash mode does
+# @params groupCounts -> Counted per (missingTableIndexes, presentTableIndexes)
+def diffBucket(rowsWriter, bucketPath, groupCounts):
+    global tables
+
+    tablesDataToCompare = [ bytearray() for table in tables ]
+    tablesRowValues = [ [] for table in tables ]
+
+    with timePhase('spill'):
+        for (tableIndex, rowDigests, rowValues) in iterBucketRecords(bucketPath):
+            tablesDataToCompare[tableIndex] += rowDigests
+            tablesRowValues[tableIndex].extend(rowValues)
+
+    addPhaseStats('spill', size = os.path.getsize(bucketPath))
+
+    for (missingIndexes, presentIndexes), rowIndexes in diffRowDigests(tablesDataToCompare).items():
+        presentRowValues = tablesRowValues[presentIndexes[0]]
+
+        groupCounts[(missingIndexes, presentIndexes)] += len(rowIndexes)
+
+        rowsWriter.write([ tables[missingIndex] for missingIndex in missingIndexes ], [ tables[presentIndex] for presentIndex in presentIndexes ], toRowDicts(tables[presentIndexes[0]].get('rowColumns'), [ presentRowValues[rowIndex] for rowIndex in rowIndexes ]))
+# diffBucket
+
+# graceCompareTableData
+# Grace hash join: rows of every table are partitioned by their digest into bucket files, and the buckets are diffed one at a time
+# A bucket larger than -memoryBudget is partitioned again by the next digest bytes, until it fits
+def graceCompareTableData():
+    global tables, LOGGER, DB_CONN, columnsToCompare, memoryBudget, spillDir
+
+    bucketBytesLimit = max(1, memoryBudget * 1024 * 1024 // SPILL_MEMORY_FACTOR)
+    estimatedBytes = sum([ estimateTableBytes(table) for table in tables ])
+    bucketCount = max(1, min(SPILL_MAX_BUCKETS, -(-estimatedBytes // bucketBytesLimit)))
+    # (missingIndexes, presentIndexes) -> Count
+    groupCounts = collections.Counter()
+    diffedBuckets = 0
+
+    rowsWriter = MissingRowsWriter(tables[0].get('columns'))
+
+    with tempfile.TemporaryDirectory(prefix = 'compareTablesData.', dir = spillDir) as spillPath:
+        LOGGER.info(f'Partitioning the data into {bucketCount} buckets under {spillPath}...')
+
+        fpBuckets = openBucketFiles(spillPath, 'bucket', bucketCount)
+
+        # Tables are read one after another, so a single fetch pipeline is held in memory
+        for tableIndex, table in enumerate(tables):
+            compareIndexes = getCompareIndexes(table, columnsToCompare)
+            batchSize = fetchBatchSize(table)
+            table['rowCount'] = 0
+
+            dbCursor = DB_CONN[table.get('dbSection')].cursor()
+
+            with timePhase('query'):
+                dbCursor.execute(buildSelectQuery(table))
+
+            for qResult in iterFetchedSets(dbCursor, batchSize):
+                table['rowCount'] += len(qResult)
+
+                writeBucketRecords(fpBuckets, 0, tableIndex, digestRows(qResult, compareIndexes), qResult)
+
+            dbCursor.close()
+
+            LOGGER.info(table.get('label') + ': ' + str(table.get('rowCount')) + ' rows are partitioned.')
+
+        for fpBucket in fpBuckets:
+            fpBucket.close()
+
+        LOGGER.info('Comparing Data...')
+
+        # Popped in bucket order
+        bucketsToDiff = [ (fpBucket.name, 0) for fpBucket in reversed(fpBuckets) ]
+
+        while len(bucketsToDiff) > 0:
+            (bucketPath, level) = bucketsToDiff.pop()
+            bucketBytes = os.path.getsize(bucketPath)
+
+            if bucketBytes > bucketBytesLimit and (level + 2) * SPILL_LEVEL_DIGEST_BYTES <= ROW_DIGEST_SIZE:
+                fpSplitBuckets = openBucketFiles(spillPath, os.path.basename(bucketPath), min(SPILL_MAX_BUCKETS, -(-bucketBytes // bucketBytesLimit) + 1))
+
+                for (tableIndex, rowDigests, rowValues) in iterBucketRecords(bucketPath):
+                    writeBucketRecords(fpSplitBuckets, level + 1, tableIndex, rowDigests, rowValues)
+
+                for fpBucket in fpSplitBuckets:
+                    fpBucket.close()
+
+                bucketsToDiff.extend([ (fpBucket.name, level + 1) for fpBucket in reversed(fpSplitBuckets) ])
+            else:
+                # Only copies of the same rows are left, those can't be split any further
+                if bucketBytes > bucketBytesLimit:
+                    LOGGER.warning(f'{bucketPath} holds {bucketBytes} bytes of repeated rows, it is diffed over the -memoryBudget')
+
+                diffBucket(rowsWriter, bucketPath, groupCounts)
+                diffedBuckets += 1
+
+            os.remove(bucketPath)
+
+    # Rows are written bucket by bucket, so a pair missing all its rows can only be told at the end
+    markAllMissingPairs(rowsWriter, groupCounts)
+
+    rowsWriter.close()
+
+    LOGGER.info(f'Diffed {diffedBuckets} buckets.')
+
+    return logMissingCounts(rowsWriter)
+# graceCompareTableData
+
+# buildKeySampleWhere
+# -sample by key blocks: samplePercent of the SAMPLE_KEY_BLOCKS blocks of the key range of all tables, spread over the range
+# Every table reads the same blocks through its Key index, None without a single integer Key
+def buildKeySampleWhere():
+    global tables, LOGGER, keyColumns, samplePercent
+
+    tempKeyColumns = keyColumns if keyColumns else fetchTableKeyColumns(tables[0])
+
+    if len(tempKeyColumns) != 1 or not(tables[0].get('columnTypes').get(tempKeyColumns[0]) in INTEGER_DATA_TYPES):
+        LOGGER.warning('-sample without a single integer Key Column picks the rows by their content, every row is still read. Pass one in -key argument to read only the sampled rows')
+
+        return None
+
+    keyRange = fetchKeyRange(tempKeyColumns[0])
+
+    if not keyRange:
+        return None
+
+    keyBlocks = []
+
+    for blockNo, (lowerBound, upperBound) in enumerate(splitKeyRange(keyRange[0], keyRange[1], SAMPLE_KEY_BLOCKS)):
+        # samplePercent of every 100 blocks, evenly apart
+        if (blockNo * samplePercent) % 100 >= samplePercent:
+            continue
+
+        # Sampled blocks next to each other are read as one range
+        if len(keyBlocks) > 0 and keyBlocks[-1][1] == lowerBound - 1:
+            keyBlocks[-1] = (keyBlocks[-1][0], upperBound)
+        else:
+            keyBlocks.append((lowerBound, upperBound))
+
+    return ' OR '.join([ quoteName(tempKeyColumns[0]) + f' BETWEEN {lowerBound} AND {upperBound}' for (lowerBound, upperBound) in keyBlocks ])
+# buildKeySampleWhere
+
+# fetchTableSketch
+# Bottom-k sketch: the sketchSize smallest distinct row hashes, MySQL keeps only those while it scans the table
+# The row count comes along by a window over all the rows, so the table is scanned once
+# @params sampleWhere -> Of buildKeySampleWhere, None to sample by content
+def fetchTableSketch(table, sampleWhere = None):
+    global DB_CONN, columnsToCompare, sketchSize, samplePercent
+
+    # Same column order in every table, so same rows hash the same
+    tempColToCompare = columnsToCompare if columnsToCompare else table.get('rowColumns')
+    dbConn = DB_CONN[table.get('dbSection')]
+
+    if samplePercent < 100 and not sampleWhere:
+        # Rows are sampled by their content, so the same rows are sampled from every table
+        sampleWhere = f'CRC32({buildRowConcatExpr(tempColToCompare)}) % 100 < {samplePercent}'
+
+    # DISTINCT: Copies of a row have the same hash, they would fill the LIMIT and leave the sketch short of sketchSize
+    rowHashes = runQuery(dbConn, buildSelectQuery(table, where = sampleWhere, orderBy = [ 'rowHash' ], selectExpr = 'DISTINCT ' + buildRowHashExpr(tempColToCompare) + ' AS rowHash, COUNT(*) OVER () AS rowCount') + f' LIMIT {sketchSize}')
+    rowCount = int(rowHashes[0].get('rowCount')) if len(rowHashes) > 0 else 0
+
+    return (rowCount, sorted([ int(tempRow.get('rowHash')) for tempRow in rowHashes ]))
+# fetchTableSketch
+
+# estimateDistinctRows
+# @returns (Estimate, Whether it is exact)
+def estimateDistinctRows(sketch):
+    global sketchSize
+
+    # A sketch that is not full holds every distinct row
+    if len(sketch) < sketchSize:
+        return (len(sketch), True)
+
+    return ((sketchSize - 1) * ROW_HASH_SPACE / (sketch[-1] + 1), False)
+# estimateDistinctRows
+
+# estimateShare
+# Share of the sketched hashes that are hits, with its 95% bounds
+# @returns (Share, Lower bound, Upper bound)
+def estimateShare(hitCount, sketchedCount, isExact):
+    if sketchedCount == 0:
+        return (0.0, 0.0, 0.0)
+
+    share = hitCount / sketchedCount
+
+    if isExact:
+        return (share, share, share)
+
+    standardError = math.sqrt(share * (1 - share) / sketchedCount)
+    lowerBound = max(0.0, share - CONFIDENCE_Z * standardError)
+    upperBound = min(1.0, share + CONFIDENCE_Z * standardError)
+
+    # All or none of the hashes are hits: rule of three
+    if hitCount == sketchedCount:
+        lowerBound = max(0.0, 1 - 3 / sketchedCount)
+    elif hitCount == 0:
+        upperBound = min(1.0, 3 / sketchedCount)
+
+    return (share, lowerBound, upperBound)
+# estimateShare
+
+# estimateCompareTableData
+# The bottom-k of two sketches together is a sample of the distinct rows of both tables, and each of its hashes is known to be in or out of either table
+# Reports estimates only: rows hidden by a hash collision or a copy of a row present in both tables are not counted
+def estimateCompareTableData():
+    global tables, LOGGER, sketchSize, samplePercent, runSummary
+
+    sampleWhere = buildKeySampleWhere() if samplePercent < 100 else None
+
+    LOGGER.info('Sketching ' + (', '.join([ table.get('label') for table in tables ])) + f' data by {sketchSize} row hashes' + (f' of a {samplePercent}% sample' if samplePercent < 100 else '') + '...')
+
+    with ThreadPoolExecutor(max_workers = len(tables)) as fetchPool:
+        tableSketches = list(fetchPool.map(lambda table: fetchTableSketch(table, sampleWhere), tables))
+
+    # Estimates of the sample are scaled up to the whole table, a key block sample assumes the rows are spread evenly over the keys
+    sampleScale = 100 / samplePercent
+    allRowsIdentical = True
+    # Lowest bound of the Jaccard similarity of the pairs whose sketches are all shared, but not exact
+    likelyLowerBound = 1.0
+
+    for table, (rowCount, sketch) in zip(tables, tableSketches):
+        (distinctRows, isExact) = estimateDistinctRows(sketch)
+
+        LOGGER.info(table.get('label') + ': ' + str(round(rowCount * sampleScale)) + ' rows, ' + (f'{round(distinctRows * sampleScale)} distinct' if isExact else f'~{round(distinctRows * sampleScale)} distinct (95%: +/- {round(100 * CONFIDENCE_Z / math.sqrt(sketchSize - 2), 1)}%)'))
+
+    for i in range(len(tables)):
+        for j in range(i + 1, len(tables)):
+            (table1, table2) = (tables[i], tables[j])
+            table1Hashes = set(tableSketches[i][1])
+            table2Hashes = set(tableSketches[j][1])
+            unionSketch = sorted(table1Hashes.union(table2Hashes))[:sketchSize]
+            isExact = estimateDistinctRows(unionSketch)[1]
+
+            (jaccard, jaccardLowerBound, jaccardUpperBound) = estimateShare(len([ tempHash for tempHash in unionSketch if tempHash in table1Hashes and tempHash in table2Hashes ]), len(unionSketch), isExact) if len(unionSketch) > 0 else (1.0, 1.0, 1.0)
+
+            # A sketch that is not exact never proves the tables identical: Its lower bound is below 1 however many hashes are shared
+            if jaccard == 1 and not isExact:
+                LOGGER.info(table1.get('label') + ' vs ' + table2.get('label') + f': Likely identical (95%: Jaccard similarity {jaccardLowerBound:.4f} - 1)')
+
+                likelyLowerBound = min(likelyLowerBound, jaccardLowerBound)
+            else:
+                LOGGER.info(table1.get('label') + ' vs ' + table2.get('label') + f': Jaccard similarity {jaccard:.4f}' + ('' if isExact else f' (95%: {jaccardLowerBound:.4f} - {jaccardUpperBound:.4f})'))
+
+            if jaccard < 1:
+                allRowsIdentical = False
+
+            for (missingTable, missingHashes, presentTable, presentHashes, presentRowCount) in [ (table1, table1Hashes, table2, table2Hashes, tableSketches[j][0]), (table2, table2Hashes, table1, table1Hashes, tableSketches[i][0]) ]:
+                presentSketch = [ tempHash for tempHash in unionSketch if tempHash in presentHashes ]
+
+                if len(presentSketch) == 0:
+                    continue
+
+                missingShares = estimateShare(len([ tempHash for tempHash in presentSketch if not(tempHash in missingHashes) ]), len(presentSketch), isExact)
+                missingRows = [ round(presentRowCount * sampleScale * tempShare) for tempShare in missingShares ]
+                missingText = missingTable.get('label') + f' is missing ~{missingRows[0]} rows from ' + presentTable.get('label') + ('' if isExact else f' (95%: {missingRows[1]} - {missingRows[2]})')
+
+                if missingRows[0] > 0:
+                    LOGGER.error(missingText)
+                else:
+                    LOGGER.info(missingText)
+
+    if allRowsIdentical and likelyLowerBound < 1:
+        LOGGER.info(f'All the Data are likely same in all Tables (95%: Jaccard similarity {likelyLowerBound:.4f} - 1).')
+    elif allRowsIdentical:
+        LOGGER.info('Hooray! All the Data are same in all Tables.')
+
+    runSummary = { 'identical': allRowsIdentical, 'missingRows': '', 'resultFile': '' }
+
+    return allRowsIdentical
+# estimateCompareTableData
+
+# runComparison
+# Compares the tables of the arguments or of a manifest entry
+# @params where -> SQL condition every table of the comparison is filtered by
+# @params formatArg -> -format, defaults by mode
+# @params timeWindow -> (-timeColumn, -since, -until)
+def runComparison(tableArgs, mode, colsToCompare = None, keyArg = None, where = None, formatArg = None, timeWindow = None):
+    global LOGGER, tables, columnsToCompare, keyColumns, chunkSize, workers, runSignature, digestStorePath, watermarkColumn, resultFormat, runSummary, keyedDiff
+
+    tables = None
+    columnsToCompare = None
+    keyColumns = None
+    runSummary = None
+    resultFormat = formatArg if formatArg else ('xlsx' if mode == 'hash' else 'csv')
+    runSignature = { 'tables': tableArgs, 'cols': colsToCompare, 'mode': mode, 'key': keyArg, 'where': where, 'chunkSize': chunkSize, 'workers': workers, 'digestStore': digestStorePath, 'watermark': watermarkColumn, 'format': resultFormat, 'keyed': keyedDiff }
+
+    invalidTables = [ tempTable for tempTable in tableArgs if len(tempTable.split('.')) != 2 ]
+
+    if len(tableArgs) < 2:
+        LOGGER.error('At least 2 tables are required!')
+    elif len(invalidTables) > 0:
+        LOGGER.error('Tables must be in format: db.table_name, Invalid: ' + (', '.join(invalidTables)))
+    elif not(mode in COMPARE_MODES):
+        LOGGER.error(f'Invalid mode: {mode}')
+    elif not(mode in ['hash', 'grace', 'estimate']) and len(tableArgs) != 2:
+        LOGGER.error(f'{mode} mode compares exactly 2 tables! Use hash, grace, estimate modes to compare more')
+    elif keyedDiff and not(mode in ['hash', 'merge', 'checksum']):
+        LOGGER.error(f'-keyed needs the rows joined by Key: Use hash, merge, checksum modes instead of {mode} mode')
+    elif keyedDiff and len(tableArgs) != 2:
+        LOGGER.error('-keyed compares exactly 2 tables!')
+    elif not(resultFormat in RESULT_WRITERS):
+        LOGGER.error(f'Invalid format: {resultFormat}')
+    else:
+        tables = [ { 'db': tempTable.split('.')[0], 'table': tempTable.split('.')[1], 'filter': where } for tempTable in tableArgs ]
+
+        if colsToCompare:
+            # String to List
+            colsToCompare = [ tempColToCompare.strip() for tempColToCompare in colsToCompare.split(',') ]
+            # Remove empty Strings from List
+            columnsToCompare = [ tempColToCompare for tempColToCompare in colsToCompare if tempColToCompare ]
+
+        if keyArg:
+            keyColumns = [ tempKeyCol.strip() for tempKeyCol in keyArg.split(',') if tempKeyCol.strip() ]
+
+        initDBConn()
+
+        allColumnsMatched = compareTableDefs()
+
+        if allColumnsMatched and timeWindow and any(timeWindow):
+            allColumnsMatched = applyTimeWindow(*timeWindow)
+
+            # A relative window is resolved again by every run, a checkpoint of another window is not resumed
+            runSignature['filters'] = [ table.get('filter') for table in tables ]
+
+        if allColumnsMatched:
+            allColumnsMatched = checkTableFilters()
+
+        if allColumnsMatched:
+            projectTableColumns()
+            setRowColumns()
+
+            if mode == 'merge':
+                if resolveKeyColumns():
+                    mergeCompareTableData()
+            elif mode == 'checksum':
+                if resolveKeyColumns():
+                    checksumCompareTableData()
+            elif mode == 'grace':
+                graceCompareTableData()
+            elif mode == 'estimate':
+                estimateCompareTableData()
+            elif workers > 1 or keyedDiff:
+                if resolveKeyColumns():
+                    compareTableData()
+            else:
+                compareTableData()
+# runComparison
+
+# loadManifest
+# JSON, YAML: A list of entries, or an object with the list in "pairs". CSV: An entry per row, tables separated by spaces
+# @returns List of { index, tables, cols, key, mode, where, timeColumn, since, until, format }
+def loadManifest(manifestPath):
+    if manifestPath.lower().endswith('.csv'):
+        with open(manifestPath, 'r', newline = '') as fpManifest:
+            rawEntries = list(csv.DictReader(fpManifest))
+    elif manifestPath.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise Exception('YAML manifests require PyYAML: pip install pyyaml')
+
+        with open(manifestPath, 'r') as fpManifest:
+            rawEntries = yaml.safe_load(fpManifest)
+    else:
+        with open(manifestPath, 'r') as fpManifest:
+            rawEntries = json.load(fpManifest)
+
+    if isinstance(rawEntries, dict):
+        rawEntries = rawEntries.get('pairs', [])
+
+    manifestEntries = []
+
+    for rawEntry in rawEntries:
+        tableArgs = rawEntry.get('tables')
+        tableArgs = tableArgs.split() if isinstance(tableArgs, str) else tableArgs
+
+        if not tableArgs:
+            tableArgs = [ rawEntry.get(tempKey) for tempKey in [ 'table1', 'table2' ] if rawEntry.get(tempKey) ]
+
+        entry = { 'index': len(manifestEntries) + 1, 'tables': tableArgs }
+
+        for tempKey in [ 'cols', 'key', 'mode', 'where', 'timeColumn', 'since', 'until', 'format' ]:
+            tempValue = rawEntry.get(tempKey)
+            # Lists are accepted for the comma separated values
+            entry[tempKey] = (','.join(tempValue) if isinstance(tempValue, list) else tempValue) if tempValue else None
+
+        manifestEntries.append(entry)
+
+    return manifestEntries
+# loadManifest
+
+# estimateManifestEntries
+# @returns Entry index -> Bytes of its tables, by information_schema
+def estimateManifestEntries(manifestEntries):
+    global DB_CONN, LOGGER
+
+    DB_CONN = {}
+    entrySizes = {}
+
+    for entry in manifestEntries:
+        entrySize = 0
+
+        for i, tableArg in enumerate(entry.get('tables')):
+            tableSplit = tableArg.split('.')
+            dbSection = f'DB{i + 1}'
+
+            if not(dbSection in DB_CONN):
+                dbConfig = readDBConfig(dbSection, tableSplit[0])
+
+                try:
+                    DB_CONN[dbSection] = connectDB(dbConfig) if dbConfig else None
+                except mysql.connector.Error as e:
+                    LOGGER.warning(f'{dbSection}: {e}')
+
+                    DB_CONN[dbSection] = None
+
+            # An entry that can't be sized is left for its comparison to report
+            if DB_CONN.get(dbSection) and len(tableSplit) == 2:
+                entrySize += estimateTableBytes({ 'db': tableSplit[0], 'table': tableSplit[1], 'dbSection': dbSection })
+
+        entrySizes[entry.get('index')] = entrySize
+
+    for dbConn in DB_CONN.values():
+        if dbConn:
+            dbConn.close()
+
+    # Connections are not shared with the worker processes
+    DB_CONN = None
+
+    return entrySizes
+# estimateManifestEntries
+
+# initBatchWorker
+# A batch worker process starts with the settings of the parent, it keeps its connections for all the entries it compares
+def initBatchWorker(settings):
+    global DB_CONFIG_FILE_PATH, CHECKPOINT_FILE_PATH, chunkSize, workers, resumeRun, digestStorePath, watermarkColumn, memoryBudget, spillDir, sketchSize, samplePercent, compressProtocol, fetchMemory, keyedDiff, diffEngine
+
+    (DB_CONFIG_FILE_PATH, CHECKPOINT_FILE_PATH, chunkSize, resumeRun, digestStorePath, watermarkColumn, memoryBudget, spillDir, sketchSize, samplePercent, compressProtocol, fetchMemory, keyedDiff, diffEngine) = settings
+    # Worker processes can't start processes of their own
+    workers = 1
+
+    initLogger()
+# initBatchWorker
+
+# compareManifestEntry
+# @returns (Summary row of the entry, Phase stats of the entry)
+def compareManifestEntry(entry):
+    global LOGGER, CHECKPOINT_FILE_PATH, resultFilePrefix, runSummary
+
+    takePhaseStats()
+    startTime = time.monotonic()
+    baseCheckpointPath = CHECKPOINT_FILE_PATH
+    # Every entry writes its own files
+    resultFilePrefix = 'Missing Data ' + str(entry.get('index'))
+    CHECKPOINT_FILE_PATH = baseCheckpointPath + '.' + str(entry.get('index'))
+    entryError = ''
+
+    LOGGER.info(f'Entry ' + str(entry.get('index')) + ': Comparing ' + (', '.join(entry.get('tables'))) + '...')
+
+    try:
+        runComparison(entry.get('tables'), entry.get('mode'), entry.get('cols'), entry.get('key'), entry.get('where'), entry.get('format'), (entry.get('timeColumn'), entry.get('since'), entry.get('until')))
+    except (Exception, SystemExit) as e:
+        traceback.print_exc()
+        entryError = str(e)
+
+    CHECKPOINT_FILE_PATH = baseCheckpointPath
+
+    if runSummary:
+        entryResult = 'Same' if runSummary.get('identical') else 'Different'
+    else:
+        entryResult = 'Failed'
+        entryError = entryError if entryError else 'See the log'
+
+    return ({
+        'Entry': entry.get('index'),
+        'Tables': ', '.join(entry.get('tables')),
+        'Mode': entry.get('mode'),
+        'Result': entryResult,
+        'Missing Rows': runSummary.get('missingRows') if runSummary else '',
+        'Missing Data File': runSummary.get('resultFile') if runSummary else '',
+        'Seconds': round(time.monotonic() - startTime, 1),
+        'Error': entryError,
+    }, takePhaseStats())
+# compareManifestEntry
+
+# batchCompareTableData
+# Compares the manifest entries on a pool of -workers processes, largest entries first so a big one does not start last
+# @params defaultScope -> -where, -timeColumn, -since, -until by entry key
+def batchCompareTableData(manifestPath, defaultMode, defaultFormat, defaultScope):
+    global LOGGER, DB_CONFIG_FILE_PATH, CHECKPOINT_FILE_PATH, BATCH_SUMMARY_FILE_PATH, chunkSize, workers, resumeRun, digestStorePath, watermarkColumn, memoryBudget, spillDir, sketchSize, samplePercent, compressProtocol, fetchMemory, keyedDiff, diffEngine
+
+    manifestEntries = loadManifest(manifestPath)
+
+    for entry in manifestEntries:
+        entry['mode'] = entry.get('mode') if entry.get('mode') else defaultMode
+        entry['format'] = entry.get('format') if entry.get('format') else defaultFormat
+
+        for tempKey, tempValue in defaultScope.items():
+            entry[tempKey] = entry.get(tempKey) if entry.get(tempKey) else tempValue
+
+    LOGGER.info(f'Estimating the size of {len(manifestEntries)} entries...')
+
+    entrySizes = estimateManifestEntries(manifestEntries)
+    manifestEntries.sort(key = lambda entry: entrySizes.get(entry.get('index')), reverse = True)
+
+    settings = (DB_CONFIG_FILE_PATH, CHECKPOINT_FILE_PATH, chunkSize, resumeRun, digestStorePath, watermarkColumn, memoryBudget, spillDir, sketchSize, samplePercent, compressProtocol, fetchMemory, keyedDiff, diffEngine)
+    summaryRows = []
+
+    with multiprocessing.Pool(workers, initializer = initBatchWorker, initargs = (settings,)) as workerPool:
+        for (summaryRow, entryStats) in workerPool.imap_unordered(compareManifestEntry, manifestEntries):
+            summaryRows.append(summaryRow)
+            mergePhaseStats(entryStats)
+
+            LOGGER.info(f'[{len(summaryRows)}/{len(manifestEntries)}] Entry ' + str(summaryRow.get('Entry')) + ': ' + summaryRow.get('Result'))
+
+    summaryRows.sort(key = lambda summaryRow: summaryRow.get('Entry'))
+
+    with open(BATCH_SUMMARY_FILE_PATH, 'w', newline = '') as fpSummary:
+        csvWriter = csv.DictWriter(fpSummary, fieldnames = list(summaryRows[0].keys()) if summaryRows else [ 'Entry' ])
+        csvWriter.writeheader()
+        csvWriter.writerows(summaryRows)
+
+    resultCounts = collections.Counter([ summaryRow.get('Result') for summaryRow in summaryRows ])
+
+    LOGGER.info(f'{len(summaryRows)} entries compared: ' + str(resultCounts.get('Same', 0)) + ' Same, ' + str(resultCounts.get('Different', 0)) + ' Different, ' + str(resultCounts.get('Failed', 0)) + f' Failed. Summary can be found in the {BATCH_SUMMARY_FILE_PATH}')
+
+    return resultCounts.get('Same', 0) == len(summaryRows)
+# batchCompareTableData
+
+# main
+def main():
+    try:
+        global LOGGER, DB_CONFIG_FILE_PATH, CHECKPOINT_FILE_PATH, BATCH_SUMMARY_FILE_PATH, PROFILE_FILE_PATH, chunkSize, workers, resumeRun, digestStorePath, watermarkColumn, memoryBudget, spillDir, sketchSize, samplePercent, compressProtocol, fetchMemory, keyedDiff, diffEngine
+
+        startTime = time.perf_counter()
+
+        initLogger()
+
+        args = getCmdArgs()
+
+        tableArgs = args.tables if args.tables else [ tempTable for tempTable in [ args.table1, args.table2 ] if tempTable ]
+        chunkSize = args.chunkSize
+        workers = max(1, args.workers)
+        resumeRun = args.resume
+        digestStorePath = args.digestStore
+        watermarkColumn = args.watermark
+        memoryBudget = max(1, args.memoryBudget)
+        spillDir = args.spillDir
+        sketchSize = max(3, args.sketchSize)
+        samplePercent = min(100, max(1, args.sample))
+        compressProtocol = args.compress
+        fetchMemory = max(1, args.fetchMemory)
+        keyedDiff = args.keyed
+        diffEngine = args.engine
+
+        if args.checkpoint:
+            CHECKPOINT_FILE_PATH = args.checkpoint
+
+        if args.config:
+            DB_CONFIG_FILE_PATH = args.config
+
+        if args.summary:
+            BATCH_SUMMARY_FILE_PATH = args.summary
+
+        if args.profileFile:
+            PROFILE_FILE_PATH = args.profileFile
+
+        profiler = startProfiler(args.profile)
+
+        try:
+            if args.manifest:
+                batchCompareTableData(args.manifest, args.mode, args.format, { 'where': args.where, 'timeColumn': args.timeColumn, 'since': args.since, 'until': args.until })
+            elif len(tableArgs) >= 2:
+                runComparison(tableArgs, args.mode, args.cols, args.key, args.where, args.format, (args.timeColumn, args.since, args.until))
+            else:
+                LOGGER.error('Invalid Arguments! Arguments: table1, table2 or at least 2 tables in -tables, or a -manifest are required')
+                quit()
+        finally:
+            stopProfiler(args.profile, profiler)
+
+            if args.stats:
+                reportStats(args.stats, time.perf_counter() - startTime)
     except Exception as e:
         print('Error occurred:')
         traceback.print_exc()
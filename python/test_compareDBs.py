@@ -0,0 +1,120 @@
+'''
+Install Dependencies:
+    - pip install pytest mysql-connector-python rich
+
+Run: python -m pytest python
+'''
+
+import json, logging, datetime, pytest
+
+pytest.importorskip('mysql.connector')
+pytest.importorskip('rich')
+
+import compareDBs
+
+# Details of a table, as fetchSchemaDetails returns them
+TABLE_DETAILS = {
+    'columns': [
+        { 'COLUMN_NAME': 'id', 'COLUMN_DEFAULT': None, 'IS_NULLABLE': 'NO', 'DATA_TYPE': 'int', 'CHARACTER_MAXIMUM_LENGTH': None, 'CHARACTER_SET_NAME': None, 'COLLATION_NAME': None, 'COLUMN_COMMENT': '' },
+        { 'COLUMN_NAME': 'name', 'COLUMN_DEFAULT': None, 'IS_NULLABLE': 'YES', 'DATA_TYPE': 'varchar', 'CHARACTER_MAXIMUM_LENGTH': 50, 'CHARACTER_SET_NAME': 'utf8mb4', 'COLLATION_NAME': 'utf8mb4_bin', 'COLUMN_COMMENT': '' },
+    ],
+    'constraints': { 'id': [ 'PRIMARY KEY' ] },
+}
+# The same table, with a comment on its name column
+COMMENTED_TABLE_DETAILS = {
+    'columns': [ TABLE_DETAILS.get('columns')[0], dict(TABLE_DETAILS.get('columns')[1], COLUMN_COMMENT = 'Full name') ],
+    'constraints': TABLE_DETAILS.get('constraints'),
+}
+
+# Tables of a snapshot, with their fingerprints
+SNAPSHOT_TABLE = dict(TABLE_DETAILS, fingerprint = compareDBs.fingerprintTable(TABLE_DETAILS))
+COMMENTED_SNAPSHOT_TABLE = dict(COMMENTED_TABLE_DETAILS, fingerprint = compareDBs.fingerprintTable(COMMENTED_TABLE_DETAILS))
+SNAPSHOT = { 'version': compareDBs.SNAPSHOT_VERSION, 'database': 'app', 'takenAt': '2024-01-02 03:04:05', 'tables': { 'users': SNAPSHOT_TABLE } }
+
+def test_fingerprintTable_tells_definitions_apart():
+    assert compareDBs.fingerprintTable(TABLE_DETAILS) == compareDBs.fingerprintTable(json.loads(json.dumps(TABLE_DETAILS)))
+    assert compareDBs.fingerprintTable(TABLE_DETAILS) != compareDBs.fingerprintTable(COMMENTED_TABLE_DETAILS)
+
+def test_diffTableDetails_by_fingerprint_and_ignore():
+    assert compareDBs.diffTableDetails(SNAPSHOT_TABLE, dict(SNAPSHOT_TABLE), []) == []
+    assert [ colName for (colName, db1ColDispFormat, db2ColDispFormat) in compareDBs.diffTableDetails(SNAPSHOT_TABLE, COMMENTED_SNAPSHOT_TABLE, []) ] == [ 'name' ]
+    # Different fingerprints, same definition once the comments are ignored
+    assert compareDBs.diffTableDetails(SNAPSHOT_TABLE, COMMENTED_SNAPSHOT_TABLE, [ 'comment' ]) == []
+
+@pytest.mark.parametrize('snapshotName', [ 'app.json', 'app.json.gz' ])
+def test_snapshot_round_trip(snapshotName, tmp_path):
+    compareDBs.writeSnapshot(str(tmp_path / snapshotName), SNAPSHOT)
+
+    assert compareDBs.isSnapshotPath(str(tmp_path / snapshotName))
+    assert compareDBs.readSnapshot(str(tmp_path / snapshotName)) == SNAPSHOT
+
+def test_readSnapshot_rejects_other_versions(tmp_path):
+    compareDBs.writeSnapshot(str(tmp_path / 'app.json'), dict(SNAPSHOT, version = compareDBs.SNAPSHOT_VERSION + 1))
+
+    with pytest.raises(Exception, match = 'snapshot'):
+        compareDBs.readSnapshot(str(tmp_path / 'app.json'))
+
+def test_fetchSchema_reuses_cache_until_definition_check_changes(tmp_path, monkeypatch):
+    tableCheck = { 'TABLE_NAME': 'users', 'CREATE_TIME': datetime.datetime(2024, 1, 2, 3, 4, 5), 'UPDATE_TIME': None, 'columnCount': 2, 'columnsCheck': 1234, 'constraintCount': 1, 'constraintsCheck': 5678 }
+    runQueries = []
+
+    # Answers the queries of fetchSchema, fetchSchemaDetails by the table they read
+    def runQuery(dbConn, query, params = {}, toList = False):
+        if 'information_schema.tables t' in query:
+            runQueries.append('tables')
+
+            return [ dict(tableCheck) ]
+        elif 'FROM information_schema.columns' in query:
+            runQueries.append('columns')
+
+            return [ dict(tempCol, TABLE_NAME = 'users') for tempCol in TABLE_DETAILS.get('columns') ]
+
+        runQueries.append('constraints')
+
+        return [ { 'TABLE_NAME': 'users', 'COLUMN_NAME': 'id', 'CONSTRAINT_TYPE': 'PRIMARY KEY', 'REFERENCED_TABLE_NAME': None, 'REFERENCED_COLUMN_NAME': None } ]
+
+    monkeypatch.setattr(compareDBs, 'runQuery', runQuery)
+    monkeypatch.setattr(compareDBs, 'LOGGER', logging.getLogger(__name__))
+
+    cachePath = str(tmp_path / 'app.json.gz')
+    schema = compareDBs.fetchSchema(None, 'app', cachePath)
+
+    assert schema.get('tables').get('users').get('fingerprint') == compareDBs.fingerprintTable(TABLE_DETAILS)
+    assert runQueries == [ 'tables', 'columns', 'constraints' ]
+
+    del runQueries[:]
+
+    assert compareDBs.fetchSchema(None, 'app', cachePath) == schema
+    assert runQueries == [ 'tables' ]
+
+    # An INSTANT ALTER keeps the CREATE_TIME, the server side check of the columns changes
+    tableCheck['columnsCheck'] = 4321
+    del runQueries[:]
+    compareDBs.fetchSchema(None, 'app', cachePath)
+
+    assert runQueries == [ 'tables', 'columns', 'constraints' ]
+
+def test_fleetCompareDBs_groups_targets_by_drift(tmp_path, monkeypatch, capsys):
+    targetPaths = []
+
+    for targetName, targetTables in [ ('same', { 'users': SNAPSHOT_TABLE }), ('commented1', { 'users': COMMENTED_SNAPSHOT_TABLE }), ('extra', { 'users': SNAPSHOT_TABLE, 'logs': SNAPSHOT_TABLE }), ('commented2', { 'users': COMMENTED_SNAPSHOT_TABLE }) ]:
+        targetPaths.append(str(tmp_path / f'{targetName}.json'))
+        compareDBs.writeSnapshot(targetPaths[-1], dict(SNAPSHOT, database = targetName, tables = targetTables))
+
+    with open(tmp_path / 'inventory.json', 'w') as fpInventory:
+        json.dump([ { 'db': targetPath } for targetPath in targetPaths ], fpInventory)
+
+    monkeypatch.setattr(compareDBs, 'LOGGER', logging.getLogger(__name__))
+    monkeypatch.setattr(compareDBs, 'outputFormat', 'jsonl')
+    monkeypatch.setattr(compareDBs, 'outputRecordCount', 0)
+
+    assert not compareDBs.fleetCompareDBs(SNAPSHOT, str(tmp_path / 'inventory.json'), {}, fleetWorkers = 2)
+
+    records = [ json.loads(line) for line in capsys.readouterr().out.splitlines() ]
+
+    # Most common drift first, its targets in the inventory order
+    assert [ (record.get('type'), record.get('table'), record.get('column'), record.get('drift'), record.get('targets')) for record in records[:-1] ] == [
+        ('column', 'users', 'name', 1, [ targetPaths[1], targetPaths[3] ]),
+        ('table', 'logs', None, 2, [ targetPaths[2] ]),
+    ]
+    assert records[-1] == { 'type': 'summary', 'identical': False, 'targets': 4, 'identicalTargets': 1, 'drifts': 2, 'failedTargets': 0 }
@@ -0,0 +1,243 @@
+'''
+Install Dependencies:
+    - pip install pytest mysql-connector-python XlsxWriter
+    - pip install pandas (Optional: Only for the -engine numpy tests)
+
+Run: python -m pytest python
+'''
+
+import random, pytest, csv, json, datetime, decimal, ast
+
+pytest.importorskip('mysql.connector')
+
+import compareTablesData
+
+# Rows of the fixtures are (id, name, amount) tuples
+FIXTURE_COLUMNS = [0, 1, 2]
+
+# buildFixture
+# @params duplicates -> Whether rows may repeat within a table
+def buildFixture(randomGen, rowCount, duplicates = False):
+    rowPool = [ (rowId, f'name{rowId % 7}', None if rowId % 5 == 0 else rowId * 10) for rowId in range(rowCount * 2) ]
+
+    if duplicates:
+        return [ randomGen.choice(rowPool[:rowCount // 2 + 1]) for i in range(rowCount) ]
+
+    return randomGen.sample(rowPool, rowCount)
+# buildFixture
+
+# findMissingRowIndexesByScan
+# The list membership check compareTableData made before the rows were counted
+def findMissingRowIndexesByScan(rowsToFind, rowsToSearch):
+    return [ rowIndex for rowIndex, row in enumerate(rowsToFind) if not(row in rowsToSearch) ]
+# findMissingRowIndexesByScan
+
+# toMissingRows
+# Rows of diffRowDigests, by (missingTableIndexes, presentTableIndexes)
+def toMissingRows(groupRowIndexes, tablesRows):
+    return { groupKey: sorted([ tablesRows[groupKey[1][0]][rowIndex] for rowIndex in rowIndexes ], key = repr) for groupKey, rowIndexes in groupRowIndexes.items() }
+# toMissingRows
+
+@pytest.mark.parametrize('seed', range(20))
+def test_findMissingRowIndexes_matches_scan_without_duplicates(seed):
+    randomGen = random.Random(seed)
+    table1Rows = buildFixture(randomGen, randomGen.randint(0, 40))
+    table2Rows = buildFixture(randomGen, randomGen.randint(0, 40))
+
+    for (rowsToFind, rowsToSearch) in [ (table1Rows, table2Rows), (table2Rows, table1Rows) ]:
+        assert compareTablesData.findMissingRowIndexes(rowsToFind, compareTablesData.collections.Counter(rowsToSearch)) == findMissingRowIndexesByScan(rowsToFind, rowsToSearch)
+
+def test_findMissingRowIndexes_counts_duplicate_rows():
+    rowA = (1, 'a', 10)
+    rowB = (2, 'b', None)
+
+    # The second copy of rowA has no match, the list membership check would miss it
+    assert compareTablesData.findMissingRowIndexes([ rowA, rowA, rowB ], compareTablesData.collections.Counter([ rowB, rowA ])) == [1]
+    assert compareTablesData.findMissingRowIndexes([ rowB, rowA ], compareTablesData.collections.Counter([ rowA, rowA, rowB ])) == []
+
+def test_findMissingRowIndexes_leaves_rowCounts_intact():
+    rowCounts = compareTablesData.collections.Counter([ (1, 'a', 10) ])
+
+    # The same counts are reused for every other table
+    compareTablesData.findMissingRowIndexes([ (1, 'a', 10) ], rowCounts)
+
+    assert rowCounts == compareTablesData.collections.Counter([ (1, 'a', 10) ])
+
+@pytest.mark.parametrize('seed', range(20))
+def test_diffRowDigests_matches_scan_without_duplicates(seed):
+    randomGen = random.Random(seed)
+    tablesRows = [ buildFixture(randomGen, randomGen.randint(0, 40)) for i in range(2) ]
+
+    missingRows = toMissingRows(compareTablesData.diffRowDigests([ compareTablesData.digestRows(tableRows, FIXTURE_COLUMNS) for tableRows in tablesRows ]), tablesRows)
+
+    assert missingRows.get(((1,), (0,)), []) == sorted([ tablesRows[0][rowIndex] for rowIndex in findMissingRowIndexesByScan(tablesRows[0], tablesRows[1]) ], key = repr)
+    assert missingRows.get(((0,), (1,)), []) == sorted([ tablesRows[1][rowIndex] for rowIndex in findMissingRowIndexesByScan(tablesRows[1], tablesRows[0]) ], key = repr)
+
+def test_diffRowDigests_counts_duplicate_rows():
+    rowA = (1, 'a', 10)
+    rowB = (2, 'b', None)
+    tablesRows = [ [ rowA, rowB, rowA, rowA ], [ rowB, rowA ], [ rowA, rowB, rowB, rowA ] ]
+
+    missingRows = toMissingRows(compareTablesData.diffRowDigests([ compareTablesData.digestRows(tableRows, FIXTURE_COLUMNS) for tableRows in tablesRows ]), tablesRows)
+
+    # 2nd copy of rowA: In tables 0, 2. 3rd copy of rowA: In table 0 only. 2nd copy of rowB: In table 2 only
+    assert missingRows == {
+        ((1,), (0, 2)): [ rowA ],
+        ((1, 2), (0,)): [ rowA ],
+        ((0, 1), (2,)): [ rowB ],
+    }
+
+def test_digestRows_keeps_types_apart():
+    rowDigests = compareTablesData.digestRows([ (None, ''), ('None', ''), (1, ''), ('1', ''), ('a#b', 'c'), ('a', 'b#c'), ('', None), ('', '') ], [0, 1])
+
+    assert len(set(compareTablesData.iterRowDigests(rowDigests))) == 8
+
+def test_digestRows_matches_stored_digests():
+    rows = buildFixture(random.Random(0), 20)
+
+    # Digest stores of earlier runs hold blake2b digests of the repr of the compared values
+    assert compareTablesData.digestRows(rows, FIXTURE_COLUMNS) == b''.join([ compareTablesData.hashlib.blake2b(repr(row).encode(), digest_size = compareTablesData.ROW_DIGEST_SIZE).digest() for row in rows ])
+
+@pytest.mark.parametrize('seed', range(30))
+def test_diffRowDigestsVectorized_matches_diffRowDigests(seed):
+    pytest.importorskip('pandas')
+
+    randomGen = random.Random(seed)
+    tablesDataToCompare = [ compareTablesData.digestRows(buildFixture(randomGen, randomGen.randint(0, 30), duplicates = True), FIXTURE_COLUMNS) for i in range(randomGen.randint(2, 4)) ]
+
+    assert compareTablesData.diffRowDigestsVectorized(tablesDataToCompare) == compareTablesData.diffRowDigests(tablesDataToCompare)
+
+def test_fetchSetsIntoQueue_gives_up_on_error_once_stopped():
+    # The consumer stopped with the queue full, then the fetch fails
+    class FailingCursor:
+        def fetchmany(self, batchSize):
+            raise RuntimeError('connection lost')
+
+    fetchedSets = compareTablesData.queue.Queue(maxsize = 1)
+    fetchedSets.put([ (1,) ])
+    stopFetching = compareTablesData.threading.Event()
+    fetchThread = compareTablesData.threading.Thread(target = compareTablesData.fetchSetsIntoQueue, args = (FailingCursor(), 10, fetchedSets, stopFetching), daemon = True)
+    fetchThread.start()
+    stopFetching.set()
+    fetchThread.join(timeout = 5)
+
+    assert not fetchThread.is_alive()
+
+# Values of each -format, as read back from the Missing Data file
+WRITER_ROW = { 'id': 1, 'tags': { 'b', 'a' }, 'blob': b'ab\xff', 'amount': decimal.Decimal('1.50'), 'duration': datetime.timedelta(hours = 1, minutes = 2), 'created': datetime.datetime(2024, 1, 2, 3, 4, 5) }
+WRITER_VALUES = {
+    'csv': [ '1', None, "b'ab\\xff'", '1.50', '1:02:00', '2024-01-02 03:04:05' ],
+    'jsonl': [ 1, [ 'a', 'b' ], 'ab\\xff', '1.50', '1:02:00', '2024-01-02T03:04:05' ],
+    'parquet': [ '1', 'a,b', 'ab\\xff', '1.50', '1:02:00', '2024-01-02T03:04:05' ],
+    'xlsx': [ 1, 'a,b', 'ab\\xff', 1.5, '1:02:00', datetime.datetime(2024, 1, 2, 3, 4, 5) ],
+}
+
+@pytest.mark.parametrize('resultFormat', [ 'csv', 'jsonl', 'parquet', 'xlsx' ])
+def test_MissingRowsWriter_writes_mysql_values(resultFormat, tmp_path, monkeypatch):
+    columns = list(WRITER_ROW.keys())
+    table1 = { 'dbSection': 'DB1', 'label': 'db.t (DB1)' }
+    table2 = { 'dbSection': 'DB2', 'label': 'db.t (DB2)' }
+
+    monkeypatch.setattr(compareTablesData, 'resultFormat', resultFormat)
+    monkeypatch.setattr(compareTablesData, 'resultFilePrefix', str(tmp_path / 'Missing Data'))
+
+    if resultFormat == 'parquet':
+        pytest.importorskip('pyarrow')
+    elif resultFormat == 'xlsx':
+        pytest.importorskip('xlsxwriter')
+        pytest.importorskip('openpyxl')
+
+    rowsWriter = compareTablesData.MissingRowsWriter(columns)
+    rowsWriter.write([ table2 ], [ table1 ], [ WRITER_ROW ])
+    rowsWriter.close()
+
+    fileName = rowsWriter.resultWriter.fileName
+
+    if resultFormat == 'csv':
+        with open(fileName, newline = '') as fpResult:
+            fileRows = list(csv.reader(fpResult))
+
+        assert fileRows[0] == compareTablesData.MISSING_LABEL_COLUMNS + columns
+        # A SET is written as the Python set, in no set order
+        assert ast.literal_eval(fileRows[1][3]) == WRITER_ROW.get('tags')
+        fileRows[1][3] = None
+        fileValues = fileRows[1]
+    elif resultFormat == 'jsonl':
+        with open(fileName, encoding = 'utf-8') as fpResult:
+            fileRows = [ json.loads(line) for line in fpResult ]
+
+        fileValues = [ fileRows[0].get(tempCol) for tempCol in compareTablesData.MISSING_LABEL_COLUMNS + columns ]
+    elif resultFormat == 'parquet':
+        import pyarrow.parquet
+
+        fileRows = pyarrow.parquet.read_table(fileName).to_pylist()
+        fileValues = [ fileRows[0].get(tempCol) for tempCol in compareTablesData.MISSING_LABEL_COLUMNS + columns ]
+    else:
+        import openpyxl
+
+        # The sheet tells the labels of the group, they are not written
+        fileRows = list(openpyxl.load_workbook(fileName).worksheets[0].iter_rows(values_only = True))
+        fileValues = [ None, None ] + list(fileRows[1])
+
+        assert list(fileRows[0]) == columns
+
+    # CSV, xlsx have a header row
+    assert len(fileRows) == (2 if resultFormat in [ 'csv', 'xlsx' ] else 1)
+    assert fileValues[2:] == WRITER_VALUES.get(resultFormat)
+
+    if resultFormat != 'xlsx':
+        assert fileValues[:2] == [ 'db.t (DB2)', 'db.t (DB1)' ]
+
+@pytest.mark.parametrize('resultFormat', [ 'csv', 'jsonl' ])
+def test_MissingRowsWriter_resumes_at_checkpoint(resultFormat, tmp_path, monkeypatch):
+    table1 = { 'dbSection': 'DB1', 'label': 'db.t (DB1)' }
+    table2 = { 'dbSection': 'DB2', 'label': 'db.t (DB2)' }
+
+    monkeypatch.setattr(compareTablesData, 'resultFormat', resultFormat)
+    monkeypatch.setattr(compareTablesData, 'resultFilePrefix', str(tmp_path / 'Missing Data'))
+
+    rowsWriter = compareTablesData.MissingRowsWriter([ 'id', 'name' ])
+    rowsWriter.write([ table2 ], [ table1 ], [ { 'id': 1, 'name': 'a' } ])
+    resumeState = rowsWriter.checkpoint()
+
+    # Written after the checkpoint, then the run stops: The resumed run finds the row again
+    rowsWriter.write([ table2 ], [ table1 ], [ { 'id': 2, 'name': 'b' } ])
+    rowsWriter.resultWriter.close()
+
+    resumedWriter = compareTablesData.MissingRowsWriter([ 'id', 'name' ], compareTablesData.pickle.loads(compareTablesData.pickle.dumps(resumeState)))
+    resumedWriter.write([ table2 ], [ table1 ], [ { 'id': 3, 'name': 'c' } ])
+    resumedWriter.close()
+
+    with open(resumedWriter.resultWriter.fileName, newline = '', encoding = 'utf-8') as fpResult:
+        if resultFormat == 'csv':
+            fileIds = [ fileRow[2] for fileRow in list(csv.reader(fpResult))[1:] ]
+        else:
+            fileIds = [ str(json.loads(line).get('id')) for line in fpResult ]
+
+    assert fileIds == [ '1', '3' ]
+    assert resumedWriter.missingCounts == { (('DB2',), ('DB1',)): 2 }
+
+def test_writeKeyedRowsDiff_reports_changes(tmp_path, monkeypatch):
+    rowColumns = [ 'id', 'name', 'amount' ]
+    table1 = { 'dbSection': 'DB1', 'label': 'db.t (DB1)' }
+    table2 = { 'dbSection': 'DB2', 'label': 'db.t (DB2)' }
+    table1Rows = [ (1, 'a', 10), (2, 'b', 20), (3, 'c', 30), (5, 'e', 50), (5, 'e', 50) ]
+    table2Rows = [ (5, 'e', 50), (4, 'd', 40), (2, 'B', 20), (1, 'a', 10) ]
+
+    monkeypatch.setattr(compareTablesData, 'resultFormat', 'csv')
+    monkeypatch.setattr(compareTablesData, 'resultFilePrefix', str(tmp_path / 'Missing Data'))
+
+    rowsWriter = compareTablesData.MissingRowsWriter(compareTablesData.CHANGE_COLUMNS + rowColumns, labelColumns = compareTablesData.CHANGE_LABEL_COLUMNS)
+    compareTablesData.writeKeyedRowsDiff(rowsWriter, table1, table2, table1Rows, table2Rows, [0, 1, 2], [0], rowColumns)
+    rowsWriter.close()
+
+    with open(rowsWriter.resultWriter.fileName, newline = '') as fpResult:
+        fileRows = list(csv.DictReader(fpResult))
+
+    # The 2nd copy of Key 5 has no match in table2
+    assert sorted([ (fileRow.get('Change'), fileRow.get('id'), fileRow.get('name'), fileRow.get('Changed Columns'), fileRow.get('Before')) for fileRow in fileRows ]) == [
+        ('Deleted', '3', 'c', '', ''),
+        ('Deleted', '5', 'e', '', ''),
+        ('Inserted', '4', 'd', '', ''),
+        ('Updated', '2', 'B', 'name', '{"name": "b"}'),
+    ]